@@ -0,0 +1,207 @@
+import os
+import threading
+import time
+from collections import namedtuple
+from sqlalchemy import func
+from models import db
+from models.job import Job
+from models.user import User
+from metrics import ADMISSION_DECISIONS
+from progress_writer import progress_writer
+from scheduler import scheduler
+
+# Admission control for new work. Bursts of uploads used to be accepted
+# without limit until decodes and background threads ran the container out of
+# memory. New work is now checked against three limits (0 disables one):
+#   queued audio minutes across every worker (Job rows waiting to run),
+#   jobs in flight (downloading, transcribing or rendering), and
+#   free memory, from the cgroup limit when there is one, else /proc/meminfo.
+# Requests that would bring more bytes in are refused with 429 and a
+# Retry-After estimate. Uploads that are already fully received are charged
+# and parked as "waiting" instead; a thread in every worker hands waiting jobs
+# to the scheduler, oldest first, as capacity frees up.
+
+MAX_QUEUED_MINUTES = float(os.getenv("ADMISSION_MAX_QUEUED_MINUTES", "600"))
+MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "12"))
+MIN_FREE_MB = int(os.getenv("ADMISSION_MIN_FREE_MB", "512"))
+# Audio minutes the deployment gets through per minute, for wait estimates
+THROUGHPUT = float(os.getenv("ADMISSION_THROUGHPUT_MINUTES", "6"))
+RELEASE_INTERVAL = float(os.getenv("ADMISSION_RELEASE_INTERVAL", "15"))
+# Off in instances that shouldn't run jobs (gunicorn.conf.py clears it for evented workers)
+BACKGROUND_THREADS = os.getenv("BACKGROUND_THREADS", "1") == "1"
+MIN_RETRY_AFTER = 15
+MAX_RETRY_AFTER = 1800
+
+IN_FLIGHT_STATUSES = ("downloading", "processing", "finalizing")
+
+Decision = namedtuple("Decision", "admitted reason retry_after queued_minutes in_flight free_mb")
+
+
+def _read_int(path):
+    try:
+        with open(path) as f:
+            value = f.read().strip()
+    except OSError:
+        return None
+    return int(value) if value.isdigit() else None  # cgroup v2 writes "max" for no limit
+
+
+def _inactive_file(path, key):
+    # Page cache the kernel can drop; cgroup usage counts it but it isn't pressure
+    try:
+        with open(path) as f:
+            for line in f:
+                name, _, value = line.partition(" ")
+                if name == key:
+                    return int(value)
+    except (OSError, ValueError):
+        pass
+    return 0
+
+
+def free_memory_bytes():
+    # The smaller of the cgroup's headroom and MemAvailable; None if neither is readable
+    candidates = []
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    candidates.append(int(line.split()[1]) * 1024)
+                    break
+    except (OSError, ValueError, IndexError):
+        pass
+
+    for limit_path, usage_path, stat_path, key in (
+        ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory.current", "/sys/fs/cgroup/memory.stat", "inactive_file"),
+        ("/sys/fs/cgroup/memory/memory.limit_in_bytes", "/sys/fs/cgroup/memory/memory.usage_in_bytes",
+         "/sys/fs/cgroup/memory/memory.stat", "total_inactive_file"),
+    ):
+        limit, usage = _read_int(limit_path), _read_int(usage_path)
+        if limit is None or usage is None or limit >= 1 << 60:  # v1 reports "unlimited" as a huge number
+            continue
+        candidates.append(limit - max(usage - _inactive_file(stat_path, key), 0))
+        break
+    return min(candidates) if candidates else None
+
+
+def load(exclude_job_id=None):
+    query = db.session.query(
+        func.sum(Job.duration_seconds).filter(Job.status == "queued"),
+        func.sum(Job.duration_seconds).filter(Job.status == "waiting"),
+        func.count(Job.id).filter(Job.status.in_(IN_FLIGHT_STATUSES)),
+    )
+    if exclude_job_id is not None:
+        query = query.filter(Job.id != exclude_job_id)
+    queued_seconds, waiting_seconds, in_flight = query.one()
+    return (queued_seconds or 0) / 60, (waiting_seconds or 0) / 60, in_flight
+
+
+def estimated_wait(queued_minutes):
+    seconds = queued_minutes * 60 / THROUGHPUT if THROUGHPUT > 0 else MAX_RETRY_AFTER
+    return int(min(max(seconds, MIN_RETRY_AFTER), MAX_RETRY_AFTER))
+
+
+def check(extra_minutes=0, releasing=False, job=None):
+    # Whether new work of extra_minutes (0 when the length isn't known yet) can
+    # start now. New work queues behind the waiting jobs; releasing one of
+    # them only has to fit alongside what's already queued. A job that is
+    # already charged (and so counted as queued) is left out of the totals.
+    queued_minutes, waiting_minutes, in_flight = load(job.id if job is not None else None)
+    ahead = queued_minutes if releasing else queued_minutes + waiting_minutes
+    free = free_memory_bytes()
+    free_mb = free // (1024 * 1024) if free is not None else None
+
+    reason = None
+    if MIN_FREE_MB and free_mb is not None and free_mb < MIN_FREE_MB:
+        reason = "memory"
+    elif MAX_IN_FLIGHT and in_flight >= MAX_IN_FLIGHT:
+        reason = "in_flight"
+    elif MAX_QUEUED_MINUTES and ahead > 0 and ahead + extra_minutes > MAX_QUEUED_MINUTES:
+        reason = "queued_minutes"  # a single job longer than the limit still gets in on an empty queue
+
+    retry_after = 0
+    if reason == "memory":
+        retry_after = MIN_RETRY_AFTER * 2  # memory comes back as running jobs finish their stage
+    elif reason is not None:
+        retry_after = estimated_wait(ahead)
+    return Decision(reason is None, reason, retry_after, round(ahead, 1), in_flight, free_mb)
+
+
+def refuse(decision):
+    ADMISSION_DECISIONS.labels(result="rejected", reason=decision.reason).inc()
+    print(f"Admission refused ({decision.reason}): {decision.queued_minutes} queued minutes, "
+          f"{decision.in_flight} in flight, {decision.free_mb} MB free")
+
+
+def message(decision):
+    minutes = max(round(decision.retry_after / 60), 1)
+    return f"The service is busy right now. Please try again in about {minutes} minute{'s' if minutes != 1 else ''}."
+
+
+def park(job, decision):
+    # A fully received upload waits its turn instead of being thrown away
+    job.status = "waiting"
+    db.session.commit()
+    ADMISSION_DECISIONS.labels(result="waiting", reason=decision.reason).inc()
+    minutes = max(round(decision.retry_after / 60), 1)
+    progress_writer.log(job.filename, f"🕓 The service is busy; your file is queued and should start "
+                                      f"in about {minutes} minute{'s' if minutes != 1 else ''}.", phase="phase1")
+
+
+def release_waiting():
+    # Hands waiting jobs to the scheduler while there's room. The status
+    # update is the claim, so only one worker process starts each job.
+    from tasks import background_process_file
+
+    released = 0
+    while True:
+        job = Job.query.filter_by(status="waiting").order_by(Job.id).first()
+        minutes = job.duration_seconds / 60 if job and job.duration_seconds else 0
+        if job is None or not check(minutes, releasing=True).admitted:
+            break
+        claimed = Job.query.filter_by(id=job.id, status="waiting").update({"status": "queued"})
+        db.session.commit()
+        if not claimed:
+            continue
+        tier = db.session.query(User.priority_tier).filter_by(id=job.user_id).scalar()
+        scheduler.submit(background_process_file, _app, job.audio_path, job.filename, job.outputs,
+                         user_id=job.user_id, tier=tier, cost=minutes or None)
+        ADMISSION_DECISIONS.labels(result="released", reason="").inc()
+        released += 1
+    return released
+
+
+_app = None
+_thread = None
+_lock = threading.Lock()
+
+
+def _run():
+    while True:
+        time.sleep(RELEASE_INTERVAL)
+        try:
+            with _app.app_context():
+                release_waiting()
+        except Exception as e:
+            print(f"Releasing waiting jobs failed: {e}")
+
+
+def start_releaser(app):
+    global _app, _thread
+    if _thread is not None and _thread.is_alive():
+        return
+    with _lock:
+        if _thread is None or not _thread.is_alive():
+            _app = app
+            _thread = threading.Thread(target=_run, name="admission-release", daemon=True)
+            _thread.start()
+
+
+def init_app(app):
+    if RELEASE_INTERVAL <= 0 or not BACKGROUND_THREADS:
+        return
+    # Started by the first request a process serves, never at import: with
+    # preload_app the gunicorn master imports the app and must not run jobs.
+    # Each worker starts its own; the claim in release_waiting keeps them
+    # from starting a job twice
+    app.before_request(lambda: start_releaser(app))
@@ -1,4 +1,4 @@
-from flask import Flask, request, render_template, send_file, url_for, redirect, flash, Response, stream_with_context, jsonify
+from flask import Flask, request, render_template, send_file, url_for, redirect, flash, Response, jsonify, abort
 from flask_login import login_user, login_required, logout_user, LoginManager, current_user
 from flask_migrate import Migrate
 import os
@@ -6,20 +6,39 @@ from models import db
 from models.user import User
 from models.progress import Progress
 from models.results import Results
+from models.job import Job
+from models.job_profile import JobProfile
+from models.latex_chunk import LatexChunk
+from models.batch import Batch
 from forms.forms import RegisterForm, LoginForm
 from flask_bcrypt import Bcrypt
-import sys
-from pydub.utils import which
-from pydub import AudioSegment
 from dotenv import load_dotenv
-import stripe
-from concurrent.futures import ThreadPoolExecutor
-import threading
-from tasks import background_process_file, background_generate_outputs, download_youtube_audio
+from tasks import (
+    background_process_file,
+    background_process_link,
+    background_process_batch,
+    background_expand_playlist,
+    finalize_saved,
+)
+from pdfgeneration import FAST_MODE_TEMPO
+from credits import calculate_and_deduct_credits, get_duration_seconds
+import uploads
+import user_cache
+import workspace
+from progress_writer import progress_writer
+from progress_hub import progress_hub
+import usage
+import editor_chunks
+import admission
+from scheduler import scheduler
+import metrics
+from metrics import UPLOAD_BYTES
 import io
-import time
+import zipfile
+from functools import wraps
 import uuid
-import subprocess
+import hashlib
+import json
 import logging
 
 load_dotenv()
@@ -27,12 +46,13 @@ load_dotenv()
 
 app = Flask(__name__, instance_relative_config=True)
 
-executor = ThreadPoolExecutor(max_workers=4)
-
 app.config['UPLOAD_FOLDER'] = 'uploads'
+app.config['MAX_UPLOAD_BYTES'] = int(os.getenv('MAX_UPLOAD_MB', '4096')) * 1024 * 1024
+app.config['UPLOAD_CHUNK_BYTES'] = 8 * 1024 * 1024
+app.config['YOUTUBE_CACHE_DIR'] = os.getenv('YOUTUBE_CACHE_DIR', os.path.join(app.config['UPLOAD_FOLDER'], 'youtube_cache'))
+app.config['YOUTUBE_CACHE_MAX_BYTES'] = int(os.getenv('YOUTUBE_CACHE_MAX_MB', '2048')) * 1024 * 1024
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY')
 
-stripe.api_key = os.getenv("STRIPE_SECRET_KEY") # get stripe data (different locally and on render)
 YOUR_DOMAIN = os.getenv("YOUR_DOMAIN")  # e.g. https://yourdomai
 
 
@@ -57,6 +77,9 @@ app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
 # Init DB
 db.init_app(app)
+progress_writer.init_app(app)
+progress_hub.init_app(app)
+usage.ledger.init_app(app)
 
 # Create DB tables if they don't exist (mainly for SQLite/local)
 with app.app_context():
@@ -65,32 +88,9 @@ with app.app_context():
 
 
 
-def set_ffmpeg_path():
-    # Detect OS platform
-    if sys.platform == "win32":
-        # Windows: expect ffmpeg.exe in bin folder
-        ffmpeg_path = os.path.join(os.path.dirname(__file__), "bin", "ffmpeg.exe")
-        if not os.path.isfile(ffmpeg_path):
-            # fallback to system ffmpeg if local binary missing
-            ffmpeg_path = which("ffmpeg")
-    else:
-        # Linux/Mac: expect ffmpeg static binary in bin folder
-        ffmpeg_path = os.path.join(os.path.dirname(__file__), "bin", "ffmpeg")
-        if not os.path.isfile(ffmpeg_path):
-            # fallback to system ffmpeg if local binary missing
-            ffmpeg_path = which("ffmpeg")
-
-    if ffmpeg_path is None:
-        raise RuntimeError("FFmpeg binary not found! Please provide ffmpeg in bin/ or install globally.")
-
-    AudioSegment.converter = ffmpeg_path
-
-# Call this early in your app startup
-set_ffmpeg_path()
-
-
-
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+workspace.init_app(app)
+admission.init_app(app)
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
@@ -98,24 +98,12 @@ login_manager.login_view = 'login'
 bcrypt = Bcrypt(app)
 
 migrate = Migrate(app, db) # To allow columns to be added using terminal
-def calculate_and_deduct_credits(audio_path, outputs):
-    try:
-        audio = AudioSegment.from_file(audio_path)
-        duration_minutes = max(1, -(-len(audio) // 60000))
-        num_outputs = len(outputs)
-        total_credits_needed = duration_minutes * num_outputs
-    except Exception as e:
-        raise ValueError(f"Failed to read audio: {e}")
 
-    if current_user.credits < total_credits_needed:
-        raise PermissionError(f"You need {total_credits_needed} credits, "
-                              f"but have {current_user.credits}.")
+# app.py
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+SSE_RETRY_MS = 3000
 
-    current_user.credits -= total_credits_needed
-    db.session.commit()
-    return total_credits_needed, duration_minutes
 
-# app.py
 @app.route("/progress")
 def progress():
     filename = request.args.get("filename")
@@ -124,26 +112,57 @@ def progress():
     if not filename:
         return jsonify({"error": "Missing filename"}), 400
 
+    # Browsers send Last-Event-ID when they reconnect, so only missed events are replayed
+    try:
+        after_id = int(request.headers.get("Last-Event-ID") or request.args.get("last_event_id") or 0)
+    except ValueError:
+        after_id = 0
+
+    subscription = progress_hub.subscribe(filename, phase, after_id)
+
     def generate_progress():
-        seen_ids = set()
-        while True:
-            entries = Progress.query.filter_by(filename=filename, phase=phase).order_by(Progress.id).all()
-            new_entries = [e for e in entries if e.id not in seen_ids]
-
-            for entry in new_entries:
-                seen_ids.add(entry.id)
-                yield f"data: {entry.message}\n\n"
-                if entry.is_done:
+        # Runs without the request context or a database session: the hub does
+        # the querying, so an idle connection only holds its queue
+        try:
+            yield f"retry: {SSE_RETRY_MS}\n\n"
+            while not subscription.overflowed:
+                entry = subscription.get(timeout=SSE_HEARTBEAT_SECONDS)
+                if entry is None:
+                    # Comment line: keeps proxies from timing the connection
+                    # out and surfaces a dead client as a write error
+                    yield ": keepalive\n\n"
+                    continue
+                entry_id, message, event, is_done = entry
+                data = "\n".join(f"data: {line}" for line in message.split("\n"))
+                if event:
+                    yield f"id: {entry_id}\nevent: {event}\n{data}\n\n"
+                else:
+                    yield f"id: {entry_id}\n{data}\n\n"
+                if is_done:
                     yield "data: [DONE]\n\n"
                     return
-            time.sleep(1)
+        finally:
+            # Also reached when the client disconnects (the server closes the generator)
+            progress_hub.unsubscribe(subscription)
 
-    response = Response(stream_with_context(generate_progress()), content_type="text/event-stream")
+    response = Response(generate_progress(), content_type="text/event-stream")
     response.headers["Cache-Control"] = "no-cache"
     response.headers["X-Accel-Buffering"] = "no"  # Important for Render and Nginx
     return response
 
 
+def get_stripe():
+    # Imported on first payment rather than in every worker at startup
+    import stripe
+    stripe.api_key = os.getenv("STRIPE_SECRET_KEY") # get stripe data (different locally and on render)
+    return stripe
+
+
+@app.route("/healthz")
+def healthz():
+    return "ok", 200
+
+
 @app.route('/buy-credits', methods=['GET', 'POST'])
 @login_required
 def buy_credits(): # For specifying amount (confusing name, change later??)
@@ -161,7 +180,7 @@ def buy_credits(): # For specifying amount (confusing name, change later??)
 
         price_per_credit_cents = 3
 
-        session = stripe.checkout.Session.create(
+        session = get_stripe().checkout.Session.create(
             payment_method_types=['card'],
             line_items=[{
                 'price_data': {
@@ -203,7 +222,7 @@ def create_checkout_session(): # For bundle (confusing names, change later?)
     if not price:
         return jsonify({"error": "Invalid bundle"}), 400
 
-    session = stripe.checkout.Session.create(
+    session = get_stripe().checkout.Session.create(
         payment_method_types=["card"],
         line_items=[{
             "price_data": {
@@ -234,7 +253,7 @@ def payment_success():
         flash('Missing payment session ID.', 'danger')
         return redirect(url_for('buy_credits'))
 
-    session = stripe.checkout.Session.retrieve(session_id)
+    session = get_stripe().checkout.Session.retrieve(session_id)
 
     if session.payment_status != 'paid':
         flash('Payment was not successful.', 'danger')
@@ -244,7 +263,8 @@ def payment_success():
         # Get credits from metadata (as string, so convert)
         credits = int(session.metadata.get("credits", 0))
 
-        current_user.credits += credits
+        User.query.filter_by(id=current_user.id).update(
+            {User.credits: User.credits + credits}, synchronize_session=False)
         current_user.credits_purchased = session.id
         db.session.commit()
 
@@ -312,7 +332,7 @@ def logout():
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    return user_cache.load_user(int(user_id))
 
 @app.route('/')
 def index(): # MAIN HOMEPAGE
@@ -327,6 +347,11 @@ def index(): # MAIN HOMEPAGE
 @app.route('/upload', methods=['POST'])
 @login_required
 def upload_file():
+    # Checked before the form is parsed, so a refused upload isn't spooled to disk
+    decision = admission.check()
+    if not decision.admitted:
+        return busy_page(decision)
+
     file = request.files.get('audio_file')
     if not file or file.filename == '':
         flash("No file selected", "danger")
@@ -337,11 +362,20 @@ def upload_file():
         flash("Please select at least one output type.", "warning")
         return redirect(url_for('index'))
 
-    audio_path = os.path.join(app.config['UPLOAD_FOLDER'], file.filename)
+    filename = uploads.new_job_filename(file.filename)
+    audio_path = uploads.source_path(app.config['UPLOAD_FOLDER'], filename, file.filename)
     file.save(audio_path)
 
+    size = os.path.getsize(audio_path)
+    UPLOAD_BYTES.labels(source="form").inc(size)
+    job = Job(filename=filename, user_id=current_user.id, source="form", status="uploading",
+              original_filename=file.filename, audio_path=audio_path, outputs=outputs,
+              upload_size=size, upload_offset=size, profiling=wants_profiling(request.form.get('profile')),
+              tempo=fast_mode_tempo(request.form.get('fast_mode')))
+    db.session.add(job)
+
     try:
-        total_credits_needed, duration_minutes = calculate_and_deduct_credits(audio_path, outputs)
+        total_credits_needed, duration_minutes = start_job(job)
     except ValueError as e:
         flash(str(e), "danger")
         return redirect(url_for('index'))
@@ -353,13 +387,195 @@ def upload_file():
           f"({duration_minutes} min × {len(outputs)} outputs). "
           f"You have {current_user.credits} remaining.", "success")
 
-    base_filename = os.path.splitext(file.filename)[0]
+    return render_template("processing.html", filename=filename)
+
+
+def busy_json(decision):
+    admission.refuse(decision)
+    response = jsonify({"error": admission.message(decision), "reason": decision.reason,
+                        "retry_after": decision.retry_after})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(decision.retry_after)
+    return response
+
+
+def busy_page(decision):
+    admission.refuse(decision)
+    flash(admission.message(decision), "warning")
+    response = Response(render_template('upload.html', username=current_user.username,
+                                        credits=current_user.credits), status=429)
+    response.headers['Retry-After'] = str(decision.retry_after)
+    return response
+
+
+def wants_profiling(value):
+    # Only admins can ask for a profiled run
+    return bool(value) and current_user.is_admin
+
+
+def fast_mode_tempo(value):
+    # Speed-up to apply before transcription, or None for normal speed
+    return FAST_MODE_TEMPO if str(value or '').lower() in ('1', 'true', 'on', 'yes') else None
+
+
+def charge_job(job, duration_seconds=None):
+    # Charge for a fully received upload and mark it ready to run
+    try:
+        if duration_seconds is None:
+            try:
+                duration_seconds = get_duration_seconds(job.audio_path)
+            except Exception as e:
+                raise ValueError(f"Failed to read audio: {e}")
+        total_credits_needed, duration_minutes = calculate_and_deduct_credits(
+            job.audio_path, job.outputs, current_user, duration_seconds)
+    except (ValueError, PermissionError):
+        job.status = "failed"
+        uploads.discard(job)
+        db.session.commit()
+        raise
+
+    job.status = "queued"
+    job.credits_charged = total_credits_needed
+    job.duration_seconds = duration_seconds
+    db.session.commit()
+    return total_credits_needed, duration_minutes
+
+
+def start_job(job, duration_seconds=None):
+    # Charge for a fully received upload and hand it to the background worker,
+    # or park it as waiting when the service is at capacity
+    total_credits_needed, duration_minutes = charge_job(job, duration_seconds)
+    decision = admission.check(job.duration_seconds / 60, job=job)
+    if not decision.admitted:
+        admission.park(job, decision)
+    else:
+        scheduler.submit(background_process_file, app, job.audio_path, job.filename, job.outputs,
+                         user_id=current_user.id, cost=duration_minutes, tier=current_user.priority_tier)
+    return total_credits_needed, duration_minutes
+
+
+def get_upload_job(upload_id):
+    return Job.query.filter_by(filename=upload_id, user_id=current_user.id, source="upload").first()
+
+
+def upload_offset_response(job, body=None, status=200):
+    response = jsonify(body) if body is not None else Response(status=status)
+    response.status_code = status
+    response.headers['Upload-Offset'] = str(job.upload_offset)
+    response.headers['Upload-Length'] = str(job.upload_size)
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
+@app.route('/uploads', methods=['POST'])
+@login_required
+def create_upload():
+    data = request.get_json(silent=True) or {}
+    original_filename = str(data.get('filename') or '').strip()
+    outputs = data.get('outputs') or []
+    try:
+        size = int(data.get('size'))
+    except (TypeError, ValueError):
+        size = 0
+
+    if not original_filename or size <= 0:
+        return jsonify({"error": "A filename and a positive size are required."}), 400
+    if not outputs or not isinstance(outputs, list):
+        return jsonify({"error": "Please select at least one output type."}), 400
+    if size > app.config['MAX_UPLOAD_BYTES']:
+        return jsonify({"error": "File is too large."}), 413
+    decision = admission.check()
+    if not decision.admitted:
+        return busy_json(decision)
+
+    filename = uploads.new_job_filename(original_filename)
+    job = Job(filename=filename, user_id=current_user.id, source="upload", status="uploading",
+              original_filename=original_filename,
+              audio_path=uploads.source_path(app.config['UPLOAD_FOLDER'], filename, original_filename),
+              outputs=[str(output) for output in outputs], upload_size=size, upload_offset=0,
+              profiling=wants_profiling(data.get('profile')), tempo=fast_mode_tempo(data.get('fast_mode')))
+    db.session.add(job)
+    db.session.commit()
+
+    response = upload_offset_response(job, {
+        "upload_id": filename,
+        "offset": 0,
+        "chunk_size": app.config['UPLOAD_CHUNK_BYTES'],
+    }, status=201)
+    response.headers['Location'] = url_for('upload_chunk', upload_id=filename)
+    return response
+
+
+@app.route('/uploads/<upload_id>', methods=['GET', 'HEAD'])
+@login_required
+def upload_status(upload_id):
+    job = get_upload_job(upload_id)
+    if not job:
+        return jsonify({"error": "Upload not found"}), 404
+    return upload_offset_response(job, {"offset": job.upload_offset, "size": job.upload_size, "status": job.status})
+
+
+@app.route('/uploads/<upload_id>', methods=['PATCH'])
+@login_required
+def upload_chunk(upload_id):
+    job = get_upload_job(upload_id)
+    if not job:
+        return jsonify({"error": "Upload not found"}), 404
+    if job.status != "uploading":
+        return upload_offset_response(job, {"error": "Upload is already complete", "status": job.status}, status=409)
+
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+    except ValueError:
+        return jsonify({"error": "Missing Upload-Offset header"}), 400
+
+    try:
+        written = uploads.append_chunk(job, request.stream, offset)
+        UPLOAD_BYTES.labels(source="upload").inc(written)
+    except uploads.UploadOffsetMismatch:
+        return upload_offset_response(job, {"error": "Offset mismatch", "offset": job.upload_offset}, status=409)
+    finally:
+        db.session.commit()
+
+    try:
+        uploads.maybe_probe(job)
+    except ValueError as e:
+        job.status = "failed"
+        uploads.discard(job)
+        db.session.commit()
+        return jsonify({"error": str(e)}), 415
+    db.session.commit()
+
+    if job.upload_offset < job.upload_size:
+        return upload_offset_response(job, status=204)
+
+    # Last chunk: hash and format are already known, so processing starts now
+    job.sha256 = uploads.finish_hash(job)
+    try:
+        total_credits_needed, duration_minutes = start_job(job)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 422
+    except PermissionError as e:
+        return jsonify({"error": str(e)}), 402
+
+    return upload_offset_response(job, {
+        "filename": job.filename,
+        "sha256": job.sha256,
+        "credits_deducted": total_credits_needed,
+        "duration_minutes": duration_minutes,
+        "credits_remaining": current_user.credits,
+        "status": job.status,  # "waiting" when admission control parked it
+        "processing_url": url_for('processing', filename=job.filename),
+    })
+
+
+@app.route("/processing")
+@login_required
+def processing():
+    filename = request.args.get("filename")
+    return render_template("processing.html", filename=filename)
 
-    # Fire off background task
-    thread = threading.Thread(target=background_process_file, args=(app, audio_path, base_filename, outputs))
-    thread.start()
 
-    return render_template("processing.html", filename=base_filename)
 @app.route('/upload_link', methods=['POST'])
 @login_required
 def upload_youtube_link():
@@ -377,90 +593,282 @@ def upload_youtube_link():
         flash("YouTube URL is required.", "danger")
         return redirect(url_for('index'))
 
-    # Temporary path for the audio file
-    unique_id = uuid.uuid4().hex
-    output_path = os.path.join("/tmp", f"{unique_id}.%(ext)s")
+    decision = admission.check()
+    if not decision.admitted:
+        return busy_page(decision)
+
+    # Download, credit check and processing all happen in the background; the
+    # processing page follows along through /progress.
+    filename = uuid.uuid4().hex
+    job = Job(filename=filename, user_id=current_user.id, source="youtube", status="downloading", outputs=outputs,
+              source_url=youtube_url, profiling=wants_profiling(request.form.get('profile')),
+              tempo=fast_mode_tempo(request.form.get('fast_mode')))
+    db.session.add(job)
+    db.session.commit()
 
-    # Build yt-dlp command (NO cookies)
-    cmd = [
-        "yt-dlp",
-        youtube_url,
-        "-x",
-        "--audio-format", "mp3",
-        "-o", output_path
-    ]
-    print("Running yt-dlp command:", " ".join(cmd))
+    # The duration (and so the cost) isn't known until the download finishes
+    scheduler.submit(background_process_link, app, youtube_url, filename, outputs, current_user.id,
+                     user_id=current_user.id, tier=current_user.priority_tier)
+
+    return render_template('processing.html', filename=filename)
 
+
+VALID_OUTPUTS = ('transcript', 'summary', 'latex_transcript', 'latex_summary')
+BATCH_MAX_ITEMS = int(os.getenv('BATCH_MAX_ITEMS', '50'))
+BATCH_MAX_PARALLEL = int(os.getenv('BATCH_MAX_PARALLEL', '4'))
+
+
+@app.route('/api/batches', methods=['POST'])
+@login_required
+def create_batch():
+    # Accepts multipart (files plus form fields) or JSON (links only):
+    #   outputs, urls, playlist_url, max_parallel, auto_finalize, fast_mode
+    decision = admission.check()
+    if not decision.admitted:
+        return busy_json(decision)
+    if request.is_json:
+        data = request.get_json(silent=True) or {}
+        outputs = data.get('outputs') or []
+        urls = data.get('urls') or []
+        playlist_url = data.get('playlist_url')
+        max_parallel = data.get('max_parallel', 2)
+        auto_finalize = bool(data.get('auto_finalize'))
+        tempo = fast_mode_tempo(data.get('fast_mode'))
+        files = []
+    else:
+        outputs = request.form.getlist('outputs')
+        urls = request.form.getlist('urls')
+        playlist_url = request.form.get('playlist_url')
+        max_parallel = request.form.get('max_parallel', 2)
+        auto_finalize = request.form.get('auto_finalize') in ('1', 'true', 'on')
+        tempo = fast_mode_tempo(request.form.get('fast_mode'))
+        files = [f for f in request.files.getlist('files') if f and f.filename]
+
+    if not isinstance(outputs, list) or not outputs or any(output not in VALID_OUTPUTS for output in outputs):
+        return jsonify({"error": f"outputs must be a non-empty list of {', '.join(VALID_OUTPUTS)}."}), 400
+    if not isinstance(urls, list):
+        return jsonify({"error": "urls must be a list."}), 400
     try:
-        result = subprocess.run(cmd, check=True, capture_output=True, text=True)
-        audio_path = output_path.replace("%(ext)s", "mp3")
-
-        success, message = calculate_and_deduct_credits(audio_path, outputs)
-        if not success:
-            os.remove(audio_path)
-            flash(message, "warning")
-            print("Not enough credits, audio file removed.")
-            return redirect(url_for('index'))
-        flash(message, "success")
-        print("Download successful, audio path:", audio_path)
-
-    except subprocess.CalledProcessError as e:
-        print("Error downloading video:", e, e.stderr)
-        stderr = e.stderr or ""
-        if "This video is age restricted" in stderr or "Sign in to confirm your age" in stderr or "HTTP Error 403" in stderr:
-            flash("This video is age-restricted, private, or unavailable without login. Please try another video.", "danger")
-        else:
-            flash("Download failed. Please make sure the link is valid and the video is public.", "danger")
-        return redirect(url_for('index'))
+        max_parallel = min(max(int(max_parallel), 1), BATCH_MAX_PARALLEL)
+    except (TypeError, ValueError):
+        return jsonify({"error": "max_parallel must be a number."}), 400
+
+    urls = [str(url).strip() for url in urls if str(url).strip()]
+    playlist_url = str(playlist_url).strip() if playlist_url else None
+    if not files and not urls and not playlist_url:
+        return jsonify({"error": "Add at least one file, URL or playlist."}), 400
+    # The playlist is read by a background task and fills whatever room is left
+    playlist_limit = BATCH_MAX_ITEMS - len(files) - len(urls)
+    if playlist_limit < 0 or (playlist_url and playlist_limit == 0):
+        return jsonify({"error": f"A batch can hold at most {BATCH_MAX_ITEMS} items."}), 400
+
+    batch = Batch(public_id=uuid.uuid4().hex, user_id=current_user.id, max_parallel=max_parallel,
+                  auto_finalize=auto_finalize, playlist_url=playlist_url,
+                  playlist_status="expanding" if playlist_url else None)
+    db.session.add(batch)
+    db.session.commit()
 
-    except Exception as e:
-        print(e)
-        print("Error")
-        flash(f"Unexpected error: {e}", "danger")
-        return redirect(url_for('index'))
+    items = []
+    for file in files:
+        filename = uploads.new_job_filename(file.filename)
+        audio_path = uploads.source_path(app.config['UPLOAD_FOLDER'], filename, file.filename)
+        file.save(audio_path)
+        size = os.path.getsize(audio_path)
+        UPLOAD_BYTES.labels(source="api").inc(size)
+        job = Job(filename=filename, user_id=current_user.id, source="api", status="uploading",
+                  original_filename=file.filename, audio_path=audio_path, outputs=outputs,
+                  upload_size=size, upload_offset=size, batch_id=batch.id, tempo=tempo)
+        db.session.add(job)
+        item = {"job_id": filename, "source": "file", "name": file.filename}
+        try:
+            item["credits_charged"], _ = charge_job(job)
+        except (ValueError, PermissionError) as e:
+            item["error"] = str(e)
+        item["status"] = job.status
+        items.append(item)
+
+    for url in urls:
+        # Charged after download, once the duration is known
+        filename = uuid.uuid4().hex
+        db.session.add(Job(filename=filename, user_id=current_user.id, source="youtube", status="queued",
+                           outputs=outputs, source_url=url, batch_id=batch.id, tempo=tempo))
+        items.append({"job_id": filename, "source": "youtube", "name": url, "status": "queued"})
+    db.session.commit()
 
-    # Background processing
-    filename = os.path.splitext(os.path.basename(audio_path))[0]
-    thread = threading.Thread(target=background_process_file, args=(app, audio_path, filename, outputs))
-    thread.start()
+    if not playlist_url and not any(item["status"] == "queued" for item in items):
+        return jsonify({"batch_id": batch.public_id, "jobs": items,
+                        "error": "None of the items could be started."}), 402
 
-    return render_template('processing.html', filename=filename)
+    if playlist_url:
+        # Starts the rest of the batch once the playlist's jobs are added
+        scheduler.submit(background_expand_playlist, app, batch.id, playlist_limit, outputs, tempo,
+                         current_user.priority_tier, user_id=current_user.id, tier=current_user.priority_tier)
+    else:
+        background_process_batch(app, batch.id, current_user.priority_tier)
+    response = jsonify({"batch_id": batch.public_id, "max_parallel": max_parallel,
+                        "auto_finalize": auto_finalize, "playlist": playlist_json(batch), "jobs": items})
+    response.status_code = 201
+    response.headers['Location'] = url_for('batch_status', batch_id=batch.public_id)
+    return response
+
+
+def playlist_json(batch):
+    if not batch.playlist_url:
+        return None
+    playlist = {"url": batch.playlist_url, "status": batch.playlist_status}
+    if batch.playlist_status == "failed":
+        playlist["error"] = "Could not read the playlist. Make sure it is public."
+    return playlist
+
+
+@app.route('/api/batches/<batch_id>')
+@login_required
+def batch_status(batch_id):
+    # Every job in the batch in one query, with its result state, so clients
+    # don't poll check_results/download_ready once per file
+    batch = Batch.query.filter_by(public_id=batch_id, user_id=current_user.id).first()
+    if batch is None:
+        return jsonify({"error": "Batch not found"}), 404
+    rows = (db.session.query(Job.filename, Job.source, Job.original_filename, Job.source_url, Job.status,
+                             Job.credits_charged, Results.status, Results.zip_ready)
+            .outerjoin(Results, Results.filename == Job.filename)
+            .filter(Job.batch_id == batch.id)
+            .order_by(Job.id)
+            .all())
+
+    jobs = []
+    counts = {}
+    auto_finalize = batch.auto_finalize
+    for filename, source, original_filename, source_url, status, credits_charged, result_status, zip_ready in rows:
+        counts[status] = counts.get(status, 0) + 1
+        jobs.append({
+            "job_id": filename,
+            "source": source,
+            "name": original_filename or source_url,
+            "status": status,
+            "credits_charged": credits_charged,
+            "results_ready": result_status == "ready",
+            "download_ready": bool(zip_ready),
+            "progress_url": url_for('progress', filename=filename),
+            "edit_url": url_for('check_results', filename=filename),
+            "download_url": url_for('download_zip', filename=filename),
+        })
+    return jsonify({
+        "batch_id": batch_id,
+        "total": len(jobs),
+        "counts": counts,
+        "playlist": playlist_json(batch),
+        # Without auto_finalize a job waits at "ready" for the user to edit and finalize it
+        "finished": batch.playlist_status != "expanding" and
+                    all(job["status"] in (("done", "failed") if auto_finalize else ("ready", "done", "failed"))
+                        for job in jobs),
+        "jobs": jobs,
+    })
 
 
 @app.route('/check_results/<filename>')
 @login_required
 def check_results(filename):
-    result = Results.query.filter_by(filename=filename).first()
-    if result:
-        return render_template(
-            "edit_outputs.html",
-            formatted_transcript=result.transcript,
-            summary=result.summary,
-            filename=filename,
-            selected_outputs=result.outputs
-        )
-    else:
+    row = db.session.query(Results.status, Results.outputs).filter_by(filename=filename).first()
+    if row is None or row.status != "ready":
         return "", 202  # Not ready yet
 
+    # The page only carries the outputs; the editor fetches the text in chunks
+    editor_chunks.ensure_chunks(filename)
+    return render_template(
+        "edit_outputs.html",
+        filename=filename,
+        selected_outputs=row.outputs,
+        page_size=EDITOR_PAGE_SIZE,
+    )
+
+
+EDITOR_PAGE_SIZE = 10
+EDITOR_MAX_PAGE_SIZE = 100
+
+
+def editable_job(filename, user_id):
+    # The job's status, or None if it isn't this user's. Edits are only taken
+    # in editor_chunks.EDITABLE_STATUSES; /finalize moves it on to "finalizing".
+    # Results from before jobs were tracked have no Job row (and no owner), so
+    # they go by the Results row as the edit page always did.
+    status = db.session.query(Job.status).filter_by(filename=filename, user_id=user_id).scalar()
+    if status is None and db.session.query(Job.id).filter_by(filename=filename).first() is None:
+        status = db.session.query(Results.status).filter_by(filename=filename).scalar()
+    return status
+
+
+@app.route('/transcript/<filename>/<kind>')
+@login_required
+def transcript_chunks(filename, kind):
+    if kind not in editor_chunks.KINDS:
+        abort(404)
+    if editable_job(filename, current_user.id) is None:
+        return jsonify({"error": "Job not found"}), 404
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', EDITOR_PAGE_SIZE, type=int)
+    if page < 1 or not 1 <= per_page <= EDITOR_MAX_PAGE_SIZE:
+        return jsonify({"error": f"page must be 1 or more and per_page 1 to {EDITOR_MAX_PAGE_SIZE}."}), 400
+
+    total, rows = editor_chunks.load_page(filename, kind, page, per_page)
+    return jsonify({
+        "kind": kind,
+        "page": page,
+        "per_page": per_page,
+        "total": total,
+        "next_page": page + 1 if page * per_page < total else None,
+        "chunks": [{"position": row.position, "text": row.text, "version": row.version} for row in rows],
+    })
+
+
+@app.route('/transcript/<filename>/<kind>/<int:position>', methods=['PATCH'])
+@login_required
+def save_transcript_chunk(filename, kind, position):
+    if kind not in editor_chunks.KINDS:
+        abort(404)
+    status = editable_job(filename, current_user.id)
+    if status is None:
+        return jsonify({"error": "Job not found"}), 404
+    if status not in editor_chunks.EDITABLE_STATUSES:
+        return jsonify({"error": "This job can't be edited any more."}), 409
+    body = request.get_json(silent=True) or {}
+    text, version = body.get("text"), body.get("version")
+    if not isinstance(text, str) or not isinstance(version, int):
+        return jsonify({"error": "Send the chunk's text and the version it was loaded at."}), 400
+
+    # Browsers submit textareas with CRLF line breaks
+    new_version = editor_chunks.save_edit(filename, kind, position, text.replace("\r\n", "\n"), version)
+    if new_version is None and editable_job(filename, current_user.id) not in editor_chunks.EDITABLE_STATUSES:
+        return jsonify({"error": "This job can't be edited any more."}), 409  # finalized meanwhile
+    if new_version is None:
+        # Saved elsewhere since it was loaded (or it doesn't exist): send back what's stored
+        _, rows = editor_chunks.load_page(filename, kind, position + 1, 1)
+        if not rows:
+            return jsonify({"error": "Chunk not found"}), 404
+        return jsonify({"error": "This part was changed in another window.",
+                        "position": position, "text": rows[0].text, "version": rows[0].version}), 409
+    return jsonify({"position": position, "version": new_version})
+
+
 @app.route('/finalize', methods=['POST'])
 @login_required
 def finalize_edits():
-    edited_transcript = request.form.get("transcript", "").strip()
-    edited_summary = request.form.get("summary", "").strip()
+    # The edits are already saved chunk by chunk; the documents are put back
+    # together from the server-side copy when the task runs
     filename = request.form.get("filename", "output").strip() or "output"
     outputs = request.form.getlist('outputs')
 
-    if not edited_transcript and not edited_summary:
+    if editable_job(filename, current_user.id) is None:
         return "No transcript or summary content to generate PDFs from.", 400
+    # Claims the job, so a second submit can't start another render and
+    # chunk edits stop being accepted. A failed render can be submitted again.
+    if not editor_chunks.claim_finalize(filename, current_user.id):
+        return "These outputs are already being generated.", 409
 
-    thread = threading.Thread(target=background_generate_outputs, args=(
-        app,
-        edited_transcript,
-        edited_summary,
-        filename,
-        outputs
-    ))
-    thread.start()
+    duration = db.session.query(Job.duration_seconds).filter_by(filename=filename).scalar()
+    scheduler.submit(finalize_saved, app, filename, outputs,
+                     user_id=current_user.id, tier=current_user.priority_tier,
+                     cost=duration / 60 if duration else None)
 
     return render_template("processing_final.html", filename=filename)
 
@@ -474,12 +882,43 @@ def processing_final():
 @app.route("/download_ready/<filename>")
 @login_required
 def download_ready(filename):
-    result = Results.query.filter_by(filename=filename).first()
-    if result and result.zip_ready:
+    if db.session.query(Results.zip_ready).filter_by(filename=filename).scalar():
         return "", 200
     return "", 202
 
 
+def status_snapshot(filename, user_id):
+    # Only the small columns: no documents or ZIP data
+    row = db.session.query(Job.status, Results.status, Results.zip_ready, Results.prerender_status) \
+        .outerjoin(Results, Results.filename == Job.filename) \
+        .filter(Job.filename == filename, Job.user_id == user_id).first()
+    if row is None:
+        return None
+    job_status, results_status, zip_ready, prerender_status = row
+    return {
+        "filename": filename,
+        "status": job_status,
+        "results_status": results_status,
+        "results_ready": results_status == "ready",
+        "zip_ready": bool(zip_ready),
+        "prerender_status": prerender_status,
+    }
+
+
+@app.route('/status/<filename>')
+@login_required
+def job_status(filename):
+    # Cheap polling: an ETag that matches If-None-Match gets a 304
+    status = status_snapshot(filename, current_user.id)
+    if status is None:
+        return jsonify({"error": "Job not found"}), 404
+    etag = hashlib.sha1(json.dumps(status, sort_keys=True).encode()).hexdigest()[:20]
+    response = Response(status=304) if request.if_none_match.contains(etag) else jsonify(status)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
 @app.route('/download_zip/<filename>')
 @login_required
 def download_zip(filename):
@@ -502,6 +941,8 @@ def download_zip(filename):
     try:
         Progress.query.filter_by(filename=filename, phase="phase1").delete()
         Progress.query.filter_by(filename=filename, phase="phase2").delete()
+        LatexChunk.query.filter_by(filename=filename).delete()
+        editor_chunks.delete_chunks(filename)
         db.session.delete(result)  # ✅ Delete the result entry
 
         db.session.commit()
@@ -510,6 +951,71 @@ def download_zip(filename):
 
     return response
 
+def admin_required(view):
+    @wraps(view)
+    @login_required
+    def wrapped(*args, **kwargs):
+        if not current_user.is_admin:
+            abort(403)
+        return view(*args, **kwargs)
+    return wrapped
+
+
+@app.route('/admin/jobs/<filename>/profiling', methods=['POST'])
+@admin_required
+def toggle_job_profiling(filename):
+    job = Job.query.filter_by(filename=filename).first()
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+
+    data = request.get_json(silent=True) or request.form
+    job.profiling = str(data.get('enabled', 'true')).lower() in ('1', 'true', 'on', 'yes')
+    db.session.commit()
+    # Takes effect from the job's next phase if it is already running
+    return jsonify({"filename": filename, "profiling": job.profiling, "status": job.status})
+
+
+@app.route('/admin/jobs/<filename>/profile')
+@admin_required
+def download_job_profile(filename):
+    profiles = JobProfile.query.filter_by(filename=filename).order_by(JobProfile.id).all()
+    if not profiles:
+        return jsonify({"error": "No profile recorded for this job"}), 404
+
+    memory_file = io.BytesIO()
+    with zipfile.ZipFile(memory_file, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for profile in profiles:
+            zf.writestr(profile.name, profile.data)
+    memory_file.seek(0)
+
+    return send_file(
+        memory_file,
+        mimetype='application/zip',
+        as_attachment=True,
+        download_name=f"{filename}_profile.zip"
+    )
+
+
+@app.route('/admin/usage')
+@admin_required
+def usage_report():
+    # Measured API usage and cost by stage and model, and per job against the
+    # credits it was charged
+    try:
+        days = min(max(int(request.args.get('days', 30)), 1), 365)
+    except ValueError:
+        return jsonify({"error": "days must be a number."}), 400
+    return jsonify(usage.report(days))
+
+
+@app.route("/metrics")
+def prometheus_metrics():
+    token = os.getenv("METRICS_TOKEN")
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        return "", 401
+    data, content_type = metrics.render_latest()
+    return Response(data, content_type=content_type)
+
 @app.route("/success")
 @login_required
 def success():
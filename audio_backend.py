@@ -0,0 +1,45 @@
+import os
+import sys
+import threading
+
+# pydub is imported, and ffmpeg located, the first time audio is actually
+# decoded rather than when the app module is imported.
+
+_lock = threading.Lock()
+_configured = False
+
+
+def set_ffmpeg_path():
+    from pydub import AudioSegment
+    from pydub.utils import which
+
+    # Detect OS platform
+    if sys.platform == "win32":
+        # Windows: expect ffmpeg.exe in bin folder
+        ffmpeg_path = os.path.join(os.path.dirname(__file__), "bin", "ffmpeg.exe")
+        if not os.path.isfile(ffmpeg_path):
+            # fallback to system ffmpeg if local binary missing
+            ffmpeg_path = which("ffmpeg")
+    else:
+        # Linux/Mac: expect ffmpeg static binary in bin folder
+        ffmpeg_path = os.path.join(os.path.dirname(__file__), "bin", "ffmpeg")
+        if not os.path.isfile(ffmpeg_path):
+            # fallback to system ffmpeg if local binary missing
+            ffmpeg_path = which("ffmpeg")
+
+    if ffmpeg_path is None:
+        raise RuntimeError("FFmpeg binary not found! Please provide ffmpeg in bin/ or install globally.")
+
+    AudioSegment.converter = ffmpeg_path
+
+
+def get_audio_segment():
+    global _configured
+    from pydub import AudioSegment
+
+    if not _configured:
+        with _lock:
+            if not _configured:
+                set_ffmpeg_path()
+                _configured = True
+    return AudioSegment
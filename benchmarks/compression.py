@@ -0,0 +1,139 @@
+"""Transcript compression benchmark: ratio, encode/decode latency and DB size.
+
+    python -m benchmarks.compression                          # synthetic transcripts
+    python -m benchmarks.compression --database-url sqlite:///instance/app.db
+
+Texts are split in half: a zstd dictionary is trained on one half and every
+variant is measured on the other. With --database-url the stored transcripts
+and summaries are used (decoded through the app's model), otherwise synthetic
+lecture-like text from the fake OpenAI server. SQLite files holding the test
+texts as plain TEXT and as compressed BLOBs stand in for the database and
+page-cache footprint.
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+import zstandard
+
+from benchmarks.fake_openai import fake_words
+from benchmarks.run_pipeline import REPO_ROOT, RESULTS_DIR, git_commit
+
+
+def synthetic_texts(count, seed=0):
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(count):
+        words = rng.choice([300, 2000, 12000, 40000])  # summaries up to 3-hour lectures
+        paragraphs = [fake_words(rng, rng.randint(60, 180)) for _ in range(max(words // 120, 1))]
+        texts.append("\n\n".join(paragraphs))
+    return texts
+
+
+def stored_texts(database_url, limit):
+    os.environ["DATABASE_URL"] = database_url
+    sys.path.insert(0, REPO_ROOT)
+    from app import app
+    from models import db
+    from models.results import Results
+
+    with app.app_context():
+        rows = db.session.query(Results.transcript, Results.summary).order_by(Results.id.desc()).limit(limit).all()
+    return [text for row in rows for text in row if text]
+
+
+def timed(fn, values):
+    out, times = [], []
+    for value in values:
+        start = time.perf_counter()
+        out.append(fn(value))
+        times.append((time.perf_counter() - start) * 1000)
+    return out, times
+
+
+def db_footprint(rows, column_type):
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "size.db")
+        with sqlite3.connect(path) as conn:
+            conn.execute(f"CREATE TABLE results (id INTEGER PRIMARY KEY, transcript {column_type})")
+            conn.executemany("INSERT INTO results (transcript) VALUES (?)", [(row,) for row in rows])
+        conn.close()
+        size = os.path.getsize(path)
+        with sqlite3.connect(path) as conn:
+            start = time.perf_counter()
+            for _ in conn.execute("SELECT transcript FROM results"):
+                pass
+            scan = time.perf_counter() - start
+        conn.close()
+    return {"file_bytes": size, "full_scan_ms": round(scan * 1000, 2)}
+
+
+def measure(name, compressor, decompressor, texts):
+    raw = [text.encode("utf-8") for text in texts]
+    frames, encode_ms = timed(compressor.compress, raw)
+    _, decode_ms = timed(decompressor.decompress, frames)
+    raw_bytes, compressed_bytes = sum(map(len, raw)), sum(map(len, frames))
+    small = [(len(r), len(f)) for r, f in zip(raw, frames) if len(r) < 8192]
+    return {
+        "variant": name,
+        "ratio": round(raw_bytes / compressed_bytes, 2),
+        "small_text_ratio": round(sum(r for r, _ in small) / sum(f for _, f in small), 2) if small else None,
+        "encode_ms_p50": round(statistics.median(encode_ms), 3),
+        "encode_ms_max": round(max(encode_ms), 3),
+        "decode_ms_p50": round(statistics.median(decode_ms), 3),
+        "decode_ms_max": round(max(decode_ms), 3),
+        "db": db_footprint(frames, "BLOB"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=200, help="synthetic texts to generate")
+    parser.add_argument("--database-url", help="measure stored transcripts instead")
+    parser.add_argument("--limit", type=int, default=1000)
+    parser.add_argument("--levels", type=int, nargs="+", default=[3, 6, 12])
+    parser.add_argument("--dict-size", type=int, default=112640)
+    args = parser.parse_args()
+
+    texts = stored_texts(args.database_url, args.limit) if args.database_url else synthetic_texts(args.count)
+    random.Random(1).shuffle(texts)
+    training, test = texts[:len(texts) // 2], texts[len(texts) // 2:]
+    samples = [p.encode("utf-8") for text in training for p in text.split("\n\n") if p.strip()]
+    dictionary = zstandard.train_dictionary(args.dict_size, samples)
+
+    raw_bytes = sum(len(text.encode("utf-8")) for text in test)
+    print(f"{len(test)} test texts, {raw_bytes} bytes; dictionary trained on {len(samples)} paragraphs")
+    variants = []
+    for level in args.levels:
+        variants.append(measure(f"zstd-{level}", zstandard.ZstdCompressor(level=level),
+                                zstandard.ZstdDecompressor(), test))
+        variants.append(measure(f"zstd-{level}+dict", zstandard.ZstdCompressor(level=level, dict_data=dictionary),
+                                zstandard.ZstdDecompressor(dict_data=dictionary), test))
+    plain = db_footprint(test, "TEXT")
+    print(f"  plain TEXT: {plain['file_bytes']} bytes on disk, full scan {plain['full_scan_ms']} ms")
+    for v in variants:
+        print(f"  {v['variant']}: ratio {v['ratio']} (small texts {v['small_text_ratio']}), "
+              f"encode p50 {v['encode_ms_p50']} ms, decode p50 {v['decode_ms_p50']} ms, "
+              f"{v['db']['file_bytes']} bytes on disk, full scan {v['db']['full_scan_ms']} ms")
+
+    timestamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    run = {"timestamp": timestamp, "commit": git_commit(),
+           "config": {"source": "database" if args.database_url else "synthetic", "texts": len(texts),
+                      "levels": args.levels, "dict_size": args.dict_size},
+           "raw_bytes": raw_bytes, "plain_db": plain, "variants": variants}
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"compression-{timestamp}-{run['commit']}.json")
+    with open(path, "w") as f:
+        json.dump(run, f, indent=2)
+    print(f"Saved {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""Local stand-in for the OpenAI endpoints the pipeline calls.
+
+Run standalone with `python -m benchmarks.fake_openai --port 8765` and point the
+app at it with OPENAI_BASE_URL=http://127.0.0.1:8765/v1, or start it in-process
+with `start_server()`.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = (
+    "the energy of the system is conserved so we can write the integral over "
+    "time and compare it with the potential which gives us a differential "
+    "equation that we solve using separation of variables then we check the "
+    "boundary conditions and look at what happens in the limit"
+).split()
+
+
+class FakeOpenAIConfig:
+    def __init__(self, latency=0.05, rate_limit_rate=0.0, tokens_per_second=400.0,
+                 words_per_audio_second=2.5, audio_bytes_per_second=16000, seed=0, stream_drop_rate=0.0,
+                 transcription_speed=0.0):
+        self.latency = latency                          # fixed delay before every response
+        self.rate_limit_rate = rate_limit_rate          # fraction of requests answered with 429
+        self.tokens_per_second = tokens_per_second      # simulated generation speed
+        self.words_per_audio_second = words_per_audio_second
+        self.audio_bytes_per_second = audio_bytes_per_second  # 128 kbps MP3
+        self.stream_drop_rate = stream_drop_rate        # fraction of streams cut off half way
+        self.transcription_speed = transcription_speed  # extra seconds of processing per second of audio
+        self.random = random.Random(seed)
+
+
+class FakeOpenAIStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def record(self, endpoint, status, prompt_tokens=0, completion_tokens=0):
+        with self.lock:
+            key = f"{endpoint} {status}"
+            self.calls[key] = self.calls.get(key, 0) + 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "calls": dict(self.calls),
+                "total_calls": sum(self.calls.values()),
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+            }
+
+
+def approx_tokens(text):
+    return max(1, len(text) // 4)
+
+
+def fake_words(rng, count):
+    words = [rng.choice(WORDS) for _ in range(count)]
+    sentences = []
+    for i in range(0, len(words), 14):
+        sentence = " ".join(words[i:i + 14])
+        sentences.append(sentence[:1].upper() + sentence[1:] + ".")
+    return " ".join(sentences)
+
+
+def fake_completion(prompt_text, rng):
+    body = prompt_text.split("\n", 1)[1] if "\n" in prompt_text else prompt_text
+    if "LaTeX" in prompt_text:
+        paragraphs = [p.strip() for p in body.split("\n") if p.strip()]
+        return "\\section*{Notes}\n\n" + "\n\n".join(paragraphs)
+    if "summar" in prompt_text.lower():
+        return "Lecture Summary\n\n" + fake_words(rng, 180)
+    # Formatting: echo the text back with paragraph breaks
+    sentences = re.split(r"(?<=[.!?])\s+", body.strip())
+    return "\n\n".join(" ".join(sentences[i:i + 5]) for i in range(0, len(sentences), 5))
+
+
+def fake_segments(rng, text, seconds):
+    # One segment per sentence, spread over the audio with the odd long pause
+    sentences = re.split(r"(?<=[.!?])\s+", text.strip())
+    step = seconds / len(sentences)
+    segments = []
+    for i, sentence in enumerate(sentences):
+        start = i * step
+        end = start + step * (0.4 if rng.random() < 0.15 else 0.9)
+        segments.append({"id": i, "start": round(start, 2), "end": round(end, 2), "text": " " + sentence})
+    return segments
+
+
+def make_handler(config, stats):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def send_json(self, status, payload, headers=None):
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/_stats":
+                self.send_json(200, stats.snapshot())
+            else:
+                self.send_json(404, {"error": {"message": "not found"}})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            body = self.rfile.read(length)
+            time.sleep(config.latency)
+
+            endpoint = self.path.split("?")[0]
+            if config.rate_limit_rate and config.random.random() < config.rate_limit_rate:
+                stats.record(endpoint, 429)
+                self.send_json(429, {"error": {"message": "Rate limit reached", "type": "requests"}},
+                               headers={"retry-after-ms": "200"})
+                return
+
+            if endpoint.endswith("/audio/transcriptions"):
+                self.handle_transcription(endpoint, body)
+            elif endpoint.endswith("/chat/completions"):
+                self.handle_chat(endpoint, json.loads(body or b"{}"))
+            else:
+                stats.record(endpoint, 404)
+                self.send_json(404, {"error": {"message": "not found"}})
+
+        def handle_transcription(self, endpoint, body):
+            seconds = len(body) / config.audio_bytes_per_second
+            time.sleep(seconds * config.transcription_speed)
+            text = fake_words(config.random, int(seconds * config.words_per_audio_second) or 1)
+            stats.record(endpoint, 200)
+            if b"verbose_json" not in body:
+                self.send_json(200, {"text": text})
+                return
+            self.send_json(200, {"text": text, "duration": seconds,
+                                 "segments": fake_segments(config.random, text, seconds)})
+
+        def handle_chat(self, endpoint, payload):
+            prompt_text = "\n".join(str(m.get("content", "")) for m in payload.get("messages", [])[1:])
+            content = fake_completion(prompt_text, config.random)
+            prompt_tokens = approx_tokens(prompt_text)
+            completion_tokens = approx_tokens(content)
+            usage = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            }
+            if payload.get("stream"):
+                self.stream_chat(endpoint, payload, content, usage)
+                return
+            time.sleep(completion_tokens / config.tokens_per_second)
+
+            stats.record(endpoint, 200, prompt_tokens, completion_tokens)
+            self.send_json(200, {
+                "id": f"chatcmpl-{uuid.uuid4().hex}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": payload.get("model", "fake"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            })
+
+        def stream_chat(self, endpoint, payload, content, usage):
+            # Server-sent chat.completion.chunk events, one per ~4 characters,
+            # paced at tokens_per_second like the non-streaming response
+            chunk_id = f"chatcmpl-{uuid.uuid4().hex}"
+            base = {"id": chunk_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                    "model": payload.get("model", "fake")}
+            pieces = [content[i:i + 4] for i in range(0, len(content), 4)]
+            drop_at = len(pieces) // 2 if config.random.random() < config.stream_drop_rate else None
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            def send_event(data):
+                body = f"data: {data}\n\n".encode()
+                self.wfile.write(f"{len(body):x}\r\n".encode() + body + b"\r\n")
+                self.wfile.flush()
+
+            send_event(json.dumps({**base, "choices": [{"index": 0, "delta": {"role": "assistant", "content": ""},
+                                                        "finish_reason": None}]}))
+            delay = 1 / config.tokens_per_second
+            for i, piece in enumerate(pieces):
+                if i == drop_at:
+                    stats.record(endpoint, "dropped", usage["prompt_tokens"], i)
+                    self.close_connection = True
+                    return  # no terminating chunk, so the client sees a broken stream
+                time.sleep(delay)
+                send_event(json.dumps({**base, "choices": [{"index": 0, "delta": {"content": piece},
+                                                            "finish_reason": None}]}))
+            send_event(json.dumps({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}))
+            if (payload.get("stream_options") or {}).get("include_usage"):
+                send_event(json.dumps({**base, "choices": [], "usage": usage}))
+            send_event("[DONE]")
+            self.wfile.write(b"0\r\n\r\n")
+            stats.record(endpoint, 200, usage["prompt_tokens"], usage["completion_tokens"])
+
+    return Handler
+
+
+def start_server(config=None, host="127.0.0.1", port=0):
+    config = config or FakeOpenAIConfig()
+    stats = FakeOpenAIStats()
+    server = ThreadingHTTPServer((host, port), make_handler(config, stats))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--tokens-per-second", type=float, default=400.0)
+    parser.add_argument("--stream-drop-rate", type=float, default=0.0)
+    parser.add_argument("--transcription-speed", type=float, default=0.0)
+    args = parser.parse_args()
+
+    config = FakeOpenAIConfig(args.latency, args.rate_limit_rate, args.tokens_per_second,
+                              stream_drop_rate=args.stream_drop_rate,
+                              transcription_speed=args.transcription_speed)
+    server, _ = start_server(config, args.host, args.port)
+    print(f"Fake OpenAI listening on http://{args.host}:{server.server_address[1]}/v1")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
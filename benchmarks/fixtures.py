@@ -0,0 +1,59 @@
+"""Synthetic audio fixtures for the pipeline benchmarks.
+
+Tones gated on and off every few seconds stand in for speech with pauses, so
+chunking, silence handling and file-size behaviour look like a real lecture
+without shipping recordings in the repo.
+"""
+import argparse
+import os
+import subprocess
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+DEFAULT_MINUTES = (1, 10, 60)
+DEFAULT_FORMATS = ("mp3", "wav", "m4a")
+
+# A 180 Hz voice-ish tone, on for roughly 70% of every 5 seconds
+SOURCE = "aevalsrc='0.4*sin(2*PI*180*t)*gt(sin(2*PI*0.2*t)+0.3,0)':s=16000"
+
+CODEC_ARGS = {
+    "mp3": ["-c:a", "libmp3lame", "-b:a", "128k"],
+    "wav": ["-c:a", "pcm_s16le"],
+    "m4a": ["-c:a", "aac", "-b:a", "96k"],
+}
+
+
+def fixture_path(minutes, fmt, fixture_dir=FIXTURE_DIR):
+    return os.path.join(fixture_dir, f"synthetic-{minutes}min.{fmt}")
+
+
+def generate(minutes, fmt, fixture_dir=FIXTURE_DIR, ffmpeg="ffmpeg"):
+    path = fixture_path(minutes, fmt, fixture_dir)
+    if os.path.exists(path):
+        return path
+
+    os.makedirs(fixture_dir, exist_ok=True)
+    subprocess.run(
+        [ffmpeg, "-y", "-loglevel", "error", "-f", "lavfi", "-i", SOURCE,
+         "-t", str(minutes * 60), "-ac", "1", *CODEC_ARGS[fmt], path],
+        check=True,
+    )
+    return path
+
+
+def ensure_fixtures(minutes=DEFAULT_MINUTES, formats=DEFAULT_FORMATS, fixture_dir=FIXTURE_DIR):
+    return [generate(m, f, fixture_dir) for m in minutes for f in formats]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--minutes", type=int, nargs="+", default=list(DEFAULT_MINUTES))
+    parser.add_argument("--formats", nargs="+", default=list(DEFAULT_FORMATS), choices=sorted(CODEC_ARGS))
+    parser.add_argument("--dir", default=FIXTURE_DIR)
+    args = parser.parse_args()
+
+    for path in ensure_fixtures(args.minutes, args.formats, args.dir):
+        print(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""End-to-end pipeline benchmark against the fake OpenAI server.
+
+    python -m benchmarks.run_pipeline --minutes 1 10 --formats mp3 wav
+    python -m benchmarks.run_pipeline --compare benchmarks/results/<earlier run>.json
+
+Each fixture runs in its own child process so peak RSS is per case. Results are
+written to benchmarks/results/ as JSON for later comparison.
+"""
+import argparse
+import datetime
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks import fixtures
+from benchmarks.fake_openai import FakeOpenAIConfig, start_server
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+DEFAULT_OUTPUTS = ["transcript", "summary", "latex_transcript", "latex_summary"]
+RESULT_MARKER = "BENCH_RESULT "
+
+
+def stage_totals():
+    from prometheus_client import REGISTRY
+
+    totals = {}
+    for metric in REGISTRY.collect():
+        if metric.name != "simplytranscribe_stage_duration_seconds":
+            continue
+        for sample in metric.samples:
+            stage = sample.labels.get("stage")
+            if sample.name.endswith("_sum"):
+                totals.setdefault(stage, {})["seconds"] = round(sample.value, 4)
+            elif sample.name.endswith("_count"):
+                totals.setdefault(stage, {})["count"] = int(sample.value)
+    return totals
+
+
+def run_case(audio_path, outputs):
+    # Runs inside the child process: an isolated database, upload folder and RSS
+    workdir = tempfile.mkdtemp(prefix="simplytranscribe-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ.pop("PROMETHEUS_MULTIPROC_DIR", None)
+    # A pre-render queued after phase 1 would race phase 2 and, when it wins,
+    # make it a cache hit; export PRERENDER_OUTPUTS=1 to measure that path instead
+    os.environ.setdefault("PRERENDER_OUTPUTS", "0")
+    sys.path.insert(0, REPO_ROOT)
+    os.chdir(workdir)
+
+    from app import app
+    from models import db
+    from models.progress import Progress
+    from models.results import Results
+    from tasks import background_generate_outputs, background_process_file
+
+    with app.app_context():
+        db.create_all()
+
+    filename = "bench"
+    source = os.path.join(workdir, os.path.basename(audio_path))
+    shutil.copyfile(audio_path, source)
+
+    start = time.perf_counter()
+    background_process_file(app, source, filename, outputs)
+    phase1_seconds = time.perf_counter() - start
+
+    with app.app_context():
+        result = Results.query.filter_by(filename=filename).first()
+        errors = [p.message for p in Progress.query.filter_by(filename=filename).all() if p.message.startswith("❌")]
+        if result is None:
+            raise RuntimeError(f"Phase 1 produced no results: {errors}")
+        transcript, summary = result.transcript, result.summary
+
+    start = time.perf_counter()
+    background_generate_outputs(app, transcript, summary, filename, outputs)
+    phase2_seconds = time.perf_counter() - start
+
+    with app.app_context():
+        result = Results.query.filter_by(filename=filename).first()
+        zip_bytes = len(result.zip_data or b"")
+
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        "fixture": os.path.basename(audio_path),
+        "audio_bytes": os.path.getsize(audio_path),
+        "phase1_seconds": round(phase1_seconds, 3),
+        "phase2_seconds": round(phase2_seconds, 3),
+        "total_seconds": round(phase1_seconds + phase2_seconds, 3),
+        "peak_rss_mb": round(own.ru_maxrss / 1024, 1),
+        "peak_child_rss_mb": round(children.ru_maxrss / 1024, 1),
+        "zip_bytes": zip_bytes,
+        "transcript_chars": len(transcript or ""),
+        "stages": stage_totals(),
+        "errors": errors,
+    }
+
+
+def run_in_child(audio_path, outputs, base_url):
+    env = dict(os.environ, OPENAI_BASE_URL=base_url, OPENAI_API_KEY="fake-key")
+    proc = subprocess.run(
+        [sys.executable, "-m", "benchmarks.run_pipeline", "--case", audio_path, "--outputs", *outputs],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True,
+    )
+    for line in reversed(proc.stdout.splitlines()):
+        if line.startswith(RESULT_MARKER):
+            return json.loads(line[len(RESULT_MARKER):])
+    raise RuntimeError(f"Benchmark case {audio_path} failed:\n{proc.stderr[-4000:]}")
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return "unknown"
+
+
+def compare(current, baseline):
+    previous = {case["fixture"]: case for case in baseline["cases"]}
+    print(f"\nCompared with {baseline['commit']} ({baseline['timestamp']}):")
+    for case in current["cases"]:
+        before = previous.get(case["fixture"])
+        if not before:
+            continue
+        parts = []
+        for key in ("total_seconds", "peak_rss_mb", "api_calls"):
+            old, new = before.get(key), case.get(key)
+            if old:
+                parts.append(f"{key} {old} -> {new} ({(new - old) * 100 / old:+.1f}%)")
+        print(f"  {case['fixture']}: " + ", ".join(parts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--minutes", type=int, nargs="+", default=[1, 10])
+    parser.add_argument("--formats", nargs="+", default=["mp3"])
+    parser.add_argument("--outputs", nargs="+", default=DEFAULT_OUTPUTS)
+    parser.add_argument("--latency", type=float, default=0.05, help="fake API latency per request (s)")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--tokens-per-second", type=float, default=400.0)
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--case", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        print(RESULT_MARKER + json.dumps(run_case(args.case, args.outputs)))
+        return
+
+    config = FakeOpenAIConfig(args.latency, args.rate_limit_rate, args.tokens_per_second)
+    server, stats = start_server(config)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+    cases = []
+    for path in fixtures.ensure_fixtures(args.minutes, args.formats):
+        before = stats.snapshot()
+        case = run_in_child(path, args.outputs, base_url)
+        after = stats.snapshot()
+        case["api_calls"] = after["total_calls"] - before["total_calls"]
+        case["api_calls_by_endpoint"] = {
+            key: count - before["calls"].get(key, 0) for key, count in after["calls"].items()
+            if count - before["calls"].get(key, 0)
+        }
+        cases.append(case)
+        print(f"{case['fixture']}: phase1 {case['phase1_seconds']}s, phase2 {case['phase2_seconds']}s, "
+              f"peak RSS {case['peak_rss_mb']} MB, {case['api_calls']} API calls")
+    server.shutdown()
+
+    timestamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    run = {
+        "timestamp": timestamp,
+        "commit": git_commit(),
+        "config": {
+            "latency": args.latency,
+            "rate_limit_rate": args.rate_limit_rate,
+            "tokens_per_second": args.tokens_per_second,
+            "outputs": args.outputs,
+        },
+        "cases": cases,
+    }
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"pipeline-{timestamp}-{run['commit']}.json")
+    with open(path, "w") as f:
+        json.dump(run, f, indent=2)
+    print(f"Saved {path}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(run, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""Progress streaming load test: many idle /progress connections at once.
+
+    python -m benchmarks.sse_load --connections 2000 --worker-class gevent
+    python -m benchmarks.sse_load --connections 50 --worker-class gthread
+    python -m benchmarks.sse_load --url http://127.0.0.1:8000 --connections 500
+
+Boots gunicorn against a throwaway SQLite database (unless --url is given) and
+opens the connections. While they are held it checks three things: that
+heartbeats arrive, how long /healthz takes, and how long a progress row takes
+to reach every client watching that job. Then it drops every connection at
+once and checks the server is still healthy.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import resource
+import signal
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+from benchmarks.run_pipeline import REPO_ROOT, RESULTS_DIR, git_commit
+from benchmarks.startup import bench_env, free_port
+
+JOBS = 20  # connections are spread over this many job filenames
+
+
+class Client:
+    def __init__(self, filename):
+        self.filename = filename
+        self.connected_at = None
+        self.heartbeats = 0
+        self.events = {}  # message -> arrival time
+        self.error = None
+        self.writer = None
+
+
+async def http_get(host, port, path, timeout=10):
+    start = time.perf_counter()
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode())
+    await writer.drain()
+    status = (await asyncio.wait_for(reader.readline(), timeout)).split()[1]
+    await reader.read()
+    writer.close()
+    return int(status), time.perf_counter() - start
+
+
+async def hold_stream(host, port, client, started):
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+        client.writer = writer
+        path = f"/progress?filename={client.filename}&phase=phase1"
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nAccept: text/event-stream\r\n\r\n".encode())
+        await writer.drain()
+        status = await reader.readline()
+        if b" 200 " not in status:
+            raise RuntimeError(status.decode().strip())
+        client.connected_at = time.perf_counter() - started
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            line = line.decode().strip()
+            if line == ": keepalive":
+                client.heartbeats += 1
+            elif line.startswith("data: "):
+                client.events.setdefault(line[6:], time.perf_counter())
+    except (OSError, RuntimeError, asyncio.IncompleteReadError) as e:
+        client.error = str(e) or type(e).__name__
+
+
+def insert_progress(db_path, filename, message):
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("INSERT INTO progress (filename, message, is_done, phase) VALUES (?, ?, 0, 'phase1')",
+                     (filename, message))
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(int(len(values) * fraction), len(values) - 1)], 4)
+
+
+async def run_load(host, port, connections, hold_seconds, db_path):
+    started = time.perf_counter()
+    clients = [Client(f"sse-load-{i % JOBS}") for i in range(connections)]
+    tasks = []
+    for i, client in enumerate(clients):
+        tasks.append(asyncio.create_task(hold_stream(host, port, client, started)))
+        if i % 100 == 99:
+            await asyncio.sleep(0.05)  # ramp up rather than a single SYN flood
+
+    deadline = time.perf_counter() + hold_seconds
+    healthz = []
+    delivery = []
+    sent = 0
+    while time.perf_counter() < deadline:
+        try:
+            status, seconds = await http_get(host, port, "/healthz")
+            healthz.append(seconds if status == 200 else None)
+        except (OSError, asyncio.TimeoutError):
+            healthz.append(None)
+        if db_path and sent < 5 and time.perf_counter() - started > 3:
+            # A progress row per job; time until every watcher of that job has it
+            message = f"load-test-{sent}"
+            sent_at = time.perf_counter()
+            for job in range(JOBS):
+                insert_progress(db_path, f"sse-load-{job}", message)
+            await asyncio.sleep(2)
+            arrivals = [c.events[message] - sent_at for c in clients if message in c.events]
+            delivery.append({"delivered": len(arrivals), "p50": percentile(arrivals, 0.5),
+                             "p95": percentile(arrivals, 0.95)})
+            sent += 1
+        await asyncio.sleep(0.5)
+
+    connected = [c for c in clients if c.connected_at is not None and c.error is None]
+    summary = {
+        "connections": connections,
+        "connected": len(connected),
+        "errors": len([c for c in clients if c.error]),
+        "sample_errors": sorted({c.error for c in clients if c.error})[:5],
+        "connect_seconds_p95": percentile([c.connected_at for c in connected], 0.95),
+        "heartbeats_per_connection": round(statistics.mean(c.heartbeats for c in connected), 2) if connected else 0,
+        "healthz_failures": healthz.count(None),
+        "healthz_seconds_p50": percentile([s for s in healthz if s is not None], 0.5),
+        "healthz_seconds_p95": percentile([s for s in healthz if s is not None], 0.95),
+        "delivery": delivery,
+    }
+
+    # Every client vanishes at once; the server should shrug it off
+    for client in clients:
+        if client.writer is not None:
+            client.writer.transport.abort()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await asyncio.sleep(2)
+    try:
+        status, _ = await http_get(host, port, "/healthz")
+        summary["healthy_after_disconnect"] = status == 200
+    except (OSError, asyncio.TimeoutError):
+        summary["healthy_after_disconnect"] = False
+    return summary
+
+
+def start_gunicorn(workdir, worker_class, heartbeat, timeout=60):
+    port = free_port()
+    env = bench_env(workdir)
+    env.update(GUNICORN_WORKER_CLASS=worker_class, SSE_HEARTBEAT_SECONDS=str(heartbeat), JANITOR_INTERVAL="0")
+    env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+    subprocess.run([sys.executable, "-c", "from app import app; from models import db; "
+                    "app.app_context().push(); db.create_all()"], cwd=REPO_ROOT, env=env, check=True)
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "--config=gunicorn.conf.py", f"--bind=127.0.0.1:{port}", "app:app"],
+        cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        try:
+            status, _ = asyncio.run(http_get("127.0.0.1", port, "/healthz", timeout=1))
+            if status == 200:
+                return proc, port
+        except (OSError, asyncio.TimeoutError, IndexError):
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("gunicorn did not become healthy")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--connections", type=int, default=1000)
+    parser.add_argument("--hold", type=float, default=20, help="seconds to hold the connections open")
+    parser.add_argument("--worker-class", default="gevent", choices=["gevent", "gthread"])
+    parser.add_argument("--heartbeat", type=float, default=5, help="SSE_HEARTBEAT_SECONDS for the server")
+    parser.add_argument("--url", help="an already running server; skips gunicorn and delivery checks")
+    args = parser.parse_args()
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    proc = None
+    db_path = None
+    workdir = tempfile.mkdtemp(prefix="simplytranscribe-sse-")
+    if args.url:
+        parts = urlsplit(args.url)
+        host, port = parts.hostname, parts.port or 80
+    else:
+        proc, port = start_gunicorn(workdir, args.worker_class, args.heartbeat)
+        host, db_path = "127.0.0.1", os.path.join(workdir, "startup.db")
+
+    try:
+        summary = asyncio.run(run_load(host, port, args.connections, args.hold, db_path))
+    finally:
+        if proc is not None:
+            proc.send_signal(signal.SIGTERM)
+            proc.wait(timeout=30)
+
+    summary["worker_class"] = None if args.url else args.worker_class
+    print(json.dumps(summary, indent=2))
+
+    timestamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    run = {"timestamp": timestamp, "commit": git_commit(),
+           "config": {"connections": args.connections, "hold": args.hold, "heartbeat": args.heartbeat,
+                      "worker_class": args.worker_class, "url": args.url},
+           "result": summary}
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"sse-{timestamp}-{run['commit']}.json")
+    with open(path, "w") as f:
+        json.dump(run, f, indent=2)
+    print(f"Saved {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""Startup benchmark: app import time and per-worker memory.
+
+    python -m benchmarks.startup                 # import time and RSS of `import app`
+    python -m benchmarks.startup --gunicorn      # also boot gunicorn and measure each worker
+
+Results are written to benchmarks/results/ for comparison across commits.
+"""
+import argparse
+import datetime
+import json
+import os
+import re
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+IMPORT_PROBE = (
+    "import time, json; start = time.perf_counter(); import app; elapsed = time.perf_counter() - start; "
+    "rss = [l for l in open('/proc/self/status') if l.startswith('VmRSS')][0].split()[1]; "
+    "print('STARTUP ' + json.dumps({'seconds': elapsed, 'rss_kb': int(rss)}))"
+)
+
+
+def bench_env(workdir):
+    return dict(os.environ,
+                DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'startup.db')}",
+                OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY", "fake-key"))
+
+
+def measure_import(repeat, workdir):
+    runs = []
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, "-c", IMPORT_PROBE], cwd=REPO_ROOT, env=bench_env(workdir),
+                              capture_output=True, text=True, check=True)
+        line = [l for l in proc.stdout.splitlines() if l.startswith("STARTUP ")][-1]
+        runs.append(json.loads(line[len("STARTUP "):]))
+    return {
+        "import_seconds_median": round(statistics.median(r["seconds"] for r in runs), 4),
+        "import_seconds_min": round(min(r["seconds"] for r in runs), 4),
+        "rss_mb_median": round(statistics.median(r["rss_kb"] for r in runs) / 1024, 1),
+    }
+
+
+def slowest_imports(workdir, top=15):
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"], cwd=REPO_ROOT,
+                          env=bench_env(workdir), capture_output=True, text=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|\s*(\S+)", line)
+        if match and "." not in match.group(3):
+            rows.append((int(match.group(2)), match.group(3)))
+    rows.sort(reverse=True)
+    return [{"module": name, "cumulative_ms": round(us / 1000, 1)} for us, name in rows[:top]]
+
+
+def memory_of(pid):
+    stats = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                if key in ("Rss", "Pss", "Private_Clean", "Private_Dirty"):
+                    stats[key] = int(rest.split()[0])
+    except FileNotFoundError:
+        return None
+    return {
+        "rss_mb": round(stats.get("Rss", 0) / 1024, 1),
+        "pss_mb": round(stats.get("Pss", 0) / 1024, 1),
+        "private_mb": round((stats.get("Private_Clean", 0) + stats.get("Private_Dirty", 0)) / 1024, 1),
+    }
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def measure_gunicorn(workdir, preload, timeout=60):
+    port = free_port()
+    env = bench_env(workdir)
+    env["GUNICORN_PRELOAD"] = "1" if preload else "0"
+    env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "--config=gunicorn.conf.py", f"--bind=127.0.0.1:{port}", "app:app"],
+        cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        ready = None
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/healthz", timeout=1) as response:
+                    if response.status == 200:
+                        ready = time.perf_counter() - start
+                        break
+            except OSError:
+                time.sleep(0.05)
+        time.sleep(2)  # let every worker finish booting
+        children = subprocess.run(["pgrep", "-P", str(proc.pid)], capture_output=True, text=True).stdout.split()
+        return {
+            "preload": preload,
+            "seconds_to_first_healthz": round(ready, 3) if ready else None,
+            "master": memory_of(proc.pid),
+            "workers": [memory_of(pid) for pid in children],
+        }
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--gunicorn", action="store_true", help="also boot gunicorn with and without preload")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="simplytranscribe-startup-")
+    result = {"import": measure_import(args.repeat, workdir), "slowest_imports": slowest_imports(workdir)}
+    print(f"import app: {result['import']['import_seconds_median']}s median, "
+          f"{result['import']['rss_mb_median']} MB RSS")
+    for row in result["slowest_imports"][:5]:
+        print(f"  {row['module']}: {row['cumulative_ms']} ms")
+
+    if args.gunicorn:
+        result["gunicorn"] = [measure_gunicorn(workdir, preload) for preload in (False, True)]
+        for run in result["gunicorn"]:
+            workers = [w for w in run["workers"] if w]
+            print(f"gunicorn preload={run['preload']}: healthz after {run['seconds_to_first_healthz']}s, "
+                  f"worker PSS {[w['pss_mb'] for w in workers]} MB")
+
+    commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                            capture_output=True, text=True).stdout.strip() or "unknown"
+    timestamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"startup-{timestamp}-{commit}.json")
+    with open(path, "w") as f:
+        json.dump({"timestamp": timestamp, "commit": commit, **result}, f, indent=2)
+    print(f"Saved {path}")
+
+
+if __name__ == "__main__":
+    main()
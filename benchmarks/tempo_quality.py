@@ -0,0 +1,142 @@
+"""Fast mode benchmark: transcription latency, upload size and accuracy by tempo.
+
+    python -m benchmarks.tempo_quality --minutes 1 10 --tempos 1.25 1.5 2.0
+    python -m benchmarks.tempo_quality --real --audio lecture.mp3 other.m4a
+
+Each recording is transcribed at normal speed and at every tempo. Against the
+fake server (the default) only latency, chunk count and upload bytes mean
+anything, since its transcripts are random words. With --real the configured
+OpenAI account is used and word error rate is reported against <audio>.txt
+when it exists, otherwise against the normal-speed transcript.
+"""
+import argparse
+import datetime
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+
+from benchmarks import fixtures
+from benchmarks.fake_openai import FakeOpenAIConfig, start_server
+from benchmarks.run_pipeline import REPO_ROOT, RESULTS_DIR, git_commit
+
+
+def words(text):
+    return re.findall(r"[a-z0-9']+", text.lower())
+
+
+def word_error_rate(reference, hypothesis):
+    ref, hyp = words(reference), words(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def counter_value(name):
+    from prometheus_client import REGISTRY
+    return REGISTRY.get_sample_value(name) or 0.0
+
+
+def transcribe(audio_path, tempo):
+    from pdfgeneration import transcribe_audio
+
+    chunks = []
+    uploaded = counter_value("simplytranscribe_whisper_upload_bytes_total")
+    with tempfile.TemporaryDirectory(prefix="simplytranscribe-tempo-") as work_dir:
+        start = time.perf_counter()
+        text = transcribe_audio(audio_path, work_dir=work_dir, tempo=tempo,
+                                on_progress=lambda percent: chunks.append(percent))
+        seconds = time.perf_counter() - start
+    return text, {
+        "tempo": tempo,
+        "seconds": round(seconds, 3),
+        "chunks": len(chunks),
+        "upload_bytes": int(counter_value("simplytranscribe_whisper_upload_bytes_total") - uploaded),
+    }
+
+
+def run_recording(audio_path, tempos, measure_quality):
+    reference_path = os.path.splitext(audio_path)[0] + ".txt"
+    reference = None
+    if measure_quality and os.path.exists(reference_path):
+        with open(reference_path) as f:
+            reference = f.read()
+
+    baseline_text, baseline = transcribe(audio_path, 1.0)
+    rows = [baseline]
+    for tempo in tempos:
+        text, row = transcribe(audio_path, tempo)
+        row["speedup"] = round(baseline["seconds"] / row["seconds"], 2) if row["seconds"] else None
+        row["upload_ratio"] = round(row["upload_bytes"] / baseline["upload_bytes"], 3) if baseline["upload_bytes"] else None
+        if measure_quality:
+            row["wer"] = round(word_error_rate(reference or baseline_text, text), 4)
+        rows.append(row)
+    if measure_quality and reference is not None:
+        baseline["wer"] = round(word_error_rate(reference, baseline_text), 4)
+
+    return {
+        "recording": os.path.basename(audio_path),
+        "wer_against": "reference" if reference is not None else ("1.0x transcript" if measure_quality else None),
+        "runs": rows,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--minutes", type=int, nargs="+", default=[1, 10])
+    parser.add_argument("--formats", nargs="+", default=["mp3"])
+    parser.add_argument("--audio", nargs="+", default=[], help="recordings to use instead of the fixtures")
+    parser.add_argument("--tempos", type=float, nargs="+", default=[1.25, 1.5, 2.0])
+    parser.add_argument("--real", action="store_true", help="use the configured OpenAI API and report WER")
+    parser.add_argument("--latency", type=float, default=0.05, help="fake API latency per request (s)")
+    parser.add_argument("--transcription-speed", type=float, default=0.05,
+                        help="fake API processing seconds per second of uploaded audio")
+    args = parser.parse_args()
+
+    sys.path.insert(0, REPO_ROOT)
+    os.environ.pop("PROMETHEUS_MULTIPROC_DIR", None)
+    server = None
+    if not args.real:
+        server, _ = start_server(FakeOpenAIConfig(args.latency, transcription_speed=args.transcription_speed))
+        os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}/v1"
+        os.environ["OPENAI_API_KEY"] = "fake-key"
+
+    recordings = args.audio or fixtures.ensure_fixtures(args.minutes, args.formats)
+    cases = []
+    for path in recordings:
+        case = run_recording(path, args.tempos, measure_quality=args.real)
+        cases.append(case)
+        print(case["recording"])
+        for row in case["runs"]:
+            wer = f", WER {row['wer']:.1%}" if "wer" in row else ""
+            print(f"  {row['tempo']}x: {row['seconds']}s, {row['chunks']} chunks, "
+                  f"{row['upload_bytes']} bytes uploaded{wer}")
+    if server is not None:
+        server.shutdown()
+
+    timestamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    run = {
+        "timestamp": timestamp,
+        "commit": git_commit(),
+        "config": {"tempos": args.tempos, "real": args.real, "latency": args.latency,
+                   "transcription_speed": args.transcription_speed},
+        "cases": cases,
+    }
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"tempo-{timestamp}-{run['commit']}.json")
+    with open(path, "w") as f:
+        json.dump(run, f, indent=2)
+    print(f"Saved {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import glob
+import os
+import threading
+import zstandard
+
+# Transcripts and summaries are stored zstd-compressed (see models/types.py).
+# A dictionary trained on earlier transcripts (python compression.py)
+# makes short texts such as summaries compress far better; the newest file in
+# DICT_DIR is used for writing, and every file there stays available for
+# reading, since each zstd frame records the id of the dictionary it needs.
+# Values that aren't zstd frames (written before compression) are read as text.
+
+DICT_DIR = os.getenv("COMPRESSION_DICT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "compression_dicts"))
+LEVEL = int(os.getenv("ZSTD_LEVEL", "6"))
+MAGIC = b"\x28\xb5\x2f\xfd"
+
+_dictionaries = None  # dict id -> ZstdCompressionDict
+_write_dictionary = None
+_local = threading.local()  # zstd contexts aren't thread safe
+_lock = threading.Lock()
+
+
+def load_dictionaries():
+    global _dictionaries, _write_dictionary
+    if _dictionaries is None:
+        with _lock:
+            if _dictionaries is None:
+                dictionaries = {}
+                newest = None
+                for path in sorted(glob.glob(os.path.join(DICT_DIR, "*.zdict"))):
+                    with open(path, "rb") as f:
+                        newest = zstandard.ZstdCompressionDict(f.read())
+                    dictionaries[newest.dict_id()] = newest
+                _write_dictionary = newest
+                _dictionaries = dictionaries
+    return _dictionaries
+
+
+def _compressor():
+    if getattr(_local, "compressor", None) is None:
+        load_dictionaries()
+        _local.compressor = zstandard.ZstdCompressor(level=LEVEL, dict_data=_write_dictionary, write_content_size=True)
+    return _local.compressor
+
+
+def _decompressor(dict_id):
+    decompressors = _local.__dict__.setdefault("decompressors", {})
+    if dict_id not in decompressors:
+        dictionary = load_dictionaries().get(dict_id) if dict_id else None
+        if dict_id and dictionary is None:
+            raise ValueError(f"Compressed value needs zstd dictionary {dict_id}, which isn't in {DICT_DIR}")
+        decompressors[dict_id] = zstandard.ZstdDecompressor(dict_data=dictionary)
+    return decompressors[dict_id]
+
+
+def compress(text):
+    if text is None:
+        return None
+    return _compressor().compress(text.encode("utf-8"))
+
+
+def decompress(data):
+    if data is None:
+        return None
+    data = bytes(data)
+    if not data.startswith(MAGIC):
+        return data.decode("utf-8")
+    dict_id = zstandard.get_frame_parameters(data).dict_id
+    return _decompressor(dict_id).decompress(data).decode("utf-8")
+
+
+def train(samples, size=112640):
+    return zstandard.train_dictionary(size, [sample.encode("utf-8") for sample in samples])
+
+
+if __name__ == "__main__":
+    # Trains a dictionary on the most recent stored transcripts and summaries
+    import argparse
+    import datetime
+    import sys
+
+    parser = argparse.ArgumentParser(description="Train a zstd dictionary on stored transcripts")
+    parser.add_argument("--samples", type=int, default=2000)
+    parser.add_argument("--size", type=int, default=112640, help="dictionary size in bytes")
+    args = parser.parse_args()
+
+    from app import app
+    from models import db
+    from models.results import Results
+
+    with app.app_context():
+        rows = db.session.query(Results.transcript, Results.summary).order_by(Results.id.desc()).limit(args.samples).all()
+    # Paragraph-sized samples: the dictionary is built from what texts share
+    samples = [paragraph for row in rows for text in row if text for paragraph in text.split("\n\n") if paragraph.strip()]
+    if len(samples) < 100:
+        sys.exit(f"Only {len(samples)} samples; store more transcripts before training")
+
+    dictionary = train(samples, args.size)
+    os.makedirs(DICT_DIR, exist_ok=True)
+    # Named by time and id so names sort oldest first and a retrain never
+    # replaces a dictionary that stored values may still need
+    path = os.path.join(DICT_DIR, f"transcripts-{datetime.datetime.now():%Y%m%d-%H%M%S}-{dictionary.dict_id()}.zdict")
+    try:
+        with open(path, "xb") as f:
+            f.write(dictionary.as_bytes())
+    except FileExistsError:
+        sys.exit(f"{path} already exists; not overwriting it")
+    print(f"Wrote {path} (id {dictionary.dict_id()}, {len(samples)} samples); "
+          f"deploy it with the app so every worker can read values written with it")
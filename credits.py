@@ -0,0 +1,50 @@
+from audio_backend import get_audio_segment
+from models import db
+from models.user import User
+
+
+def get_duration_seconds(audio_path):
+    from pydub.utils import mediainfo_json
+
+    # ffprobe reads the container header, which avoids decoding the whole file
+    try:
+        return float(mediainfo_json(audio_path)['format']['duration'])
+    except (KeyError, ValueError, TypeError):
+        return len(get_audio_segment().from_file(audio_path)) / 1000
+
+
+def calculate_and_deduct_credits(audio_path, outputs, user, duration_seconds=None):
+    try:
+        if duration_seconds is None:
+            duration_seconds = get_duration_seconds(audio_path)
+        duration_minutes = max(1, -(-int(duration_seconds * 1000) // 60000))
+        num_outputs = len(outputs)
+        total_credits_needed = duration_minutes * num_outputs
+    except Exception as e:
+        raise ValueError(f"Failed to read audio: {e}")
+
+    # Conditional UPDATE so the balance check and deduction can't race, and a
+    # cached (possibly stale) user object never decides the outcome
+    deducted = User.query.filter(User.id == user.id, User.credits >= total_credits_needed).update(
+        {User.credits: User.credits - total_credits_needed}, synchronize_session=False)
+    db.session.commit()  # expires user, so user.credits below is re-read
+
+    if not deducted:
+        raise PermissionError(f"You need {total_credits_needed} credits, "
+                              f"but have {user.credits}.")
+
+    return total_credits_needed, duration_minutes
+
+
+def refund_unused_credits(job, billed_seconds):
+    # Returns the credits handed back when a job turns out to need fewer
+    # minutes than were charged up front (e.g. after silence trimming)
+    minutes = max(1, -(-int(billed_seconds * 1000) // 60000))
+    refund = (job.credits_charged or 0) - minutes * len(job.outputs)
+    if refund <= 0:
+        return 0
+    User.query.filter(User.id == job.user_id).update(
+        {User.credits: User.credits + refund}, synchronize_session=False)
+    job.credits_charged -= refund
+    db.session.commit()
+    return refund
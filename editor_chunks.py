@@ -0,0 +1,118 @@
+import os
+from sqlalchemy import exists, or_
+from sqlalchemy.exc import IntegrityError
+from models import db
+from models.job import Job
+from models.results import Results
+from models.transcript_chunk import TranscriptChunk
+
+# The edit page loads the transcript and summary a page of chunks at a time
+# and saves each edited chunk on its own, so a long lecture is never rendered
+# into one page or posted back whole. Chunks are runs of whole paragraphs;
+# joining them with a blank line gives back the original text exactly, which
+# keeps the pre-render usable when nothing was edited.
+
+CHUNK_CHARS = int(os.getenv("EDITOR_CHUNK_CHARS", "4000"))
+KINDS = ("transcript", "summary")
+# Job statuses that take edits and a /finalize: "failed" covers a render that
+# failed and can be retried (a failed transcription has no chunks to edit)
+EDITABLE_STATUSES = ("ready", "failed")
+
+
+def split_text(text, chunk_chars=CHUNK_CHARS):
+    chunks = []
+    current = []
+    size = 0
+    for paragraph in text.split("\n\n"):
+        if current and size + len(paragraph) > chunk_chars:
+            chunks.append("\n\n".join(current))
+            current, size = [], 0
+        current.append(paragraph)
+        size += len(paragraph) + 2
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def save_chunks(filename, kind, text):
+    # Replaces the editable copy of one document; the caller commits
+    TranscriptChunk.query.filter_by(filename=filename, kind=kind).delete()
+    for position, chunk in enumerate(split_text(text) if text else []):
+        db.session.add(TranscriptChunk(filename=filename, kind=kind, position=position, text=chunk))
+
+
+def ensure_chunks(filename):
+    # Jobs finished before chunks were stored get theirs on first open
+    if db.session.query(TranscriptChunk.id).filter_by(filename=filename).first() is not None:
+        return
+    result = Results.query.filter_by(filename=filename).first()
+    if result is None:
+        return
+    for kind in KINDS:
+        save_chunks(filename, kind, getattr(result, kind))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()  # another request split it first
+
+
+def load_page(filename, kind, page, per_page):
+    query = TranscriptChunk.query.filter_by(filename=filename, kind=kind)
+    total = query.count()
+    rows = query.order_by(TranscriptChunk.position).offset((page - 1) * per_page).limit(per_page).all()
+    return total, rows
+
+
+def save_edit(filename, kind, position, text, version):
+    # Optimistic concurrency: the save only applies to the version the editor
+    # loaded. Returns the new version, or None and leaves the row untouched.
+    # Also refused once /finalize has claimed the job, even if it did so
+    # after the route's own status check. Results from before jobs were
+    # tracked have no Job row until their first /finalize adds one.
+    still_editable = or_(exists().where(Job.filename == filename, Job.status.in_(EDITABLE_STATUSES)),
+                         ~exists().where(Job.filename == filename))
+    updated = TranscriptChunk.query.filter_by(filename=filename, kind=kind, position=position, version=version) \
+        .filter(still_editable) \
+        .update({"text": text, "version": version + 1}, synchronize_session=False)
+    db.session.commit()
+    return version + 1 if updated else None
+
+
+def load_text(filename, kind):
+    # The document as edited, or None if there is no editable copy
+    rows = db.session.query(TranscriptChunk.text).filter_by(filename=filename, kind=kind) \
+        .order_by(TranscriptChunk.position).all()
+    if not rows:
+        return None
+    return "\n\n".join(text for text, in rows if text.strip())
+
+
+def delete_chunks(filename):
+    TranscriptChunk.query.filter_by(filename=filename).delete()
+
+
+def claim_finalize(filename, user_id=None):
+    # Moves the job on to "finalizing" so only one render starts and edits stop
+    # being accepted. Only a job whose transcription finished can be claimed.
+    # Returns whether this caller got it; the caller starts the render.
+    transcribed = exists().where(Results.filename == filename, Results.status == "ready")
+    claimed = Job.query.filter(Job.filename == filename, Job.status.in_(EDITABLE_STATUSES), transcribed) \
+        .update({"status": "finalizing"}, synchronize_session=False)
+    db.session.commit()
+    if claimed or user_id is None:
+        return bool(claimed)
+
+    # A result from before jobs were tracked is claimed by creating its Job
+    # row for the user finalizing it; the unique filename settles a race
+    if db.session.query(exists().where(Job.filename == filename)).scalar():
+        return False
+    result = db.session.query(Results.status, Results.outputs).filter_by(filename=filename).first()
+    if result is None or result.status != "ready":
+        return False
+    db.session.add(Job(filename=filename, user_id=user_id, source="form", status="finalizing", outputs=result.outputs))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return False
+    return True
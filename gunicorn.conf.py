@@ -0,0 +1,75 @@
+import gc
+import importlib
+import os
+import shutil
+
+bind = "0.0.0.0:8000"
+workers = 4
+threads = 2
+timeout = 120
+
+# gthread ties a thread to every open /progress stream. The gevent worker holds
+# thousands of idle streams per process, but CPU-heavy job stages would stall
+# its event loop, so run it as a separate instance that the proxy sends
+# /progress to (GUNICORN_WORKER_CLASS=gevent) and keep gthread for the rest;
+# docker-compose.yml and nginx.conf set this up.
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "2000"))
+evented = worker_class in ("gevent", "eventlet")
+
+# Import the app once in the master and fork workers from it, so module code
+# and read-only state are shared copy-on-write instead of rebuilt per worker.
+# Evented workers monkey-patch on start, which has to happen before the app
+# creates its locks and connections, so they don't preload by default.
+preload_app = os.getenv("GUNICORN_PRELOAD", "0" if evented else "1") == "1"
+
+# The janitor and the waiting-job releaser run transcription work, which would
+# stall an event loop, so an evented (/progress-only) instance leaves them out.
+# Set before the app is imported; workers inherit it.
+os.environ.setdefault("BACKGROUND_THREADS", "0" if evented else "1")
+
+# Metric files left by a previous run would otherwise be summed into this one.
+# Cleared here rather than in on_starting: under preload the master imports the
+# app, and with it metrics.py, before on_starting runs, and the unlabelled
+# metrics open their files in this directory at import.
+if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+    shutil.rmtree(os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True)
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+# Libraries the app imports lazily. Under preload they are imported once in the
+# master so every worker shares them; without preload each worker pays for them
+# on first use instead of before serving its first request.
+PRELOAD_MODULES = ("openai", "pydub", "tiktoken", "docx", "fpdf", "yt_dlp", "stripe")
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    for module in PRELOAD_MODULES:
+        try:
+            importlib.import_module(module)
+        except ImportError as e:
+            server.log.warning(f"Could not preload {module}: {e}")
+    try:
+        import tokenizer
+        tokenizer.get_encoder()  # shared by every worker instead of loaded per worker
+    except Exception as e:
+        server.log.warning(f"Could not preload tokenizer: {e}")
+    # Keep the collector from touching (and so copying) the shared objects
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    if not preload_app:
+        return
+    # Database connections opened in the master must not be shared with workers
+    from app import app
+    from models import db
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,146 @@
+import os
+import time
+from contextlib import contextmanager
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+import profiling
+
+# Under gunicorn, PROMETHEUS_MULTIPROC_DIR is set (see gunicorn.conf.py) and each
+# worker writes its samples there; /metrics merges them so a scrape sees the
+# whole container rather than whichever worker answered.
+
+STAGE_DURATION = Histogram(
+    "simplytranscribe_stage_duration_seconds",
+    "Wall time spent in each pipeline stage",
+    ["stage"],
+    buckets=(0.1, 0.5, 1, 2, 5, 10, 30, 60, 120, 300, 600, 1200, 2400, 3600),
+)
+STAGE_ERRORS = Counter(
+    "simplytranscribe_stage_errors_total",
+    "Pipeline stages that raised or had to fall back",
+    ["stage"],
+)
+CHUNKS = Histogram(
+    "simplytranscribe_chunks",
+    "Number of chunks a stage split its input into",
+    ["stage"],
+    buckets=(1, 2, 3, 5, 8, 13, 21, 34, 55),
+)
+UPLOAD_BYTES = Counter(
+    "simplytranscribe_upload_bytes_total",
+    "Audio bytes received, by ingestion path",
+    ["source"],
+)
+WHISPER_UPLOAD_BYTES = Counter(
+    "simplytranscribe_whisper_upload_bytes_total",
+    "Audio bytes sent to the transcription API",
+)
+SILENCE_TRIMMED_SECONDS = Counter(
+    "simplytranscribe_silence_trimmed_seconds_total",
+    "Seconds of silence cut out of recordings before transcription",
+)
+LATEX_CHUNKS = Counter(
+    "simplytranscribe_latex_chunks_total",
+    "LaTeX chunks on finalize, by whether the body was generated or reused",
+    ["result"],
+)
+DISK_BYTES = Gauge(
+    "simplytranscribe_disk_bytes",
+    "Bytes on disk under the upload folder, by area (measured by the janitor)",
+    ["area"],
+    multiprocess_mode="mostrecent",
+)
+DISK_FREE_BYTES = Gauge(
+    "simplytranscribe_disk_free_bytes",
+    "Free bytes on the filesystem holding the upload folder",
+    multiprocess_mode="mostrecent",
+)
+JANITOR_REMOVED_BYTES = Counter(
+    "simplytranscribe_janitor_removed_bytes_total",
+    "Bytes the janitor deleted, by reason",
+    ["reason"],
+)
+SSE_CONNECTIONS = Gauge(
+    "simplytranscribe_sse_connections",
+    "Open /progress event streams",
+    multiprocess_mode="livesum",
+)
+QUEUE_DEPTH = Gauge(
+    "simplytranscribe_queue_depth",
+    "Tasks waiting in the fair-share scheduler, by user",
+    ["user"],
+    multiprocess_mode="livesum",
+)
+QUEUE_WAIT = Histogram(
+    "simplytranscribe_queue_wait_seconds",
+    "Time tasks spent queued before a worker picked them up, by tier",
+    ["tier"],
+    buckets=(0.1, 1, 5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600, 7200),
+)
+QUEUE_WAIT_TOTAL = Counter(
+    "simplytranscribe_user_queue_wait_seconds_total",
+    "Total time each user's tasks spent queued (divide by dispatched for the mean)",
+    ["user"],
+)
+QUEUE_DISPATCHED = Counter(
+    "simplytranscribe_queue_dispatched_total",
+    "Tasks the scheduler started, by user",
+    ["user"],
+)
+ADMISSION_DECISIONS = Counter(
+    "simplytranscribe_admission_decisions_total",
+    "New work refused or parked by admission control, and parked jobs released",
+    ["result", "reason"],
+)
+JOBS_IN_FLIGHT = Gauge(
+    "simplytranscribe_jobs_in_flight",
+    "Background jobs currently running",
+    ["phase"],
+    multiprocess_mode="livesum",
+)
+
+
+@contextmanager
+def track_stage(stage):
+    profiler = profiling.current()
+    if profiler is not None:
+        profiler.stage_started(stage)
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.labels(stage=stage).inc()
+        raise
+    finally:
+        STAGE_DURATION.labels(stage=stage).observe(time.perf_counter() - start)
+        if profiler is not None:
+            profiler.stage_finished(stage)
+
+
+def track_job(phase):
+    return JOBS_IN_FLIGHT.labels(phase=phase).track_inprogress()
+
+
+def record_error(stage):
+    STAGE_ERRORS.labels(stage=stage).inc()
+
+
+def observe_chunks(stage, count):
+    CHUNKS.labels(stage=stage).observe(count)
+
+
+def render_latest():
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
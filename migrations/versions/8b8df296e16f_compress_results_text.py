@@ -0,0 +1,52 @@
+"""Compress results transcript and summary
+
+Revision ID: 8b8df296e16f
+Revises: 961761b50a06
+Create Date: 2026-10-19 19:14:58.631027
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import compression
+
+
+# revision identifiers, used by Alembic.
+revision = '8b8df296e16f'
+down_revision = '961761b50a06'
+branch_labels = None
+depends_on = None
+
+
+def convert(source_type, target_type, encode):
+    # Copies transcript/summary into new columns through encode, then swaps
+    # them in; one row at a time so large documents aren't all held at once
+    with op.batch_alter_table('results', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('transcript_new', target_type, nullable=True))
+        batch_op.add_column(sa.Column('summary_new', target_type, nullable=True))
+
+    results = sa.table('results',
+                       sa.column('id', sa.Integer()),
+                       sa.column('transcript', source_type),
+                       sa.column('summary', source_type),
+                       sa.column('transcript_new', target_type),
+                       sa.column('summary_new', target_type))
+    conn = op.get_bind()
+    ids = [row.id for row in conn.execute(sa.select(results.c.id))]
+    for id in ids:
+        row = conn.execute(sa.select(results.c.transcript, results.c.summary).where(results.c.id == id)).first()
+        conn.execute(results.update().where(results.c.id == id).values(
+            transcript_new=encode(row.transcript), summary_new=encode(row.summary)))
+
+    with op.batch_alter_table('results', schema=None) as batch_op:
+        batch_op.drop_column('transcript')
+        batch_op.drop_column('summary')
+        batch_op.alter_column('transcript_new', new_column_name='transcript')
+        batch_op.alter_column('summary_new', new_column_name='summary')
+
+
+def upgrade():
+    convert(sa.Text(), sa.LargeBinary(), compression.compress)
+
+
+def downgrade():
+    convert(sa.LargeBinary(), sa.Text(), compression.decompress)
@@ -0,0 +1,46 @@
+"""Compress transcript chunk text
+
+Revision ID: e7d2f4a16b85
+Revises: c3a81f5e0d27
+Create Date: 2026-10-19 20:03:41.582907
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import compression
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7d2f4a16b85'
+down_revision = 'c3a81f5e0d27'
+branch_labels = None
+depends_on = None
+
+
+def convert(source_type, target_type, encode):
+    # Same approach as the results columns: copy through encode into a new
+    # column one row at a time, then swap it in
+    with op.batch_alter_table('transcript_chunk', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('text_new', target_type, nullable=True))
+
+    chunks = sa.table('transcript_chunk',
+                      sa.column('id', sa.Integer()),
+                      sa.column('text', source_type),
+                      sa.column('text_new', target_type))
+    conn = op.get_bind()
+    ids = [row.id for row in conn.execute(sa.select(chunks.c.id))]
+    for id in ids:
+        text = conn.execute(sa.select(chunks.c.text).where(chunks.c.id == id)).scalar()
+        conn.execute(chunks.update().where(chunks.c.id == id).values(text_new=encode(text)))
+
+    with op.batch_alter_table('transcript_chunk', schema=None) as batch_op:
+        batch_op.drop_column('text')
+        batch_op.alter_column('text_new', new_column_name='text', existing_type=target_type, nullable=False)
+
+
+def upgrade():
+    convert(sa.Text(), sa.LargeBinary(), compression.compress)
+
+
+def downgrade():
+    convert(sa.LargeBinary(), sa.Text(), compression.decompress)
@@ -0,0 +1,117 @@
+import json
+import math
+import os
+from collections import namedtuple
+from tokenizer import count_tokens
+
+# What each model can take and how fast it is, so chunk sizes and completion
+# budgets follow the configured model instead of being hard-coded. Rate limits
+# depend on the account's usage tier; the numbers below are tier 1 and can be
+# overridden (or new models added) with MODEL_PROFILES, a JSON object of
+#   {"model-name": {"context_window": ..., "max_output_tokens": ..., ...}}
+
+ModelProfile = namedtuple("ModelProfile", [
+    "context_window",     # input + output tokens per request
+    "max_output_tokens",  # output tokens per request, reasoning included
+    "rpm",                # requests per minute
+    "tpm",                # tokens per minute
+    "tokens_per_second",  # typical output speed
+    "reasoning_tokens",   # output tokens to set aside for hidden reasoning
+])
+
+PROFILES = {
+    "o4-mini-2025-04-16": ModelProfile(200000, 100000, 500, 200000, 120, 8000),
+    "o3-mini-2025-01-31": ModelProfile(200000, 100000, 500, 200000, 120, 8000),
+    "o3-2025-04-16": ModelProfile(200000, 100000, 500, 30000, 60, 12000),
+    "gpt-4.1-2025-04-14": ModelProfile(1047576, 32768, 500, 30000, 80, 0),
+    "gpt-4.1-mini-2025-04-14": ModelProfile(1047576, 32768, 500, 200000, 120, 0),
+    "gpt-4o-2024-08-06": ModelProfile(128000, 16384, 500, 30000, 90, 0),
+    "gpt-4o-mini-2024-07-18": ModelProfile(128000, 16384, 500, 200000, 110, 0),
+}
+# Used for models with no profile: small enough for anything current
+FALLBACK_PROFILE = ModelProfile(128000, 16384, 500, 30000, 60, 0)
+
+DEFAULT_MODEL = "o4-mini-2025-04-16"
+STAGE_MODELS = {
+    "format": os.getenv("FORMAT_MODEL", DEFAULT_MODEL),
+    "summarise": os.getenv("SUMMARY_MODEL", DEFAULT_MODEL),
+    "latex": os.getenv("LATEX_MODEL", DEFAULT_MODEL),
+}
+
+# Output tokens per input token: formatting echoes the text with punctuation,
+# LaTeX adds markup, a chunk summary is a paragraph whatever the input
+STAGE_OUTPUT_RATIO = {
+    "format": 1.2,
+    "summarise": 0.0,
+    "latex": 1.5,
+}
+SUMMARY_OUTPUT_TOKENS = 4000  # a few paragraphs, with room to spare
+PROMPT_OVERHEAD_TOKENS = 500  # system prompt and instructions around the text
+# A single (non-streamed) request must finish well inside the client timeout
+REQUEST_TIMEOUT_SECONDS = float(os.getenv("OPENAI_TIMEOUT_SECONDS", "600"))
+# Optional ceiling on chunk size regardless of model, e.g. for finer progress
+MAX_CHUNK_TOKENS = int(os.getenv("MAX_CHUNK_TOKENS", "0"))
+
+
+def _load_overrides():
+    raw = os.getenv("MODEL_PROFILES")
+    if not raw:
+        return
+    for name, fields in json.loads(raw).items():
+        base = PROFILES.get(name, FALLBACK_PROFILE)
+        PROFILES[name] = base._replace(**fields)
+
+
+_load_overrides()
+
+
+def model_for(stage):
+    return STAGE_MODELS[stage]
+
+
+_warned = set()
+
+
+def profile_for(model):
+    profile = PROFILES.get(model)
+    if profile is None:
+        if model not in _warned:
+            _warned.add(model)
+            print(f"No profile for model {model}, using conservative limits")
+        return FALLBACK_PROFILE
+    return profile
+
+
+def output_tokens_for(stage, input_tokens):
+    if stage == "summarise":
+        return SUMMARY_OUTPUT_TOKENS
+    return math.ceil(input_tokens * STAGE_OUTPUT_RATIO[stage])
+
+
+def chunk_tokens(stage):
+    # Largest chunk one request can handle, so a document takes as few
+    # requests as possible. A request has to fit the context window, the
+    # output limit, a minute's token allowance and the client timeout.
+    profile = profile_for(model_for(stage))
+    ratio = STAGE_OUTPUT_RATIO[stage]
+    fixed_output = profile.reasoning_tokens + (SUMMARY_OUTPUT_TOKENS if stage == "summarise" else 0)
+    limits = [
+        (profile.context_window - PROMPT_OVERHEAD_TOKENS - fixed_output) / (1 + ratio),
+        (profile.tpm - PROMPT_OVERHEAD_TOKENS - fixed_output) / (1 + ratio),
+    ]
+    if ratio:
+        timeout_output = profile.tokens_per_second * REQUEST_TIMEOUT_SECONDS * 0.8
+        limits.append((min(profile.max_output_tokens, timeout_output) - profile.reasoning_tokens) / ratio)
+    if MAX_CHUNK_TOKENS:
+        limits.append(MAX_CHUNK_TOKENS)
+    return max(int(min(limits)), 1000)
+
+
+def completion_budget(stage, messages):
+    # max_completion_tokens for a request: the expected output plus reasoning
+    # and headroom, within what the model and its context window allow
+    profile = profile_for(model_for(stage))
+    prompt_tokens = sum(count_tokens(message["content"]) for message in messages) + PROMPT_OVERHEAD_TOKENS
+    expected = output_tokens_for(stage, prompt_tokens)
+    budget = int(expected * 1.5) + profile.reasoning_tokens
+    return max(min(budget, profile.max_output_tokens, profile.context_window - prompt_tokens), 1)
@@ -0,0 +1,16 @@
+# models/api_usage.py
+from datetime import datetime
+from . import db
+
+class ApiUsage(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    filename = db.Column(db.String(255), nullable=True, index=True)  # None for calls made outside a job
+    stage = db.Column(db.String(30), nullable=False)  # transcribe, format, summarise, latex, latex_summary
+    model = db.Column(db.String(64), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default="ok")  # ok, error, interrupted
+    prompt_tokens = db.Column(db.Integer, nullable=False, default=0)
+    completion_tokens = db.Column(db.Integer, nullable=False, default=0)
+    reasoning_tokens = db.Column(db.Integer, nullable=False, default=0)
+    audio_seconds = db.Column(db.Float, nullable=True)
+    latency_seconds = db.Column(db.Float, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
@@ -0,0 +1,13 @@
+# models/batch.py
+from datetime import datetime
+from . import db
+
+class Batch(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    public_id = db.Column(db.String(32), nullable=False, unique=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    max_parallel = db.Column(db.Integer, nullable=False, default=2)
+    auto_finalize = db.Column(db.Boolean, nullable=False, default=False)  # render outputs from the unedited text
+    playlist_url = db.Column(db.String(2048), nullable=True)
+    playlist_status = db.Column(db.String(20), nullable=True)  # expanding, expanded, failed
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
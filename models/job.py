@@ -0,0 +1,25 @@
+# models/job.py
+from datetime import datetime
+from . import db
+
+class Job(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    filename = db.Column(db.String(255), nullable=False, unique=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    source = db.Column(db.String(20), nullable=False, default="upload")  # upload, form, youtube, api
+    status = db.Column(db.String(20), nullable=False, default="uploading")
+    original_filename = db.Column(db.String(255), nullable=True)
+    source_url = db.Column(db.String(2048), nullable=True)  # YouTube link for youtube jobs
+    batch_id = db.Column(db.Integer, db.ForeignKey('batch.id'), nullable=True, index=True)
+    audio_path = db.Column(db.String(512), nullable=True)
+    outputs = db.Column(db.JSON, nullable=False)
+    upload_size = db.Column(db.BigInteger, nullable=True)
+    upload_offset = db.Column(db.BigInteger, nullable=False, default=0)
+    sha256 = db.Column(db.String(64), nullable=True)
+    media_format = db.Column(db.String(100), nullable=True)
+    duration_seconds = db.Column(db.Float, nullable=True)
+    tempo = db.Column(db.Float, nullable=True)  # set for fast mode: the speed-up applied before upload
+    speech_map = db.Column(db.JSON, nullable=True)  # [[trimmed_ms, original_ms, length_ms]] when silence was cut
+    credits_charged = db.Column(db.Integer, nullable=True)
+    profiling = db.Column(db.Boolean, nullable=False, default=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
@@ -0,0 +1,12 @@
+# models/job_profile.py
+from datetime import datetime
+from . import db
+
+class JobProfile(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    filename = db.Column(db.String(255), nullable=False, index=True)
+    stage = db.Column(db.String(100), nullable=False)
+    kind = db.Column(db.String(20), nullable=False)  # cpu, memory, snapshot
+    name = db.Column(db.String(255), nullable=False)
+    data = db.Column(db.LargeBinary, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
@@ -0,0 +1,16 @@
+# models/latex_chunk.py
+from datetime import datetime
+from . import db
+
+class LatexChunk(db.Model):
+    # The chunks the last LaTeX render split a document into, with the body
+    # the LLM produced for each, so a later finalize only regenerates edits
+    __table_args__ = (db.UniqueConstraint('filename', 'kind', 'position', name='uq_latex_chunk_filename_kind_position'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    filename = db.Column(db.String(255), nullable=False, index=True)
+    kind = db.Column(db.String(20), nullable=False)  # transcript, summary
+    position = db.Column(db.Integer, nullable=False)
+    text = db.Column(db.Text, nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
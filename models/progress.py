@@ -5,4 +5,5 @@ class Progress(db.Model):
     filename = db.Column(db.String, nullable=False)
     message = db.Column(db.String, nullable=False)
     is_done = db.Column(db.Boolean, default=False)
-    phase = db.Column(db.String, nullable=False, default="phase1")
\ No newline at end of file
+    phase = db.Column(db.String, nullable=False, default="phase1")
+    event = db.Column(db.String(20), nullable=True)  # SSE event type; None for plain messages
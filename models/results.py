@@ -1,11 +1,25 @@
 # models/results.py
+from sqlalchemy.orm import deferred
 from . import db
+from .types import CompressedText
 
 class Results(db.Model):
+    # The documents and ZIPs are deferred: status checks and polling load only
+    # the small columns, and the large ones are fetched when first accessed
+    # (or up front with undefer_group)
     id = db.Column(db.Integer, primary_key=True)
     filename = db.Column(db.String(255), nullable=False, unique=True)
-    transcript = db.Column(db.Text, nullable=True)
-    summary = db.Column(db.Text, nullable=True)
+    transcript = deferred(db.Column(CompressedText, nullable=True), group="documents")
+    summary = deferred(db.Column(CompressedText, nullable=True), group="documents")
+    # Whisper segments, [{"start", "end", "text"}] in seconds of the original recording
+    segments = deferred(db.Column(db.JSON, nullable=True))
     outputs = db.Column(db.JSON, nullable=False)
     zip_ready = db.Column(db.Boolean, default=False)
-    zip_data = db.Column(db.LargeBinary, nullable=True)
\ No newline at end of file
+    zip_data = deferred(db.Column(db.LargeBinary, nullable=True))
+    # "processing" while phase 1 streams text into the row, then "ready" or "failed"
+    status = db.Column(db.String(20), nullable=False, default="ready", server_default="ready")
+    # Outputs rendered speculatively from the unedited text; prerender_key
+    # identifies the documents so /finalize can tell if they still match
+    prerender_key = db.Column(db.String(64), nullable=True)
+    prerender_status = db.Column(db.String(20), nullable=True)  # running, ready, failed
+    prerender_zip = deferred(db.Column(db.LargeBinary, nullable=True))
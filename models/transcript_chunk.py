@@ -0,0 +1,18 @@
+# models/transcript_chunk.py
+from datetime import datetime
+from . import db
+from .types import CompressedText
+
+class TranscriptChunk(db.Model):
+    # The editable copy of a job's transcript and summary, split into chunks
+    # the editor loads a page at a time and saves one by one. /finalize
+    # reassembles the documents from these rows.
+    __table_args__ = (db.UniqueConstraint('filename', 'kind', 'position'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    filename = db.Column(db.String(255), nullable=False, index=True)
+    kind = db.Column(db.String(20), nullable=False)  # transcript, summary
+    position = db.Column(db.Integer, nullable=False)
+    text = db.Column(CompressedText, nullable=False)  # zstd, like the Results documents
+    version = db.Column(db.Integer, nullable=False, default=1)  # bumped on every save
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
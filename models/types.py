@@ -0,0 +1,15 @@
+# models/types.py
+from sqlalchemy.types import TypeDecorator, LargeBinary
+import compression
+
+
+class CompressedText(TypeDecorator):
+    # Text stored as a zstd frame; reads and writes plain str
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return compression.compress(value)
+
+    def process_result_value(self, value, dialect):
+        return compression.decompress(value)
@@ -8,4 +8,7 @@ class User(UserMixin, db.Model):
     username = db.Column(db.String(100), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
     password = db.Column(db.String(200), nullable=False)
-    credits = db.Column(db.Integer, default=10)
\ No newline at end of file
+    credits = db.Column(db.Integer, default=10)
+    is_admin = db.Column(db.Boolean, nullable=False, default=False)
+    # Scheduler share: free, standard or priority (see scheduler.TIER_WEIGHTS)
+    priority_tier = db.Column(db.String(20), nullable=False, default="standard", server_default="standard")
@@ -0,0 +1,45 @@
+import os
+import re
+
+# Builds the formatted transcript locally from Whisper's timestamped segments.
+# Whisper already punctuates and capitalises, so all that's missing is
+# paragraphing: a new paragraph starts at a sentence boundary after a long
+# pause, or once a paragraph has grown long. Segment times are in seconds of
+# the original recording (silence cut before transcription shows up as a gap).
+
+PAUSE_SECONDS = float(os.getenv("PARAGRAPH_PAUSE_SECONDS", "1.5"))
+MIN_WORDS = int(os.getenv("PARAGRAPH_MIN_WORDS", "40"))
+MAX_WORDS = int(os.getenv("PARAGRAPH_MAX_WORDS", "180"))
+
+SENTENCE_END = re.compile(r"""[.!?…]["')\]]*$""")
+
+
+def ends_sentence(text):
+    return bool(SENTENCE_END.search(text))
+
+
+def build_paragraphs(segments):
+    # segments: [{"start": s, "end": s, "text": str}] in order
+    paragraphs = []
+    current = []
+    words = 0
+    previous_end = None
+
+    for segment in segments:
+        text = segment["text"].strip()
+        if not text:
+            continue
+        if current:
+            pause = segment["start"] - previous_end
+            at_boundary = ends_sentence(current[-1])
+            if (at_boundary and ((pause >= PAUSE_SECONDS and words >= MIN_WORDS) or words >= MAX_WORDS)) \
+                    or pause >= PAUSE_SECONDS * 4 or words >= MAX_WORDS * 2:
+                paragraphs.append(" ".join(current))
+                current, words = [], 0
+        current.append(text)
+        words += len(text.split())
+        previous_end = segment["end"]
+
+    if current:
+        paragraphs.append(" ".join(current))
+    return "\n\n".join(paragraphs)
@@ -1,22 +1,123 @@
 import os
 import math
-from openai import OpenAI
-from fpdf import FPDF
+import difflib
+import threading
+import time
 from dotenv import load_dotenv
-from pydub import AudioSegment
 import tempfile
-import tiktoken
 import subprocess
 import shutil
-from docx import Document
+from audio_backend import get_audio_segment
+from metrics import track_stage, record_error, observe_chunks, WHISPER_UPLOAD_BYTES, LATEX_CHUNKS, SILENCE_TRIMMED_SECONDS
+from tokenizer import get_encoder, count_tokens
+from model_profiles import DEFAULT_MODEL, REQUEST_TIMEOUT_SECONDS, model_for, chunk_tokens, completion_budget
+import vad
+from usage import ledger
 
 
 load_dotenv()
-client = OpenAI()
+
+# The OpenAI client (and its HTTP connection pool) is created on first use in
+# each worker process, never at import time and never before a fork.
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from openai import OpenAI
+                _client = OpenAI(timeout=REQUEST_TIMEOUT_SECONDS)
+    return _client
+
+
+# Chat completions are streamed by default so partial text can be shown and
+# saved while a long response is still being generated.
+STREAM_COMPLETIONS = os.getenv("STREAM_COMPLETIONS", "1") == "1"
+
+
+class StreamInterrupted(Exception):
+    # A streamed completion failed after some text had already arrived
+    def __init__(self, partial, cause):
+        super().__init__(f"stream interrupted after {len(partial)} characters: {cause}")
+        self.partial = partial
+
+
+def create_completion(messages, max_completion_tokens, model, stage):
+    # A non-streamed chat completion, recorded in the usage ledger
+    start = time.perf_counter()
+    try:
+        response = get_client().chat.completions.create(
+            model=model, messages=messages, max_completion_tokens=max_completion_tokens)
+    except Exception:
+        ledger.record(stage, model, time.perf_counter() - start, status="error")
+        raise
+    ledger.record_response(stage, model, time.perf_counter() - start, response.usage)
+    return response
+
+
+def complete_chat(messages, max_completion_tokens, on_delta=None, model=DEFAULT_MODEL, stage="chat"):
+    # on_delta(text) receives the response piece by piece, already stripped of
+    # leading whitespace so the pieces add up to the returned text (minus any
+    # trailing whitespace). Usage is recorded in the ledger under stage.
+    if not STREAM_COMPLETIONS:
+        response = create_completion(messages, max_completion_tokens, model, stage)
+        content = response.choices[0].message.content.strip()
+        if on_delta:
+            on_delta(content)
+        return content
+
+    start = time.perf_counter()
+    parts = []
+    usage = None
+    try:
+        stream = get_client().chat.completions.create(
+            model=model, messages=messages, max_completion_tokens=max_completion_tokens,
+            stream=True, stream_options={"include_usage": True})
+        for event in stream:
+            if event.usage:
+                usage = event.usage
+            if not event.choices:
+                continue
+            delta = event.choices[0].delta.content
+            if not parts and delta:
+                delta = delta.lstrip()
+            if not delta:
+                continue
+            parts.append(delta)
+            if on_delta:
+                on_delta(delta)
+    except Exception as e:
+        # The usage event never arrived, so the tokens are estimated
+        ledger.record(stage, model, time.perf_counter() - start,
+                      prompt_tokens=sum(count_tokens(message["content"]) for message in messages),
+                      completion_tokens=count_tokens("".join(parts)),
+                      status="interrupted" if parts else "error")
+        if parts:
+            raise StreamInterrupted("".join(parts).rstrip(), e) from e
+        raise
+    ledger.record_response(stage, model, time.perf_counter() - start, usage)
+    return "".join(parts).rstrip()
+
 
 # Target size per chunk (bytes). 24MB leaves buffer under 25MB Whisper limit.
 CHUNK_TARGET_SIZE = 24 * 1024 * 1024
 
+# Chunks are re-exported as MP3 at ffmpeg's default bitrate, so a compact source
+# (e.g. opus from YouTube) must not be sized by its own bytes per millisecond.
+CHUNK_EXPORT_BYTES_PER_MS = 128000 / 8 / 1000
+
+# Long silences are cut out before chunking so they aren't uploaded and
+# transcribed (and Whisper doesn't hallucinate text into them)
+TRIM_SILENCE = os.getenv("TRIM_SILENCE", "1") == "1"
+
+# Fast mode speeds the audio up (pitch preserved) before upload, so each chunk
+# covers more of the recording. ffmpeg's atempo filter, clamped to what it
+# handles in a single pass.
+FAST_MODE_TEMPO = min(max(float(os.getenv("FAST_MODE_TEMPO", "1.5")), 1.0), 2.0)
+
 
 def sanitize_for_fpdf(text):
     replacements = {
@@ -68,76 +169,204 @@ def sanitize_for_fpdf(text):
     # Finally encode to latin-1, replacing unsupported chars with '?'
     return text.encode("latin-1", errors="replace").decode("latin-1")
 
-def split_audio_by_size(file_path, chunk_target_size=CHUNK_TARGET_SIZE):
-    audio = AudioSegment.from_file(file_path)
-    total_size = os.path.getsize(file_path)
-    duration_ms = len(audio)
+def split_audio_by_size(file_path, chunk_target_size=CHUNK_TARGET_SIZE, work_dir=None):
+    audio = get_audio_segment().from_file(file_path)
+    return split_audio_segment(audio, audio_bytes_per_ms(file_path, audio), chunk_target_size, work_dir)
 
+def audio_bytes_per_ms(file_path, audio):
     # Estimate bytes per millisecond
-    bytes_per_ms = total_size / duration_ms
-    chunk_length_ms = math.floor(chunk_target_size / bytes_per_ms)
+    return max(os.path.getsize(file_path) / max(len(audio), 1), CHUNK_EXPORT_BYTES_PER_MS)
 
-    chunks = []
-    for i in range(0, duration_ms, chunk_length_ms):
-        chunk = audio[i:i + chunk_length_ms]
+def chunk_length_for(bytes_per_ms, chunk_target_size=CHUNK_TARGET_SIZE, tempo=1.0):
+    # With tempo > 1 each exported chunk plays (and weighs) 1/tempo of its
+    # source length, so chunks can cover proportionally more audio
+    return math.floor(chunk_target_size * tempo / bytes_per_ms)
 
-        # Create a temp file name only, don't keep the file handle open
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as tmp:
-            chunk_path = tmp.name
+def split_audio_segment(audio, bytes_per_ms, chunk_target_size=CHUNK_TARGET_SIZE, work_dir=None, tempo=1.0,
+                        speech_map=None):
+    # With a speech_map (see vad.py) the chunks are cut from the trimmed audio,
+    # each assembled from the kept spans it covers
+    duration_ms = vad.kept_ms(speech_map) if speech_map else len(audio)
+    chunk_length_ms = chunk_length_for(bytes_per_ms, chunk_target_size, tempo)
+    parameters = ["-filter:a", f"atempo={tempo}"] if tempo != 1.0 else None
 
-        chunk.export(chunk_path, format="mp3")  # now safely write to it
-        chunks.append(chunk_path)
+    chunks = []
+    try:
+        for i in range(0, duration_ms, chunk_length_ms):
+            if speech_map:
+                chunk = vad.trimmed_slice(audio, speech_map, i, i + chunk_length_ms)
+            else:
+                chunk = audio[i:i + chunk_length_ms]
+
+            # Create a temp file name only, don't keep the file handle open
+            with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3", dir=work_dir) as tmp:
+                chunk_path = tmp.name
+            chunks.append(chunk_path)
+
+            chunk.export(chunk_path, format="mp3", parameters=parameters)  # now safely write to it
+    except Exception:
+        remove_files(chunks)
+        raise
 
     return chunks
 
-def transcribe_audio(file_path):
-    chunk_paths = split_audio_by_size(file_path)
+def remove_files(paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+def transcribe_audio(file_path, on_progress=None, work_dir=None, on_trim=None, tempo=None, on_segments=None):
+    # on_trim(speech_map, original_ms) is called when silence was cut out
+    # before chunking; see vad.py for the map's layout. tempo (e.g.
+    # FAST_MODE_TEMPO) speeds the uploaded chunks up. on_segments receives
+    # Whisper's timestamped segments, [{"start", "end", "text"}] in seconds of
+    # the original recording, or [] if the API didn't return any.
+    tempo = tempo or 1.0
+    speech_map = None
+    with track_stage("split_audio"):
+        audio = get_audio_segment().from_file(file_path)
+        bytes_per_ms = audio_bytes_per_ms(file_path, audio)
+    audio_ms = len(audio)
+    if TRIM_SILENCE:
+        with track_stage("vad"):
+            speech_map = vad.trim_silence(audio)
+        if speech_map:
+            audio_ms = vad.kept_ms(speech_map)
+            SILENCE_TRIMMED_SECONDS.inc((len(audio) - audio_ms) / 1000)
+            if on_trim:
+                on_trim(speech_map, len(audio))
+    with track_stage("split_audio"):
+        chunk_paths = split_audio_segment(audio, bytes_per_ms, work_dir=work_dir, tempo=tempo, speech_map=speech_map)
+    observe_chunks("transcribe", len(chunk_paths))
+    chunk_length_ms = chunk_length_for(bytes_per_ms, tempo=tempo)
     full_transcript = ""
+    segments = []
+    segments_complete = True
 
-    for i, chunk_path in enumerate(chunk_paths):
-        with open(chunk_path, "rb") as audio_file:
-            transcript = client.audio.transcriptions.create(
-                model="whisper-1",
-                file=audio_file
-            )
-            full_transcript += transcript.text + "\n\n"
-        os.remove(chunk_path)
+    def original_seconds(chunk_start_ms, seconds):
+        # Chunk-relative (sped-up) seconds to seconds of the original recording
+        return round(vad.to_original_ms(chunk_start_ms + seconds * 1000 * tempo, speech_map) / 1000, 2)
 
+    try:
+        for i, chunk_path in enumerate(chunk_paths):
+            WHISPER_UPLOAD_BYTES.inc(os.path.getsize(chunk_path))
+            chunk_start_ms = i * chunk_length_ms
+            audio_seconds = min(chunk_length_ms, audio_ms - chunk_start_ms) / 1000 / tempo
+            start = time.perf_counter()
+            with open(chunk_path, "rb") as audio_file, track_stage("whisper_request"):
+                try:
+                    transcript = get_client().audio.transcriptions.create(
+                        model="whisper-1",
+                        file=audio_file,
+                        response_format="verbose_json",
+                        timestamp_granularities=["segment"],
+                    )
+                except Exception:
+                    ledger.record("transcribe", "whisper-1", time.perf_counter() - start, status="error")
+                    raise
+                ledger.record("transcribe", "whisper-1", time.perf_counter() - start,
+                              audio_seconds=getattr(transcript, "duration", None) or audio_seconds)
+                full_transcript += transcript.text + "\n\n"
+                if transcript.text.strip() and not getattr(transcript, "segments", None):
+                    segments_complete = False
+                for segment in getattr(transcript, "segments", None) or []:
+                    segments.append({
+                        "start": original_seconds(chunk_start_ms, segment.start),
+                        "end": original_seconds(chunk_start_ms, segment.end),
+                        "text": segment.text.strip(),
+                    })
+            os.remove(chunk_path)
+            if on_progress:
+                on_progress((i + 1) * 100 / len(chunk_paths))
+    finally:
+        remove_files(chunk_paths)  # whatever a failed request left behind
+
+    if on_segments:
+        # Partial coverage would drop text from the paragraphed transcript
+        on_segments(segments if segments_complete else [])
     return full_transcript.strip()
 
-def format_transcription(text):
-    chunks = chunk_text_by_tokens(text)
+def format_transcription(text, on_progress=None, on_partial=None):
+    # on_partial(text, offset) is called as formatted text streams in; offset
+    # is where text starts in the final document, and anything the caller
+    # already holds past that offset is replaced.
+    chunks = chunk_text_by_tokens(text, max_tokens=chunk_tokens("format"))
+    observe_chunks("format", len(chunks))
     formatted_chunks = []
+    length = 0
 
 
     for i, chunk in enumerate(chunks):
-        response = client.chat.completions.create(
-            model="o4-mini-2025-04-16",
-            messages=[
+        separator = "\n\n" if formatted_chunks else ""
+        start = length + len(separator)
+        written = [0]
+
+        def on_delta(delta):
+            if on_partial:
+                if written[0]:
+                    on_partial(delta, start + written[0])
+                else:
+                    on_partial(separator + delta, length)
+            written[0] += len(delta)
+
+        try:
+            messages = [
                 {"role": "system", "content": "You are a helpful assistant that formats audio transcripts."},
                 {"role": "user", "content": f"Add punctuation and paragraphing to this transcript:\n{chunk}"}
-            ],
-            max_completion_tokens=40000
-        )
-        formatted_chunks.append(response.choices[0].message.content.strip())
+            ]
+            with track_stage("format_request"):
+                formatted = complete_chat(
+                    messages,
+                    max_completion_tokens=completion_budget("format", messages),
+                    on_delta=on_delta,
+                    model=model_for("format"),
+                    stage="format",
+                )
+        except StreamInterrupted as e:
+            # Partial output would silently drop the rest of this chunk, so
+            # keep the unformatted chunk instead; earlier chunks are unaffected
+            print(f"Formatting chunk {i + 1} was interrupted, keeping it unformatted: {e}")
+            record_error("format_stream")
+            formatted = chunk.strip()
+            if on_partial:
+                on_partial(separator + formatted, length)
+
+        formatted_chunks.append(formatted)
+        length = start + len(formatted)
+        if on_progress:
+            on_progress((i + 1) * 100 / len(chunks))
 
 
     return "\n\n".join(formatted_chunks)
 
-def summarise_text_from_transcript(text):
-    def safe_request(prompt, context_name="summary"):
+def summarise_text_from_transcript(text, on_partial=None):
+    # on_partial(text, offset) streams the summary that will be returned; the
+    # per-chunk summaries are intermediate and are not streamed.
+    def safe_request(prompt, context_name="summary", stream_to=None):
+        written = [0]
+
+        def on_delta(delta):
+            stream_to(delta, written[0])
+            written[0] += len(delta)
+
         try:
-            response = client.chat.completions.create(
-                model="o4-mini-2025-04-16",
-                messages=prompt,
-                max_completion_tokens=20000
-            )
-            return response.choices[0].message.content.strip()
+            with track_stage("summary_request"):
+                return complete_chat(prompt, max_completion_tokens=completion_budget("summarise", prompt),
+                                     on_delta=on_delta if stream_to else None, model=model_for("summarise"),
+                                     stage="summarise")
+        except StreamInterrupted as e:
+            # Keep what was generated rather than losing the whole summary
+            print(f"Streaming {context_name} was interrupted, keeping partial output: {e}")
+            record_error("summary_stream")
+            return e.partial
         except Exception as e:
             return None
 
-    # Use smaller chunk size to prevent overflow
-    chunks = chunk_text_by_tokens(text, max_tokens=20000)
+    max_input_tokens = chunk_tokens("summarise")
+    chunks = chunk_text_by_tokens(text, max_tokens=max_input_tokens)
+    observe_chunks("summarise", len(chunks))
     partial_summaries = []
 
     # One-shot summary if small
@@ -146,7 +375,7 @@ def summarise_text_from_transcript(text):
             {"role": "system", "content": "You are a helpful assistant that summarizes transcripts."},
             {"role": "user", "content": f"Please summarize the following transcript into a few paragraphs. The first line should be a title (no more than 9 words):\n\n{chunks[0]}"}
         ]
-        summary = safe_request(prompt, "one-shot summary")
+        summary = safe_request(prompt, "one-shot summary", stream_to=on_partial)
         if not summary:
             return "[ERROR] Summary failed."
         return summary
@@ -167,26 +396,24 @@ def summarise_text_from_transcript(text):
     combined = "\n\n".join(partial_summaries)
 
     # Trim if over safe token limit (leave room for output)
-    enc = tiktoken.get_encoding("cl100k_base")
+    enc = get_encoder()
     combined_tokens = enc.encode(combined)
-    MAX_FINAL_INPUT_TOKENS = 15000
 
-    if len(combined_tokens) > MAX_FINAL_INPUT_TOKENS:
+    if len(combined_tokens) > max_input_tokens:
 
-        combined = enc.decode(combined_tokens[:MAX_FINAL_INPUT_TOKENS])
+        combined = enc.decode(combined_tokens[:max_input_tokens])
 
     final_prompt = [
         {"role": "system", "content": "You are a helpful assistant that summarizes summaries."},
         {"role": "user", "content": f"Combine and refine the following summaries into a few concise paragraphs. The first line should be a title (no more than 9 words):\n\n{combined}"}
     ]
 
-    final_summary = safe_request(final_prompt, "final summary")
+    final_summary = safe_request(final_prompt, "final summary", stream_to=on_partial)
 
 
     return final_summary or "[ERROR] Final summary could not be generated."
 
 def chunk_text_by_tokens(text, max_tokens=20000):
-    enc = tiktoken.get_encoding("cl100k_base")
     paragraphs = text.split("\n")
 
     chunks = []
@@ -194,14 +421,14 @@ def chunk_text_by_tokens(text, max_tokens=20000):
     current_tokens = 0
 
     for para in paragraphs:
-        token_count = len(enc.encode(para))
+        token_count = count_tokens(para)
         if token_count > max_tokens:
             # Paragraph too large: split by sentence or truncate
             sentences = para.split(". ")
             temp_chunk = []
             temp_tokens = 0
             for sentence in sentences:
-                sentence_tokens = len(enc.encode(sentence))
+                sentence_tokens = count_tokens(sentence)
                 if temp_tokens + sentence_tokens > max_tokens:
                     chunks.append(". ".join(temp_chunk))
                     temp_chunk = [sentence]
@@ -226,6 +453,8 @@ def chunk_text_by_tokens(text, max_tokens=20000):
 
 
 def generate_pdf_from_text(title, body_lines, output_path):
+    from fpdf import FPDF
+
     pdf = FPDF()
     pdf.add_page()
     pdf.set_auto_page_break(auto=True, margin=15)
@@ -265,6 +494,8 @@ def generate_pdf_from_text(title, body_lines, output_path):
 def generate_word_doc_from_text(title, body_lines, output_path):
 
 
+    from docx import Document
+
     doc = Document()
 
     # Add title as heading
@@ -276,32 +507,88 @@ def generate_word_doc_from_text(title, body_lines, output_path):
 
     doc.save(output_path)
 
-def generate_latex_from_transcript(transcript_text, output_dir="uploads", tex_filename="transcript_body.tex"):
+def plan_latex_chunks(text, previous=None, max_tokens=20000):
+    # Returns [(chunk, body or None)]. Chunks from the previous run whose lines
+    # all survive unchanged keep their boundaries and LaTeX body; only the
+    # edited stretches between them are re-chunked and sent to the LLM.
+    if not previous:
+        return [(chunk, None) for chunk in chunk_text_by_tokens(text, max_tokens=max_tokens)]
+
+    old_lines = []
+    for chunk, _ in previous:
+        old_lines.extend(chunk.split("\n"))
+    new_lines = text.split("\n")
+
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    mapped = {}  # old line index -> new line index, for unchanged lines
+    for a, b, size in matcher.get_matching_blocks():
+        for k in range(size):
+            mapped[a + k] = b + k
+
+    kept = []  # (first new line, end new line, body)
+    start = 0
+    for chunk, body in previous:
+        count = len(chunk.split("\n"))
+        first = mapped.get(start)
+        if body is not None and first is not None and all(mapped.get(start + k) == first + k for k in range(count)):
+            if not kept or first >= kept[-1][1]:
+                kept.append((first, first + count, body))
+        start += count
+
+    plan = []
+    cursor = 0
+    for first, end, body in kept + [(len(new_lines), len(new_lines), None)]:
+        gap = "\n".join(new_lines[cursor:first])
+        if gap.strip():
+            plan.extend((chunk, None) for chunk in chunk_text_by_tokens(gap, max_tokens=max_tokens) if chunk.strip())
+        if body is not None:
+            plan.append(("\n".join(new_lines[first:end]), body))
+        cursor = end
+    return plan
+
+
+def generate_latex_from_transcript(transcript_text, output_dir="uploads", tex_filename="transcript_body.tex", on_progress=None,
+                                   previous=None, on_chunks=None):
+    # previous is the [(chunk, body)] list a prior run passed to on_chunks;
+    # bodies for chunks that haven't changed since are reused as they are.
     import os
 
     os.makedirs(output_dir, exist_ok=True)
     tex_path = os.path.join(output_dir, tex_filename)
 
-    chunks = chunk_text_by_tokens(transcript_text, max_tokens=20000)
+    chunks = plan_latex_chunks(transcript_text, previous, max_tokens=chunk_tokens("latex"))
+    observe_chunks("latex", len(chunks))
     latex_bodies = []
 
-    for i, chunk in enumerate(chunks):
+    for i, (chunk, clean_body) in enumerate(chunks):
 
-        response = client.chat.completions.create(
-            model="o4-mini-2025-04-16",
-            messages=[
+        if clean_body is not None:
+            LATEX_CHUNKS.labels(result="reused").inc()
+        else:
+            messages = [
                 {"role": "system", "content": "You are a helpful assistant that converts transcripts to LaTeX."},
                 {"role": "user", "content": f"Convert this into LaTeX body code. Escape all special characters where necessary. Do NOT include document preamble or \\begin{{document}}:\n\n{chunk}"}
-            ],
-            max_completion_tokens=40000
-        )
-
-        body = response.choices[0].message.content.strip()
-        if body.startswith("```"):
-            body = "\n".join(body.splitlines()[1:-1])
-
-        clean_body = clean_latex_unicode(body)
+            ]
+            with track_stage("latex_request"):
+                response = create_completion(
+                    messages,
+                    max_completion_tokens=completion_budget("latex", messages),
+                    model=model_for("latex"),
+                    stage="latex",
+                )
+
+            body = response.choices[0].message.content.strip()
+            if body.startswith("```"):
+                body = "\n".join(body.splitlines()[1:-1])
+
+            clean_body = clean_latex_unicode(body)
+            LATEX_CHUNKS.labels(result="generated").inc()
         latex_bodies.append(clean_body)
+        if on_progress:
+            on_progress((i + 1) * 100 / len(chunks))
+
+    if on_chunks:
+        on_chunks([(chunk, body) for (chunk, _), body in zip(chunks, latex_bodies)])
 
     final_tex = (
         "\\documentclass{article}\n"
@@ -327,19 +614,21 @@ def generate_latex_summary(transcript_text, output_dir="uploads", tex_filename="
     os.makedirs(output_dir, exist_ok=True)
     tex_path = os.path.join(output_dir, tex_filename)
 
-    chunks = chunk_text_by_tokens(transcript_text, max_tokens=20000)
+    chunks = chunk_text_by_tokens(transcript_text, max_tokens=chunk_tokens("latex"))
     latex_bodies = []
 
     for i, chunk in enumerate(chunks):
 
-        response = client.chat.completions.create(
-            model="o4-mini-2025-04-16",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that converts transcripts to LaTeX summaries."},
-                {"role": "user",
-                 "content": f"Convert this into a summary in LaTeX body code. Escape all special characters where necessary. Do NOT include document preamble or \\begin{{document}}:\n\n{chunk}"}
-            ],
-            max_completion_tokens=40000
+        messages = [
+            {"role": "system", "content": "You are a helpful assistant that converts transcripts to LaTeX summaries."},
+            {"role": "user",
+             "content": f"Convert this into a summary in LaTeX body code. Escape all special characters where necessary. Do NOT include document preamble or \\begin{{document}}:\n\n{chunk}"}
+        ]
+        response = create_completion(
+            messages,
+            max_completion_tokens=completion_budget("latex", messages),
+            model=model_for("latex"),
+            stage="latex_summary",
         )
 
         body = response.choices[0].message.content.strip()
@@ -548,15 +837,28 @@ def compile_latex_to_pdf(latex_file, pdf_path):
 
 
     except (subprocess.CalledProcessError, FileNotFoundError):
-        pass
+        record_error("compile_latex")
+
 
 
 
+def latex_source_path(pdf_path):
+    # The .tex sits next to the PDF and shares its name, so concurrent renders
+    # (a finalize and a pre-render, or two jobs) never write the same file
+    return os.path.splitext(pdf_path)[0] + ".tex"
 
-def generate_latex_pdf_from_transcipt(transcript, pdf_path):
-    latex_file = generate_latex_from_transcript(transcript, "uploads", "Math_Transcription.tex")
-    compile_latex_to_pdf(latex_file, pdf_path)
+def generate_latex_pdf_from_transcipt(transcript, pdf_path, on_progress=None, previous=None, on_chunks=None):
+    tex_path = latex_source_path(pdf_path)
+    latex_file = generate_latex_from_transcript(
+        transcript, os.path.dirname(tex_path), os.path.basename(tex_path), on_progress, previous, on_chunks)
+    with track_stage("compile_latex"):
+        compile_latex_to_pdf(latex_file, pdf_path)
+    return latex_file
 
-def generate_latex_pdf_from_summary(transcript, pdf_path):
-    latex_file = generate_latex_from_transcript(transcript, "uploads", "Math_Summary.tex")
-    compile_latex_to_pdf(latex_file, pdf_path)
\ No newline at end of file
+def generate_latex_pdf_from_summary(transcript, pdf_path, on_progress=None, previous=None, on_chunks=None):
+    tex_path = latex_source_path(pdf_path)
+    latex_file = generate_latex_from_transcript(
+        transcript, os.path.dirname(tex_path), os.path.basename(tex_path), on_progress, previous, on_chunks)
+    with track_stage("compile_latex"):
+        compile_latex_to_pdf(latex_file, pdf_path)
+    return latex_file
\ No newline at end of file
@@ -0,0 +1,134 @@
+import gzip
+import os
+import sys
+import tempfile
+import threading
+import tracemalloc
+from collections import Counter
+
+# Opt-in per-job profiling. A sampler thread records the job thread's stack
+# every SAMPLE_INTERVAL seconds (collapsed-stack format, ready for
+# flamegraph.pl or speedscope), and a tracemalloc snapshot is taken at each
+# top-level stage boundary reported through metrics.track_stage. Jobs without
+# profiling never create a JobProfiler, so the only cost is a None check.
+
+SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.01"))
+TRACEMALLOC_FRAMES = 10
+TOP_ALLOCATIONS = 30
+
+_local = threading.local()
+_tracemalloc_users = 0
+_tracemalloc_lock = threading.Lock()
+
+
+def current():
+    return getattr(_local, "profiler", None)
+
+
+def _start_tracemalloc():
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        _tracemalloc_users += 1
+
+
+def _stop_tracemalloc():
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0:
+            tracemalloc.stop()
+
+
+class JobProfiler:
+    def __init__(self, filename, phase):
+        self.filename = filename
+        self.phase = phase
+        self.thread_id = threading.get_ident()
+        self.artifacts = []  # (stage, kind, name, data)
+        self._stacks = Counter()
+        self._stacks_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._stage = "setup"
+        self._depth = 0
+        self._segment = 0
+        self._snapshot = None
+        self._sampler = None
+
+    def start(self):
+        _start_tracemalloc()
+        self._snapshot = self._take_snapshot()
+        self._sampler = threading.Thread(target=self._sample, name=f"profiler-{self.filename}", daemon=True)
+        self._sampler.start()
+        _local.profiler = self
+        return self
+
+    def _sample(self):
+        while not self._stop.wait(SAMPLE_INTERVAL):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                with self._stacks_lock:
+                    self._stacks[";".join(reversed(stack))] += 1
+
+    def _take_snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+
+    def stage_started(self, stage):
+        self._depth += 1
+        if self._depth == 1:
+            self._boundary()
+            self._stage = stage
+
+    def stage_finished(self, stage):
+        self._depth -= 1
+        if self._depth == 0:
+            self._boundary()
+            self._stage = f"after-{stage}"
+
+    def _boundary(self):
+        prefix = f"{self.phase}/{self._segment:02d}-{self._stage}"
+        self._segment += 1
+
+        with self._stacks_lock:
+            stacks, self._stacks = self._stacks, Counter()
+        if stacks:
+            collapsed = "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+            self.artifacts.append((self._stage, "cpu", f"{prefix}.collapsed", collapsed.encode()))
+
+        snapshot = self._take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"Traced memory: current {current / 1e6:.1f} MB, peak {peak / 1e6:.1f} MB", "",
+                 f"Top {TOP_ALLOCATIONS} allocations:"]
+        lines += [str(stat) for stat in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]]
+        lines += ["", f"Top {TOP_ALLOCATIONS} changes since previous boundary:"]
+        lines += [str(stat) for stat in snapshot.compare_to(self._snapshot, "lineno")[:TOP_ALLOCATIONS]]
+        self.artifacts.append((self._stage, "memory", f"{prefix}.txt", "\n".join(lines).encode()))
+
+        # Raw snapshot for tracemalloc.Snapshot.load() when the summary isn't enough
+        with tempfile.NamedTemporaryFile(suffix=".tracemalloc", delete=False) as tmp:
+            dump_path = tmp.name
+        try:
+            snapshot.dump(dump_path)
+            with open(dump_path, "rb") as f:
+                self.artifacts.append((self._stage, "snapshot", f"{prefix}.tracemalloc.gz", gzip.compress(f.read())))
+        finally:
+            os.remove(dump_path)
+
+        self._snapshot = snapshot
+
+    def finish(self):
+        self._stop.set()
+        self._sampler.join()
+        self._boundary()
+        _local.profiler = None
+        _stop_tracemalloc()
+        return self.artifacts
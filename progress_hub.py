@@ -0,0 +1,110 @@
+import os
+import queue
+import threading
+from models import db
+from models.progress import Progress
+from metrics import SSE_CONNECTIONS
+
+# One poller per worker process reads new Progress rows for every job being
+# watched and fans them out to the /progress connections, instead of each
+# connection querying the database once a second. Connections only wait on
+# their own queue, which under the gevent worker costs a greenlet rather than
+# a thread.
+
+POLL_INTERVAL = float(os.getenv("PROGRESS_POLL_INTERVAL", "0.5"))
+MAX_QUEUED = 1000  # events held for a client that has stopped reading
+
+
+class Subscription:
+    def __init__(self, filename, phase, after_id):
+        self.filename = filename
+        self.phase = phase
+        self.last_id = after_id
+        self.queue = queue.Queue(MAX_QUEUED)
+        self.overflowed = False
+
+    def get(self, timeout):
+        # (id, message, event, is_done) or None if nothing arrived in time
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def deliver(self, row):
+        if row[0] <= self.last_id:
+            return
+        self.last_id = row[0]
+        try:
+            self.queue.put_nowait(row)
+        except queue.Full:
+            self.overflowed = True  # the connection is dropped and the client resumes
+
+
+class ProgressHub:
+    def __init__(self, poll_interval=POLL_INTERVAL):
+        self.app = None
+        self.poll_interval = poll_interval
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._subscriptions = {}  # (filename, phase) -> set of Subscription
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def init_app(self, app):
+        self.app = app
+
+    def subscribe(self, filename, phase, after_id=0):
+        subscription = Subscription(filename, phase, after_id)
+        with self._lock:
+            self._subscriptions.setdefault((filename, phase), set()).add(subscription)
+            SSE_CONNECTIONS.inc()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="progress-hub", daemon=True)
+                self._thread.start()
+        self._wake.set()  # new subscribers get their backlog without waiting a full interval
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            key = (subscription.filename, subscription.phase)
+            subscribers = self._subscriptions.get(key)
+            if subscribers is not None and subscription in subscribers:
+                subscribers.discard(subscription)
+                SSE_CONNECTIONS.dec()
+                if not subscribers:
+                    del self._subscriptions[key]
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"Progress poll failed: {e}")
+
+    def poll(self):
+        with self._lock:
+            watched = {key: list(subscribers) for key, subscribers in self._subscriptions.items() if subscribers}
+        if not watched:
+            return
+
+        since = min(sub.last_id for subscribers in watched.values() for sub in subscribers)
+        filenames = {filename for filename, _ in watched}
+        with self.app.app_context():
+            try:
+                rows = db.session.query(
+                    Progress.id, Progress.filename, Progress.phase, Progress.message, Progress.event, Progress.is_done,
+                ).filter(Progress.filename.in_(filenames), Progress.id > since).order_by(Progress.id).all()
+            finally:
+                db.session.remove()
+
+        for id, filename, phase, message, event, is_done in rows:
+            for subscription in watched.get((filename, phase), ()):
+                subscription.deliver((id, message, event, is_done))
+
+
+progress_hub = ProgressHub()
@@ -0,0 +1,92 @@
+import atexit
+import os
+import threading
+from sqlalchemy import insert
+from models import db
+from models.progress import Progress
+
+FLUSH_INTERVAL = float(os.getenv("PROGRESS_FLUSH_INTERVAL", "0.5"))
+MAX_PENDING = 10000
+
+
+class ProgressWriter:
+    # Progress events are buffered in memory and written in one INSERT per
+    # flush interval instead of one commit per message. Terminal (is_done)
+    # events are flushed synchronously so the job's final state is durable
+    # before the caller moves on. Events logged with the same coalesce_key
+    # replace each other while pending, so percent updates stay cheap.
+
+    def __init__(self, flush_interval=FLUSH_INTERVAL):
+        self.app = None
+        self.flush_interval = flush_interval
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        # Also runs in forked children: locks may have been held and the
+        # flusher thread does not survive a fork
+        self._pending = []
+        self._coalesce = {}  # (filename, phase, key) -> index into _pending
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def init_app(self, app):
+        self.app = app
+        atexit.register(self.flush)
+
+    def log(self, filename, message, is_done=False, phase="phase1", coalesce_key=None, event=None):
+        row = {"filename": filename, "message": message, "is_done": is_done, "phase": phase, "event": event}
+        with self._lock:
+            key = (filename, phase, coalesce_key)
+            if coalesce_key is not None and key in self._coalesce:
+                self._pending[self._coalesce[key]] = row
+            else:
+                if coalesce_key is not None:
+                    self._coalesce[key] = len(self._pending)
+                self._pending.append(row)
+
+        if is_done:
+            self.flush()
+        else:
+            self._ensure_thread()
+
+    def log_percent(self, filename, label, percent, phase="phase1"):
+        self.log(filename, f"{label} {int(percent)}%", phase=phase, coalesce_key=label)
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="progress-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                rows, self._pending, self._coalesce = self._pending, [], {}
+            if not rows or self.app is None:
+                return
+
+            with self.app.app_context():
+                try:
+                    db.session.execute(insert(Progress), rows)
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Failed to write {len(rows)} progress events: {e}")
+                    with self._lock:
+                        if len(self._pending) + len(rows) <= MAX_PENDING:
+                            self._pending[:0] = rows
+                            self._coalesce = {}
+
+
+progress_writer = ProgressWriter()
@@ -0,0 +1,141 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+from metrics import QUEUE_DEPTH, QUEUE_WAIT, QUEUE_WAIT_TOTAL, QUEUE_DISPATCHED
+
+# Background work runs on a fixed pool of threads, dispatched in start-time fair
+# queuing order: every user has a virtual clock that advances by each job's
+# cost (audio minutes) divided by their tier weight, and the task with the
+# earliest virtual start goes next. A user with ten long recordings queued
+# therefore can't hold back someone else's short one, and a higher tier gets
+# a proportionally larger share rather than strict precedence.
+#
+# Each process has its own scheduler, so under gunicorn the share is fair
+# within a worker and roughly fair across them.
+
+WORKERS = int(os.getenv("SCHEDULER_WORKERS", "3"))
+TIER_WEIGHTS = {
+    "free": 1.0,
+    "standard": 2.0,
+    "priority": 4.0,
+    "background": 0.25,  # speculative work such as pre-renders
+}
+DEFAULT_TIER = "standard"
+DEFAULT_COST = 10.0  # minutes, for work whose duration isn't known yet (e.g. before a download)
+
+
+class Task:
+    def __init__(self, fn, args, user_id, tier, cost, group, start, seq):
+        self.fn = fn
+        self.args = args
+        self.user_id = user_id
+        self.tier = tier
+        self.cost = cost
+        self.group = group
+        self.start = start
+        self.seq = seq
+        self.enqueued_at = time.monotonic()
+
+    def __lt__(self, other):
+        return (self.start, self.seq) < (other.start, other.seq)
+
+
+class FairScheduler:
+    def __init__(self, workers=WORKERS):
+        self.workers = workers
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        # Also runs in forked children, which inherit neither threads nor locks
+        self._cond = threading.Condition()
+        self._queue = []  # heap of Task, earliest virtual start first
+        self._finish = {}  # user_id -> virtual finish of their latest task
+        self._virtual_time = 0.0
+        self._group_running = {}
+        self._group_limits = {}
+        self._seq = itertools.count()
+        self._threads = []
+
+    def submit(self, fn, *args, user_id, cost=None, tier=None, group=None, group_limit=None):
+        # group/group_limit cap how many tasks sharing a group run at once
+        # (a batch's max_parallel); other groups and users are unaffected
+        tier = tier if tier in TIER_WEIGHTS else DEFAULT_TIER
+        cost = max(float(cost or DEFAULT_COST), 1.0)
+        with self._cond:
+            start = max(self._virtual_time, self._finish.get(user_id, 0.0))
+            self._finish[user_id] = start + cost / TIER_WEIGHTS[tier]
+            if group is not None and group_limit:
+                self._group_limits[group] = group_limit
+            heapq.heappush(self._queue, Task(fn, args, user_id, tier, cost, group, start, next(self._seq)))
+            QUEUE_DEPTH.labels(user=str(user_id)).inc()
+            self._ensure_workers()
+            self._cond.notify()
+
+    def queued(self):
+        with self._cond:
+            return len(self._queue)
+
+    def _ensure_workers(self):
+        self._threads = [thread for thread in self._threads if thread.is_alive()]
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, name=f"scheduler-{len(self._threads)}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _take(self):
+        # Earliest eligible task; tasks whose group is at its limit wait their turn
+        skipped = []
+        task = None
+        while self._queue:
+            candidate = heapq.heappop(self._queue)
+            limit = self._group_limits.get(candidate.group)
+            if limit and self._group_running.get(candidate.group, 0) >= limit:
+                skipped.append(candidate)
+                continue
+            task = candidate
+            break
+        for candidate in skipped:
+            heapq.heappush(self._queue, candidate)
+        return task
+
+    def _work(self):
+        while True:
+            with self._cond:
+                task = self._take()
+                while task is None:
+                    self._cond.wait()
+                    task = self._take()
+                self._virtual_time = max(self._virtual_time, task.start)
+                if task.group is not None:
+                    self._group_running[task.group] = self._group_running.get(task.group, 0) + 1
+                if len(self._finish) > 1000:
+                    # Users whose clock is behind the global one start from it anyway
+                    self._finish = {user: finish for user, finish in self._finish.items()
+                                    if finish > self._virtual_time}
+
+            waited = time.monotonic() - task.enqueued_at
+            user = str(task.user_id)
+            QUEUE_DEPTH.labels(user=user).dec()
+            QUEUE_WAIT.labels(tier=task.tier).observe(waited)
+            QUEUE_WAIT_TOTAL.labels(user=user).inc(waited)
+            QUEUE_DISPATCHED.labels(user=user).inc()
+
+            try:
+                task.fn(*task.args)
+            except Exception as e:
+                print(f"Scheduled task {getattr(task.fn, '__name__', task.fn)} failed: {e}")
+            finally:
+                with self._cond:
+                    if task.group is not None:
+                        self._group_running[task.group] -= 1
+                        if not self._group_running[task.group] and not any(
+                                queued.group == task.group for queued in self._queue):
+                            self._group_running.pop(task.group, None)
+                            self._group_limits.pop(task.group, None)
+                    self._cond.notify_all()
+
+
+scheduler = FairScheduler()
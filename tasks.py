@@ -1,6 +1,12 @@
 import os
 import io
+import hashlib
+import json
+import time
+import uuid
 import zipfile
+from sqlalchemy import exists
+from sqlalchemy.exc import IntegrityError
 from pdfgeneration import (
     generate_pdf_from_text,
     generate_word_doc_from_text,
@@ -10,154 +16,615 @@ from pdfgeneration import (
     summarise_text_from_transcript,
     transcribe_audio
 )
-from models.progress import Progress
+from progress_writer import progress_writer
+from scheduler import scheduler
 from models.results import Results
+from models.user import User
 from models import db
-
-import yt_dlp
-import uuid
+from models.job import Job
+from models.batch import Batch
+from models.job_profile import JobProfile
+from models.latex_chunk import LatexChunk
+from profiling import JobProfiler
+from credits import calculate_and_deduct_credits, get_duration_seconds, refund_unused_credits
+import vad
+import usage
+from paragraphs import build_paragraphs
+import editor_chunks
+import uploads
+import workspace
+import youtube_cache
+from metrics import track_stage, track_job, record_error, UPLOAD_BYTES
 
 def log_progress(filename, message, is_done=False, phase="phase1"):
-    progress = Progress(filename=filename, message=message, is_done=is_done, phase=phase)
-    db.session.add(progress)
-    db.session.commit()
+    progress_writer.log(filename, message, is_done=is_done, phase=phase)
+
+def percent_reporter(filename, label, phase="phase1"):
+    return lambda percent: progress_writer.log_percent(filename, label, percent, phase=phase)
+
+# Streamed text goes to the processing page at most once per PARTIAL_EMIT_INTERVAL
+# and is written to the Results row at most once per PARTIAL_SAVE_INTERVAL.
+PARTIAL_EMIT_INTERVAL = float(os.getenv("PARTIAL_EMIT_INTERVAL", "1"))
+PARTIAL_SAVE_INTERVAL = float(os.getenv("PARTIAL_SAVE_INTERVAL", "3"))
+
+# Outputs for the unedited phase-1 text are rendered ahead of time as a
+# background-tier scheduler task, at most PRERENDER_PARALLEL at once per
+# process. /finalize uses the result if it is ready and renders itself otherwise.
+PRERENDER_OUTPUTS = os.getenv("PRERENDER_OUTPUTS", "1") == "1"
+PRERENDER_PARALLEL = int(os.getenv("PRERENDER_PARALLEL", "1"))
+
+# The transcript is paragraphed locally from Whisper's segment timestamps; set
+# FORMAT_WITH_LLM=1 to also run those paragraphs through the formatting model.
+FORMAT_WITH_LLM = os.getenv("FORMAT_WITH_LLM", "0") == "1"
+
+class PartialResult:
+    # Receives on_partial(text, offset) callbacks for one Results column,
+    # forwards the changes as "partial" progress events and saves the text so
+    # far, so a failure part way through keeps what had been generated.
+
+    def __init__(self, filename, field):
+        self.filename = filename
+        self.field = field
+        self.parts = []
+        self.length = 0
+        self.dirty_from = None  # earliest offset the processing page hasn't seen
+        self.unsaved = False
+        self.last_emit = self.last_save = time.monotonic()
+
+    def __call__(self, text, offset):
+        if offset != self.length:
+            current = "".join(self.parts)[:offset]
+            self.parts, self.length = [current], len(current)
+        self.parts.append(text)
+        self.mark_dirty(min(offset, self.length))
+        self.length += len(text)
+
+        now = time.monotonic()
+        if now - self.last_emit >= PARTIAL_EMIT_INTERVAL:
+            self.emit()
+        if now - self.last_save >= PARTIAL_SAVE_INTERVAL:
+            self.save()
+
+    def mark_dirty(self, offset):
+        self.dirty_from = offset if self.dirty_from is None else min(self.dirty_from, offset)
+        self.unsaved = True
+
+    def emit(self):
+        self.last_emit = time.monotonic()
+        if self.dirty_from is None:
+            return
+        text = "".join(self.parts)
+        payload = {"field": self.field, "offset": self.dirty_from, "text": text[self.dirty_from:]}
+        progress_writer.log(self.filename, json.dumps(payload), phase="phase1", event="partial")
+        self.dirty_from = None
+
+    def save(self):
+        self.last_save = time.monotonic()
+        if not self.unsaved:
+            return
+        Results.query.filter_by(filename=self.filename).update(
+            {self.field: "".join(self.parts)}, synchronize_session=False)
+        db.session.commit()
+        self.unsaved = False
+
+    def finish(self, text):
+        # Bring the page in line with the final text (e.g. after stripping or
+        # an error placeholder); the caller stores the final text itself
+        current = "".join(self.parts)
+        if text != current:
+            self.parts, self.length = [text], len(text or "")
+            self.mark_dirty(len(os.path.commonprefix([current, text or ""])))
+        self.emit()
+
+def set_job_status(filename, status):
+    job = Job.query.filter_by(filename=filename).first()
+    if job:
+        job.status = status
+        db.session.commit()
+
+def record_speech_map(filename):
+    # Keeps the trimmed-to-original timestamp map and refunds the silence,
+    # which was billed up front from the full duration
+    def on_trim(speech_map, original_ms):
+        job = Job.query.filter_by(filename=filename).first()
+        if job is None:
+            return
+        kept = vad.kept_ms(speech_map)
+        job.speech_map = speech_map
+        db.session.commit()
+        refund = refund_unused_credits(job, kept / 1000)
+        message = f"Skipped {(original_ms - kept) / 60000:.1f} minutes of silence"
+        if refund:
+            message += f", {refund} credits refunded"
+        log_progress(filename, message, phase="phase1")
+    return on_trim
+
+def load_latex_chunks(filename, kind):
+    rows = LatexChunk.query.filter_by(filename=filename, kind=kind).order_by(LatexChunk.position).all()
+    return [(row.text, row.body) for row in rows]
+
+def latex_chunk_saver(filename, kind, prerender_key=None):
+    def save(chunks):
+        # The conditional UPDATE on the Results row claims the job's chunks and
+        # holds its row lock until commit, so a pre-render and a finalize can't
+        # interleave their rows. A finalize's render supersedes any pre-render
+        # still running; a pre-render only saves while its documents are current.
+        if prerender_key is None:
+            claimed = Results.query.filter_by(filename=filename) \
+                .update({"prerender_key": None}, synchronize_session=False)
+        else:
+            still_ready = exists().where(Job.filename == filename, Job.status == "ready")
+            claimed = Results.query.filter_by(filename=filename, prerender_key=prerender_key) \
+                .filter(still_ready).update({"prerender_status": "running"}, synchronize_session=False)
+        if not claimed:
+            db.session.rollback()
+            return
+        LatexChunk.query.filter_by(filename=filename, kind=kind).delete()
+        for position, (text, body) in enumerate(chunks):
+            db.session.add(LatexChunk(filename=filename, kind=kind, position=position, text=text, body=body))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()  # another render's rows got there first
+    return save
+
+def start_profiler(filename, phase):
+    job = Job.query.filter_by(filename=filename).first()
+    if job and job.profiling:
+        return JobProfiler(filename, phase).start()
+    return None
+
+def save_profile(app, profiler):
+    with app.app_context():
+        for stage, kind, name, data in profiler.finish():
+            db.session.add(JobProfile(filename=profiler.filename, stage=stage, kind=kind, name=name, data=data))
+        db.session.commit()
 
 def background_process_file(app, audio_path, filename, outputs):
+    profiler = None
     try:
-        with app.app_context():
+        with app.app_context(), track_job("phase1"), usage.attribute(filename):
+            profiler = start_profiler(filename, "phase1")
+            set_job_status(filename, "processing")
             log_progress(filename, "Transcribing audio...", phase="phase1")
-            transcript = transcribe_audio(audio_path)
+            with track_stage("transcribe"), workspace.scratch(app.config['UPLOAD_FOLDER'], filename, "chunks") as chunk_dir:
+                job = Job.query.filter_by(filename=filename).first()
+                segments = []
+                transcript = transcribe_audio(audio_path, on_progress=percent_reporter(filename, "Transcribing audio..."),
+                                              work_dir=chunk_dir, on_trim=record_speech_map(filename),
+                                              tempo=job.tempo if job else None, on_segments=segments.extend)
 
             formatted_transcript = None
             summary = None
 
+            # The row exists before the LLM stages so streamed text can be saved into it
+            result = Results.query.filter_by(filename=filename).first()
+            if result is None:
+                result = Results(filename=filename, outputs=outputs, zip_ready=False)
+                db.session.add(result)
+            result.status = "processing"
+            result.segments = segments or None
+            db.session.commit()
+
             if 'transcript' in outputs or 'latex_transcript' in outputs:
                 log_progress(filename, "Generating formatted transcript...", phase="phase1")
-                formatted_transcript = format_transcription(transcript)
+                partial = PartialResult(filename, "transcript")
+                with track_stage("format"):
+                    if segments:
+                        formatted_transcript = build_paragraphs(segments)
+                    if not segments or FORMAT_WITH_LLM:
+                        formatted_transcript = format_transcription(
+                            formatted_transcript or transcript,
+                            on_progress=percent_reporter(filename, "Formatting transcript..."),
+                            on_partial=partial)
+                partial.finish(formatted_transcript)
                 print("Formatted transcript generated successfully.")
             if 'summary' in outputs or 'latex_summary' in outputs:
                 log_progress(filename, "Generating summary...", phase="phase1")
-                summary = summarise_text_from_transcript(transcript)
+                partial = PartialResult(filename, "summary")
+                with track_stage("summarise"):
+                    summary = summarise_text_from_transcript(transcript, on_partial=partial)
+                partial.finish(summary)
                 print("Summary generated successfully.")
 
             log_progress(filename, "Storing results...", phase="phase1")
-            result = Results(
-                filename=filename,
-                transcript=formatted_transcript,
-                summary=summary,
-                outputs=outputs,
-                zip_ready=False
-            )
-            db.session.add(result)
-            db.session.commit()
+            with track_stage("store_results"):
+                result = Results.query.filter_by(filename=filename).first()
+                result.transcript = formatted_transcript
+                result.summary = summary
+                result.status = "ready"
+                editor_chunks.save_chunks(filename, "transcript", formatted_transcript)
+                editor_chunks.save_chunks(filename, "summary", summary)
+                db.session.commit()
+            set_job_status(filename, "ready")
 
 
             log_progress(filename, "[DONE]", is_done=True, phase="phase1")
     except Exception as e:
         print(f"Error processing file {filename}: {e}")
+        with app.app_context():
+            db.session.rollback()
+            Results.query.filter_by(filename=filename).update({"status": "failed"}, synchronize_session=False)
+            set_job_status(filename, "failed")
+            log_progress(filename, f"❌ Error during processing: {str(e)}", is_done=True, phase="phase1")
+    finally:
+        # Phase 2 works from the stored text, so the audio isn't needed any more
+        workspace.discard_source(audio_path)
+        if profiler is not None:
+            save_profile(app, profiler)
+
+    if PRERENDER_OUTPUTS:
+        # Speculative, so it queues behind real work instead of holding this slot
+        scheduler.submit(background_prerender_outputs, app, filename, user_id="prerender", tier="background",
+                         group="prerender", group_limit=PRERENDER_PARALLEL)
+
+def document_key(transcript, summary, outputs):
+    # Identifies the documents a render was made from. Browsers submit
+    # textareas with CRLF line breaks, so those are normalised first.
+    normalise = lambda text: (text or "").replace("\r\n", "\n").strip()
+    payload = json.dumps([normalise(transcript), normalise(summary), sorted(outputs)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def render_output_zip(app, transcript, summary, filename, outputs, tag="edited", report=None, phase="phase2",
+                      prerender_key=None):
+    # Renders every requested output and returns the ZIP as bytes. report(message)
+    # receives progress lines; without it the render is silent (pre-rendering).
+    # The files (and LaTeX aux/log files) are written to a scratch directory in
+    # the job's workspace that is removed once the ZIP has been built.
+    with workspace.scratch(app.config['UPLOAD_FOLDER'], filename, f"render-{tag}") as out_dir:
+        return _render_output_zip(out_dir, transcript, summary, filename, outputs, report, phase, prerender_key)
+
+def _render_output_zip(out_dir, transcript, summary, filename, outputs, report, phase, prerender_key):
+    def step(message):
+        if report:
+            report(message)
+
+    def percent(label):
+        return percent_reporter(filename, label, phase=phase) if report else None
+
+    output_files = []
+
+    if transcript:
+        if 'transcript' in outputs:
+            step("Generating transcript PDFs and DOCX...")
+            paragraphs = [p.strip() for p in transcript.split("\n") if p.strip()]
+            pdf_path = os.path.join(out_dir, "transcript.pdf")
+            docx_path = os.path.join(out_dir, "transcript.docx")
+            with track_stage("render_pdf"):
+                generate_pdf_from_text("Transcript", paragraphs, pdf_path)
+            with track_stage("render_docx"):
+                generate_word_doc_from_text("Transcript", paragraphs, docx_path)
+            output_files.append((pdf_path, "edited-transcript.pdf"))
+            output_files.append((docx_path, "edited-transcript.docx"))
+            print("Transcript generated successfully.")
+
+        if 'latex_transcript' in outputs:
+            step("Generating LaTeX PDF...")
+            latex_path = os.path.join(out_dir, "transcript-latex.pdf")
+            with track_stage("latex_transcript"):
+                tex_path = generate_latex_pdf_from_transcipt(
+                    transcript, latex_path, on_progress=percent("Converting transcript to LaTeX..."),
+                    previous=load_latex_chunks(filename, "transcript"),
+                    on_chunks=latex_chunk_saver(filename, "transcript", prerender_key))
+            output_files.append((latex_path, "edited-transcript-latex.pdf"))
+            output_files.append((tex_path, "edited-transcript-latex.tex"))
+            print("Latex PDF generated successfully.")
+
+    if summary:
+
+        if 'summary' in outputs:
+            step("Generating summary PDFs and DOCX...")
+            summary_paragraphs = [p.strip() for p in summary.split("\n") if p.strip()]
+            pdf_path = os.path.join(out_dir, "summary.pdf")
+            docx_path = os.path.join(out_dir, "summary.docx")
+            with track_stage("render_pdf"):
+                generate_pdf_from_text("Summary", summary_paragraphs, pdf_path)
+            with track_stage("render_docx"):
+                generate_word_doc_from_text("Summary", summary_paragraphs, docx_path)
+            output_files.append((pdf_path, "edited-summary.pdf"))
+            output_files.append((docx_path, "edited-summary.docx"))
+            print("Summary generated successfully.")
+        if 'latex_summary' in outputs:
+            step("Generating LaTeX summary PDF...")
+            latex_path = os.path.join(out_dir, "summary-latex.pdf")
+            with track_stage("latex_summary"):
+                tex_path = generate_latex_pdf_from_summary(
+                    summary, latex_path, on_progress=percent("Converting summary to LaTeX..."),
+                    previous=load_latex_chunks(filename, "summary"),
+                    on_chunks=latex_chunk_saver(filename, "summary", prerender_key))
+            output_files.append((latex_path, "edited-summary-latex.pdf"))
+            output_files.append((tex_path, "edited-summary-latex.tex"))
+            print("Latex summary PDF generated successfully.")
+
+
+
+
+    step("Creating ZIP file...")
+    # Create ZIP in memory
+    with track_stage("zip"):
+        memory_file = io.BytesIO()
+        with zipfile.ZipFile(memory_file, 'w') as zf:
+            for path, arcname in output_files:
+                if os.path.exists(path):
+                    zf.write(path, arcname=arcname)
+                else:
+                    print(f"Warning: file {path} does not exist!")
+                    record_error("zip_missing_file")
+    return memory_file.getvalue()
+
+def store_zip(filename, zip_data):
+    # Update the database entry for the result
+    with track_stage("store_zip"):
+        result = Results.query.filter_by(filename=filename).first()
+        if result:
+            result.zip_ready = True
+            result.zip_data = zip_data  # Store ZIP data as binary
+            result.prerender_zip = None
+            db.session.commit()
+    return result
+
+def background_prerender_outputs(app, filename):
+    # Speculatively renders the unedited phase-1 text so /finalize can hand it
+    # over at once when the user submits it unchanged. The job status and
+    # progress stream are left alone; only the Results prerender_* columns change.
+    key = None
+    try:
+        with app.app_context():
+            result = Results.query.filter_by(filename=filename).first()
+            if result is None or result.status != "ready":
+                return
+            if db.session.query(Job.status).filter_by(filename=filename).scalar() != "ready":
+                return  # finalized (or failed) while this was queued
+            transcript, summary, outputs = result.transcript, result.summary, result.outputs
+            key = document_key(transcript, summary, outputs)
+            result.prerender_key = key
+            result.prerender_status = "running"
+            db.session.commit()
+
+        with app.app_context(), track_job("prerender"), track_stage("prerender"), usage.attribute(filename):
+            zip_data = render_output_zip(app, transcript, summary, filename, outputs, tag="prerender",
+                                         prerender_key=key)
+            Results.query.filter_by(filename=filename, prerender_key=key).update(
+                {"prerender_zip": zip_data, "prerender_status": "ready"}, synchronize_session=False)
+            db.session.commit()
+    except Exception as e:
+        print(f"Pre-render failed for {filename}: {e}")
+        if key is None:
+            return
+        with app.app_context():
+            db.session.rollback()
+            Results.query.filter_by(filename=filename, prerender_key=key).update(
+                {"prerender_status": "failed"}, synchronize_session=False)
+            db.session.commit()
+
+def take_prerender(app, filename, key):
+    # Returns the pre-rendered ZIP for these documents, or None if there isn't
+    # a finished one; a render still running isn't waited for
+    result = Results.query.filter_by(filename=filename).first()
+    if result is None or result.prerender_key != key or result.prerender_status != "ready":
+        return None
+    return result.prerender_zip
 
 # Python
 def background_generate_outputs(app, transcript, summary, filename, outputs):
+    profiler = None
     try:
-        with app.app_context():
+        with app.app_context(), track_job("phase2"), usage.attribute(filename):
+            profiler = start_profiler(filename, "phase2")
+            set_job_status(filename, "finalizing")
             log_progress(filename, "Starting output generation...", phase="phase2")
 
-            output_files = []
-
-            if transcript:
-                if 'transcript' in outputs:
-                    log_progress(filename, "Generating transcript PDFs and DOCX...", phase="phase2")
-                    paragraphs = [p.strip() for p in transcript.split("\n") if p.strip()]
-                    pdf_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{filename}-edited-transcript.pdf")
-                    docx_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{filename}-edited-transcript.docx")
-                    generate_pdf_from_text("Transcript", paragraphs, pdf_path)
-                    generate_word_doc_from_text("Transcript", paragraphs, docx_path)
-                    output_files.append((pdf_path, "edited-transcript.pdf"))
-                    output_files.append((docx_path, "edited-transcript.docx"))
-                    print("Transcript generated successfully.")
-
-                if 'latex_transcript' in outputs:
-                    log_progress(filename, "Generating LaTeX PDF...", phase="phase2")
-                    latex_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{filename}-edited-transcript-latex.pdf")
-                    generate_latex_pdf_from_transcipt(transcript, latex_path)
-                    output_files.append((latex_path, "edited-transcript-latex.pdf"))
-                    tex_path = os.path.join(app.config['UPLOAD_FOLDER'], f"Math_Transcription.tex")
-                    output_files.append((tex_path, "edited-transcript-latex.tex"))
-                    print("Latex PDF generated successfully.")
-
-            if summary:
-
-                if 'summary' in outputs:
-                    log_progress(filename, "Generating summary PDFs and DOCX...", phase="phase2")
-                    summary_paragraphs = [p.strip() for p in summary.split("\n") if p.strip()]
-                    pdf_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{filename}-edited-summary.pdf")
-                    docx_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{filename}-edited-summary.docx")
-                    generate_pdf_from_text("Summary", summary_paragraphs, pdf_path)
-                    generate_word_doc_from_text("Summary", summary_paragraphs, docx_path)
-                    output_files.append((pdf_path, "edited-summary.pdf"))
-                    output_files.append((docx_path, "edited-summary.docx"))
-                    print("Summary generated successfully.")
-                if 'latex_summary' in outputs:
-                    log_progress(filename, "Generating LaTeX summary PDF...", phase="phase2")
-                    latex_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{filename}-edited-summary-latex.pdf")
-                    generate_latex_pdf_from_summary(summary, latex_path)
-                    output_files.append((latex_path, "edited-summary-latex.pdf"))
-                    tex_path = os.path.join(app.config['UPLOAD_FOLDER'], f"Math_Summary.tex")
-                    output_files.append((tex_path, "edited-summary-latex.tex"))
-                    print("Latex summary PDF generated successfully.")
-
-
-
-
-            log_progress(filename, "Creating ZIP file...", phase="phase2")
-            # Create ZIP in memory
-            memory_file = io.BytesIO()
-            with zipfile.ZipFile(memory_file, 'w') as zf:
-                for path, arcname in output_files:
-                    if os.path.exists(path):
-                        zf.write(path, arcname=arcname)
-                    else:
-                        print(f"Warning: file {path} does not exist!")
-            memory_file.seek(0)
-
-            # Update the database entry for the result
+            zip_data = take_prerender(app, filename, document_key(transcript, summary, outputs))
+            if zip_data is not None:
+                log_progress(filename, "Using files prepared in advance...", phase="phase2")
+            else:
+                zip_data = render_output_zip(
+                    app, transcript, summary, filename, outputs,
+                    report=lambda message: log_progress(filename, message, phase="phase2"))
+
             log_progress(filename, "Updating database with ZIP file...", phase="phase2")
-            result = Results.query.filter_by(filename=filename).first()
+            result = store_zip(filename, zip_data)
             if result:
-                result.zip_ready = True
-                result.zip_data = memory_file.getvalue()  # Store ZIP data as binary
-                db.session.commit()
+                set_job_status(filename, "done")
                 log_progress(filename, "[DONE]", is_done=True, phase="phase2")  # Mark progress as done
     except Exception as e:
-        log_progress(filename, f"❌ Error during output generation: {str(e)}", is_done=True)
+        with app.app_context():
+            set_job_status(filename, "failed")
+            log_progress(filename, f"❌ Error during output generation: {str(e)}", is_done=True, phase="phase2")
+    finally:
+        if profiler is not None:
+            save_profile(app, profiler)
 
-def download_youtube_audio(youtube_url, upload_folder):
-    try:
-        temp_id = str(uuid.uuid4())
-        base_path = os.path.join(upload_folder, temp_id)  # no extension here
-
-        ydl_opts = {
-            'format': 'bestaudio/best',
-            'outtmpl': base_path,  # no .mp3 extension here
-            'quiet': True,
-            'postprocessors': [{
-                'key': 'FFmpegExtractAudio',
-                'preferredcodec': 'mp3',
-                'preferredquality': '192',
-            }],
-        }
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            ydl.download([youtube_url])
-
-        # The postprocessor will save file as base_path + ".mp3"
-        final_path = base_path + ".mp3"
-
-        if os.path.exists(final_path):
-            return final_path
+def download_youtube_audio(youtube_url, dest_dir, cache_dir, cache_max_bytes, on_progress=None):
+    import yt_dlp
+
+    os.makedirs(cache_dir, exist_ok=True)
+    last_reported = [-1]
+
+    def progress_hook(d):
+        if on_progress is None or d.get('status') != 'downloading':
+            return
+        total = d.get('total_bytes') or d.get('total_bytes_estimate')
+        if not total:
+            return
+        percent = int(d.get('downloaded_bytes', 0) * 100 / total)
+        if percent > last_reported[0]:
+            last_reported[0] = percent
+            on_progress(percent)
+
+    ydl_opts = {
+        # Smallest audio-only stream, saved as-is (no re-encode). Whisper and
+        # ffmpeg handle webm/opus/m4a directly.
+        'format': 'bestaudio[vcodec=none]/bestaudio',
+        'format_sort': ['+size', '+br'],
+        'outtmpl': '%(id)s.%(ext)s',
+        # Partial downloads go to the job's workspace (cleaned up with it) and
+        # only finished files are moved into the shared cache
+        'paths': {'home': cache_dir, 'temp': dest_dir},
+        'noplaylist': True,
+        'quiet': True,
+        'progress_hooks': [progress_hook],
+    }
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl, track_stage("youtube_download"):
+        info = ydl.extract_info(youtube_url, download=False)
+        cached_path = youtube_cache.lookup(cache_dir, info['id'])
+
+        if cached_path:
+            print(f"YouTube cache hit for {info['id']}")
+            if on_progress:
+                on_progress(100)
         else:
-            print(f"❌ Downloaded file not found: {final_path}")
-            return None
+            info = ydl.process_ie_result(info, download=True)
+            downloads = info.get('requested_downloads') or [{}]
+            cached_path = downloads[0].get('filepath') or ydl.prepare_filename(info)
+            UPLOAD_BYTES.labels(source="youtube").inc(os.path.getsize(cached_path))
+            youtube_cache.evict(cache_dir, cache_max_bytes, keep=cached_path)
 
-    except Exception as e:
-        print(f"❌ Error downloading YouTube audio: {e}")
-        return None
\ No newline at end of file
+    ext = os.path.splitext(cached_path)[1]
+    return youtube_cache.link_into(cached_path, os.path.join(dest_dir, f"source{ext}"))
+
+
+def youtube_error_message(error):
+    message = str(error)
+    if "This video is age restricted" in message or "Sign in to confirm your age" in message or "HTTP Error 403" in message:
+        return "This video is age-restricted, private, or unavailable without login. Please try another video."
+    return "Download failed. Please make sure the link is valid and the video is public."
+
+
+def background_process_link(app, youtube_url, filename, outputs, user_id):
+    from yt_dlp.utils import DownloadError
+
+    with app.app_context():
+        log_progress(filename, "Fetching video information...", phase="phase1")
+        try:
+            with workspace.hold(app.config['UPLOAD_FOLDER'], filename):
+                audio_path = download_youtube_audio(
+                    youtube_url,
+                    uploads.job_dir(app.config['UPLOAD_FOLDER'], filename),
+                    app.config['YOUTUBE_CACHE_DIR'],
+                    app.config['YOUTUBE_CACHE_MAX_BYTES'],
+                    on_progress=percent_reporter(filename, "Downloading audio...")
+                )
+        except DownloadError as e:
+            print(f"Error downloading video {youtube_url}: {e}")
+            set_job_status(filename, "failed")
+            log_progress(filename, f"❌ {youtube_error_message(e)}", is_done=True, phase="phase1")
+            return
+        except Exception as e:
+            print(f"Error downloading video {youtube_url}: {e}")
+            set_job_status(filename, "failed")
+            log_progress(filename, f"❌ Unexpected error: {e}", is_done=True, phase="phase1")
+            return
+
+        user = db.session.get(User, user_id)
+        job = Job.query.filter_by(filename=filename).first()
+        try:
+            duration_seconds = get_duration_seconds(audio_path)
+            total_credits_needed, duration_minutes = calculate_and_deduct_credits(audio_path, outputs, user, duration_seconds)
+        except (ValueError, PermissionError) as e:
+            workspace.discard_source(audio_path)
+            print("Credit check failed, audio file removed.")
+            set_job_status(filename, "failed")
+            log_progress(filename, f"❌ {e}", is_done=True, phase="phase1")
+            return
+        except Exception as e:
+            workspace.discard_source(audio_path)
+            set_job_status(filename, "failed")
+            log_progress(filename, f"❌ Failed to read audio: {e}", is_done=True, phase="phase1")
+            return
+
+        if job:
+            job.audio_path = audio_path
+            job.duration_seconds = duration_seconds
+            job.credits_charged = total_credits_needed
+            job.status = "queued"
+            db.session.commit()
+
+        log_progress(filename, f"{total_credits_needed} credits deducted "
+                               f"({duration_minutes} min × {len(outputs)} outputs).", phase="phase1")
+
+    background_process_file(app, audio_path, filename, outputs)
+
+
+def expand_playlist(playlist_url, limit):
+    # Video URLs of a playlist, without downloading or resolving each video
+    import yt_dlp
+
+    ydl_opts = {'extract_flat': 'in_playlist', 'quiet': True, 'playlistend': limit}
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        info = ydl.extract_info(playlist_url, download=False)
+    urls = []
+    for entry in info.get('entries') or [info]:
+        url = entry.get('webpage_url') or entry.get('url')
+        if url and not url.startswith('http'):
+            url = f"https://www.youtube.com/watch?v={url}"
+        if url:
+            urls.append(url)
+    return urls[:limit]
+
+
+def finalize_saved(app, filename, outputs=None):
+    # Renders from the server-side copy: the chunks saved from the edit page,
+    # or the phase-1 text for jobs nobody opened (batch auto_finalize). The
+    # pre-render of the unedited text usually makes the latter immediate.
+    with app.app_context():
+        result = Results.query.filter_by(filename=filename).first()
+        if result is None or result.status != "ready":
+            return
+        transcript = editor_chunks.load_text(filename, "transcript")
+        summary = editor_chunks.load_text(filename, "summary")
+        if transcript is None and summary is None:
+            transcript, summary = result.transcript, result.summary
+        outputs = outputs or result.outputs
+    background_generate_outputs(app, transcript, summary, filename, outputs)
+
+
+def run_batch_item(app, item, auto_finalize):
+    filename, source, source_url, audio_path, outputs, user_id = item
+    if source == "youtube":
+        with app.app_context():
+            set_job_status(filename, "downloading")
+        background_process_link(app, source_url, filename, outputs, user_id)
+    else:
+        background_process_file(app, audio_path, filename, outputs)
+    if not auto_finalize:
+        return
+    # Same claim as /finalize, so a submit from the edit page can't render it twice
+    with app.app_context():
+        claimed = editor_chunks.claim_finalize(filename)
+    if claimed:
+        finalize_saved(app, filename)
+
+
+def background_expand_playlist(app, batch_id, limit, outputs, tempo=None, tier=None):
+    # Adds a batch's playlist videos as queued jobs, then starts the batch.
+    # Runs as a task so reading a long playlist doesn't hold up the request
+    with app.app_context():
+        batch = db.session.get(Batch, batch_id)
+        try:
+            urls = expand_playlist(batch.playlist_url, limit)
+        except Exception as e:
+            print(f"Error expanding playlist {batch.playlist_url}: {e}")
+            batch.playlist_status = "failed"
+        else:
+            for url in urls:
+                # Charged after download, once the duration is known
+                db.session.add(Job(filename=uuid.uuid4().hex, user_id=batch.user_id, source="youtube", status="queued",
+                                   outputs=outputs, source_url=url, batch_id=batch.id, tempo=tempo))
+            batch.playlist_status = "expanded"
+        db.session.commit()
+    background_process_batch(app, batch_id, tier)
+
+
+def background_process_batch(app, batch_id, tier=None):
+    # Hands a batch's queued jobs to the scheduler in submission order; the
+    # batch's max_parallel caps how many of them run at once
+    with app.app_context():
+        batch = db.session.get(Batch, batch_id)
+        jobs = Job.query.filter_by(batch_id=batch_id, status="queued").order_by(Job.id).all()
+        for job in jobs:
+            item = (job.filename, job.source, job.source_url, job.audio_path, job.outputs, job.user_id)
+            scheduler.submit(run_batch_item, app, item, batch.auto_finalize,
+                             user_id=job.user_id, tier=tier,
+                             cost=job.duration_seconds / 60 if job.duration_seconds else None,
+                             group=f"batch-{batch.id}", group_limit=batch.max_parallel)
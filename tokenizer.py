@@ -0,0 +1,38 @@
+import os
+import threading
+
+# tiktoken downloads its BPE file on first use and caches it under
+# TIKTOKEN_CACHE_DIR (a temp dir by default, lost on restart). The Docker image
+# sets TIKTOKEN_CACHE_DIR and fetches the file at build time, so workers load it
+# from disk and never need network access to count tokens.
+ENCODING_NAME = "cl100k_base"
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".tiktoken_cache")
+
+_encoder = None
+_lock = threading.Lock()
+
+
+def get_encoder():
+    global _encoder
+    if _encoder is None:
+        with _lock:
+            if _encoder is None:
+                os.environ.setdefault("TIKTOKEN_CACHE_DIR", DEFAULT_CACHE_DIR)
+                import tiktoken
+                try:
+                    _encoder = tiktoken.get_encoding(ENCODING_NAME)
+                except Exception as e:
+                    raise RuntimeError(
+                        f"Could not load the {ENCODING_NAME} tokenizer from {os.environ['TIKTOKEN_CACHE_DIR']}; "
+                        f"run `python tokenizer.py` with network access to populate it: {e}")
+    return _encoder
+
+
+def count_tokens(text):
+    return len(get_encoder().encode(text))
+
+
+if __name__ == "__main__":
+    # Used by the Dockerfile to bake the encoding into the image
+    print(f"{ENCODING_NAME} cached in {os.environ.get('TIKTOKEN_CACHE_DIR', DEFAULT_CACHE_DIR)} "
+          f"({get_encoder().n_vocab} tokens)")
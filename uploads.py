@@ -0,0 +1,126 @@
+import hashlib
+import os
+import re
+import threading
+import uuid
+from werkzeug.utils import secure_filename
+
+READ_BLOCK_SIZE = 1024 * 1024
+# Enough of the file for ffprobe to identify the container and audio codec
+PROBE_BYTES = 1024 * 1024
+UNKNOWN_FORMAT = "unknown"
+
+# upload_id -> (offset, sha256 state) for uploads this worker is receiving
+_hashers = {}
+_hashers_lock = threading.Lock()
+
+
+class UploadOffsetMismatch(Exception):
+    def __init__(self, expected):
+        super().__init__(f"Expected offset {expected}")
+        self.expected = expected
+
+
+def new_job_filename(original_filename):
+    base = secure_filename(os.path.splitext(original_filename)[0]) or "audio"
+    return f"{base[:100]}-{uuid.uuid4().hex[:8]}"
+
+
+def job_dir(upload_folder, filename):
+    path = os.path.join(upload_folder, "jobs", filename)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def source_path(upload_folder, filename, original_filename):
+    ext = os.path.splitext(original_filename)[1].lower()
+    if not re.fullmatch(r"\.[a-z0-9]{1,10}", ext):
+        ext = ""
+    return os.path.join(job_dir(upload_folder, filename), f"source{ext}")
+
+
+def _hasher_at(job):
+    # The hash state normally stays in the worker that took the previous chunk.
+    # If this chunk landed on another worker (or after a restart), rebuild it
+    # from the bytes already on disk.
+    with _hashers_lock:
+        entry = _hashers.pop(job.filename, None)
+    if entry and entry[0] == job.upload_offset:
+        return entry[1]
+
+    hasher = hashlib.sha256()
+    remaining = job.upload_offset
+    if remaining:
+        with open(job.audio_path, "rb") as f:
+            while remaining:
+                block = f.read(min(READ_BLOCK_SIZE, remaining))
+                if not block:
+                    break
+                hasher.update(block)
+                remaining -= len(block)
+    return hasher
+
+
+def append_chunk(job, stream, offset):
+    if offset != job.upload_offset:
+        raise UploadOffsetMismatch(job.upload_offset)
+
+    hasher = _hasher_at(job)
+    written = 0
+    mode = "r+b" if os.path.exists(job.audio_path) else "wb"
+    try:
+        with open(job.audio_path, mode) as f:
+            f.seek(offset)
+            f.truncate()  # drop bytes an interrupted request wrote but never acknowledged
+            while offset + written < job.upload_size:
+                block = stream.read(min(READ_BLOCK_SIZE, job.upload_size - offset - written))
+                if not block:
+                    break
+                f.write(block)
+                hasher.update(block)
+                written += len(block)
+    finally:
+        # Record whatever arrived, so a dropped connection resumes from here
+        job.upload_offset = offset + written
+        with _hashers_lock:
+            _hashers[job.filename] = (job.upload_offset, hasher)
+
+    return written
+
+
+def maybe_probe(job):
+    # Probes the first PROBE_BYTES, then the whole file if that was
+    # inconclusive. MP4/M4A files often keep their moov atom at the end, so a
+    # partial probe finding no audio only means the format isn't known yet.
+    complete = job.upload_offset >= job.upload_size
+    if job.media_format and not (complete and job.media_format == UNKNOWN_FORMAT):
+        return
+    if not complete and job.upload_offset < PROBE_BYTES:
+        return
+
+    from pydub.utils import mediainfo_json
+
+    try:
+        info = mediainfo_json(job.audio_path)
+    except Exception as e:
+        if complete:
+            raise ValueError(f"Could not read the uploaded file: {e}")
+        info = {}
+    streams = info.get('streams', [])
+    if any(stream.get('codec_type') == 'audio' for stream in streams):
+        job.media_format = info.get('format', {}).get('format_name', UNKNOWN_FORMAT)[:100]
+    elif not complete:
+        job.media_format = UNKNOWN_FORMAT  # probed again once the last chunk arrives
+    else:
+        raise ValueError("The uploaded file does not contain an audio stream.")
+
+
+def finish_hash(job):
+    return _hasher_at(job).hexdigest()
+
+
+def discard(job):
+    with _hashers_lock:
+        _hashers.pop(job.filename, None)
+    if job.audio_path and os.path.exists(job.audio_path):
+        os.remove(job.audio_path)
@@ -0,0 +1,193 @@
+import atexit
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from sqlalchemy import insert, func, case
+from models import db
+from models.api_usage import ApiUsage
+from models.job import Job
+
+# Every OpenAI call is recorded in the api_usage table with the tokens (or
+# audio seconds) it used and how long it took. The job a call belongs to is
+# taken from the running thread, set with attribute() around each background
+# phase. Rows are buffered and written in one INSERT when the phase ends.
+
+# USD per million prompt/completion tokens; whisper is billed per minute
+PRICES = {
+    "o4-mini-2025-04-16": (1.10, 4.40),
+    "o3-mini-2025-01-31": (1.10, 4.40),
+    "o3-2025-04-16": (2.00, 8.00),
+    "gpt-4.1-2025-04-14": (2.00, 8.00),
+    "gpt-4.1-mini-2025-04-14": (0.40, 1.60),
+    "gpt-4o-2024-08-06": (2.50, 10.00),
+    "gpt-4o-mini-2024-07-18": (0.15, 0.60),
+}
+PRICES.update({name: tuple(price) for name, price in json.loads(os.getenv("MODEL_PRICES", "{}")).items()})
+WHISPER_PRICE_PER_MINUTE = 0.006
+# What a credit sells for, in the same currency as PRICES (£0.03 by default)
+CREDIT_VALUE_USD = float(os.getenv("CREDIT_VALUE_USD", "0.038"))
+MAX_PENDING = 10000
+
+_local = threading.local()
+
+
+class UsageLedger:
+    def __init__(self):
+        self.app = None
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._pending = []
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        atexit.register(self.flush)
+
+    def record(self, stage, model, latency, prompt_tokens=0, completion_tokens=0, reasoning_tokens=0,
+               audio_seconds=None, status="ok"):
+        row = {
+            "filename": getattr(_local, "filename", None),
+            "stage": stage,
+            "model": model,
+            "status": status,
+            "prompt_tokens": prompt_tokens or 0,
+            "completion_tokens": completion_tokens or 0,
+            "reasoning_tokens": reasoning_tokens or 0,
+            "audio_seconds": audio_seconds,
+            "latency_seconds": round(latency, 3),
+            "created_at": datetime.utcnow(),
+        }
+        with self._lock:
+            if len(self._pending) < MAX_PENDING:
+                self._pending.append(row)
+
+    def record_response(self, stage, model, latency, response_usage, status="ok"):
+        # response_usage is the usage object of a chat completion (or None)
+        details = getattr(response_usage, "completion_tokens_details", None)
+        self.record(stage, model, latency,
+                    prompt_tokens=getattr(response_usage, "prompt_tokens", 0),
+                    completion_tokens=getattr(response_usage, "completion_tokens", 0),
+                    reasoning_tokens=getattr(details, "reasoning_tokens", 0),
+                    status=status)
+
+    def flush(self):
+        with self._lock:
+            rows, self._pending = self._pending, []
+        if not rows or self.app is None:
+            return
+        with self.app.app_context():
+            try:
+                db.session.execute(insert(ApiUsage), rows)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Failed to write {len(rows)} API usage rows: {e}")
+
+
+ledger = UsageLedger()
+
+
+@contextmanager
+def attribute(filename):
+    # Calls made on this thread inside the block are charged to filename
+    previous = getattr(_local, "filename", None)
+    _local.filename = filename
+    try:
+        yield
+    finally:
+        _local.filename = previous
+        if previous is None:
+            ledger.flush()
+
+
+def cost_usd(model, prompt_tokens, completion_tokens, audio_seconds):
+    if audio_seconds:
+        return audio_seconds / 60 * WHISPER_PRICE_PER_MINUTE
+    input_price, output_price = PRICES.get(model, (0.0, 0.0))
+    return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+
+
+def stage_report(since):
+    rows = db.session.query(
+        ApiUsage.stage, ApiUsage.model,
+        func.count(ApiUsage.id),
+        func.sum(ApiUsage.prompt_tokens),
+        func.sum(ApiUsage.completion_tokens),
+        func.sum(ApiUsage.reasoning_tokens),
+        func.sum(ApiUsage.audio_seconds),
+        func.sum(ApiUsage.latency_seconds),
+        func.sum(case((ApiUsage.status != "ok", 1), else_=0)),
+    ).filter(ApiUsage.created_at >= since).group_by(ApiUsage.stage, ApiUsage.model).all()
+
+    stages = []
+    for stage, model, calls, prompt, completion, reasoning, audio, latency, failed in rows:
+        prompt, completion, audio = prompt or 0, completion or 0, audio or 0.0
+        stages.append({
+            "stage": stage,
+            "model": model,
+            "calls": calls,
+            "failed_calls": failed or 0,
+            "prompt_tokens": prompt,
+            "completion_tokens": completion,
+            "reasoning_tokens": reasoning or 0,
+            "audio_minutes": round(audio / 60, 2),
+            "mean_latency_seconds": round((latency or 0) / calls, 2),
+            "cost_usd": round(cost_usd(model, prompt, completion, audio), 4),
+        })
+    return sorted(stages, key=lambda row: -row["cost_usd"])
+
+
+def job_report(since, limit=50):
+    # Cost of each recent job next to what it was charged, most expensive
+    # (relative to its price) first
+    rows = db.session.query(
+        ApiUsage.filename, ApiUsage.model,
+        func.sum(ApiUsage.prompt_tokens),
+        func.sum(ApiUsage.completion_tokens),
+        func.sum(ApiUsage.audio_seconds),
+    ).filter(ApiUsage.created_at >= since, ApiUsage.filename.isnot(None)) \
+        .group_by(ApiUsage.filename, ApiUsage.model).all()
+
+    costs = {}
+    for filename, model, prompt, completion, audio in rows:
+        costs[filename] = costs.get(filename, 0.0) + cost_usd(model, prompt or 0, completion or 0, audio or 0.0)
+    if not costs:
+        return []
+
+    jobs = {job.filename: job for job in Job.query.filter(Job.filename.in_(list(costs))).all()}
+    report = []
+    for filename, cost in costs.items():
+        job = jobs.get(filename)
+        charged = (job.credits_charged or 0) if job else 0
+        revenue = charged * CREDIT_VALUE_USD
+        report.append({
+            "filename": filename,
+            "duration_minutes": round((job.duration_seconds or 0) / 60, 1) if job else None,
+            "outputs": job.outputs if job else None,
+            "credits_charged": charged,
+            "revenue_usd": round(revenue, 4),
+            "cost_usd": round(cost, 4),
+            "cost_ratio": round(cost / revenue, 3) if revenue else None,
+        })
+    report.sort(key=lambda row: -(row["cost_ratio"] if row["cost_ratio"] is not None else float("inf")))
+    return report[:limit]
+
+
+def report(days=30):
+    since = datetime.utcnow() - timedelta(days=days)
+    stages = stage_report(since)
+    jobs = job_report(since)
+    charged = db.session.query(func.sum(Job.credits_charged)).filter(Job.created_at >= since).scalar() or 0
+    cost = sum(stage["cost_usd"] for stage in stages)
+    return {
+        "days": days,
+        "cost_usd": round(cost, 2),
+        "credits_charged": charged,
+        "revenue_usd": round(charged * CREDIT_VALUE_USD, 2),
+        "stages": stages,
+        "jobs": jobs,
+    }
@@ -0,0 +1,38 @@
+import os
+import threading
+import time
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
+from models import db
+from models.user import User
+
+# Flask-Login already keeps the loaded user for the rest of the request; this
+# cache spares polling requests the SELECT on user across requests. Only the id
+# is cached, which is all authentication and the polling endpoints need: every
+# other column (credits, priority tier, ...) is left expired, so the first
+# access in a request reads it fresh. Credits change in scheduler threads and
+# other workers, which a per-process cache could never see.
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "30"))
+
+_UNCACHED = [attr.key for attr in inspect(User).column_attrs if attr.key != "id"]
+_cache = {}  # user_id -> expires_at
+_lock = threading.Lock()
+
+
+def load_user(user_id):
+    now = time.monotonic()
+    with _lock:
+        expires_at = _cache.get(user_id)
+
+    if expires_at and expires_at > now:
+        user = User(id=user_id)
+        make_transient_to_detached(user)
+        user = db.session.merge(user, load=False)  # attaches without a query
+        db.session.expire(user, _UNCACHED)  # loaded together on first access
+        return user
+
+    user = db.session.get(User, user_id)
+    if user is not None:
+        with _lock:
+            _cache[user_id] = now + USER_CACHE_TTL
+    return user
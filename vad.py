@@ -0,0 +1,119 @@
+import math
+import os
+
+try:
+    import audioop
+except ImportError:  # Python 3.13+, where pydub depends on audioop-lts
+    import pyaudioop as audioop
+
+# Energy-based voice activity detection. The audio is analysed as 16 kHz mono
+# 30 ms frames; frames well above the recording's own noise floor count as
+# speech, and only silences longer than MIN_SILENCE_MS are cut, with PAD_MS of
+# context kept on either side so words aren't clipped.
+#
+# A speech map is a list of [trimmed_start_ms, original_start_ms, length_ms]
+# segments, one per kept stretch, so timestamps in the trimmed audio can be
+# mapped back to the recording.
+
+FRAME_MS = 30
+SAMPLE_RATE = 16000
+MIN_SILENCE_MS = int(os.getenv("VAD_MIN_SILENCE_MS", "1500"))
+PAD_MS = int(os.getenv("VAD_PAD_MS", "250"))
+# A frame is speech when its RMS is this many times the noise floor...
+THRESHOLD_RATIO = float(os.getenv("VAD_THRESHOLD_RATIO", "3.0"))
+# ...and above this absolute level (dBFS), so quiet rooms aren't all "speech"
+MIN_SPEECH_DBFS = float(os.getenv("VAD_MIN_SPEECH_DBFS", "-50"))
+# Not worth re-cutting the audio to save less than this fraction
+MIN_TRIM_FRACTION = 0.03
+# Audio is converted for analysis a block at a time (a whole number of frames)
+LEVEL_BLOCK_MS = 60000
+
+
+def frame_levels(audio):
+    # Converting block by block keeps only one block's 16 kHz copy in memory
+    # instead of a second copy of the whole recording
+    frame_bytes = SAMPLE_RATE * FRAME_MS // 1000 * 2
+    levels = []
+    for block_start in range(0, len(audio), LEVEL_BLOCK_MS):
+        block = audio[block_start:block_start + LEVEL_BLOCK_MS]
+        data = block.set_channels(1).set_frame_rate(SAMPLE_RATE).set_sample_width(2).raw_data
+        levels.extend(audioop.rms(data[i:i + frame_bytes], 2) for i in range(0, len(data) - frame_bytes + 1, frame_bytes))
+    return levels
+
+
+def detect_speech(audio):
+    # Returns [(start_ms, end_ms)] of the stretches to keep, in original time
+    levels = frame_levels(audio)
+    if not levels:
+        return [(0, len(audio))]
+
+    floor = sorted(levels)[len(levels) // 10]  # 10th percentile
+    min_level = 32767 * math.pow(10, MIN_SPEECH_DBFS / 20)
+    threshold = max(floor * THRESHOLD_RATIO, min_level)
+
+    segments = []
+    start = None
+    for i, level in enumerate(levels + [0]):
+        if level > threshold and start is None:
+            start = i
+        elif level <= threshold and start is not None:
+            segments.append((start * FRAME_MS, i * FRAME_MS))
+            start = None
+    if not segments:
+        return []
+
+    # Pad each stretch and merge any whose gap is too short to be worth cutting
+    merged = []
+    for start_ms, end_ms in segments:
+        start_ms = max(0, start_ms - PAD_MS)
+        end_ms = min(len(audio), end_ms + PAD_MS)
+        if merged and start_ms - merged[-1][1] < MIN_SILENCE_MS:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end_ms))
+        else:
+            merged.append((start_ms, end_ms))
+    if merged[0][0] < MIN_SILENCE_MS:
+        merged[0] = (0, merged[0][1])
+    if len(audio) - merged[-1][1] < MIN_SILENCE_MS:
+        merged[-1] = (merged[-1][0], len(audio))
+    return merged
+
+
+def trim_silence(audio):
+    # Returns the speech map for cutting the long silences out of audio, or
+    # None when there is little to cut. Nothing is copied here: trimmed_slice
+    # builds any stretch of the trimmed audio from the kept spans, so the
+    # trimmed recording is never held in memory whole.
+    segments = detect_speech(audio)
+    kept = sum(end - start for start, end in segments)
+    if not segments or kept >= len(audio) * (1 - MIN_TRIM_FRACTION):
+        return None
+
+    speech_map = []
+    position = 0
+    for start, end in segments:
+        speech_map.append([position, start, end - start])
+        position += end - start
+    return speech_map
+
+
+def trimmed_slice(audio, speech_map, start_ms, end_ms):
+    # audio[start_ms:end_ms] of the trimmed audio, from the spans it overlaps
+    parts = []
+    for trimmed_start, original_start, length in speech_map:
+        lo, hi = max(start_ms, trimmed_start), min(end_ms, trimmed_start + length)
+        if lo < hi:
+            parts.append(audio[original_start + lo - trimmed_start:original_start + hi - trimmed_start].raw_data)
+    return audio._spawn(b"".join(parts))
+
+
+def kept_ms(speech_map):
+    return sum(length for _, _, length in speech_map)
+
+
+def to_original_ms(trimmed_ms, speech_map):
+    if not speech_map:
+        return trimmed_ms
+    for trimmed_start, original_start, length in reversed(speech_map):
+        if trimmed_ms >= trimmed_start:
+            return original_start + min(trimmed_ms - trimmed_start, length)
+    return trimmed_ms
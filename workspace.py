@@ -0,0 +1,246 @@
+import fcntl
+import os
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from models import db
+from models.job import Job
+from metrics import DISK_BYTES, DISK_FREE_BYTES, JANITOR_REMOVED_BYTES
+import uploads
+import youtube_cache
+
+# Everything a job writes lives in uploads/jobs/<filename>: the source audio,
+# Whisper chunks and rendered outputs. Code working in a job directory holds a
+# shared flock on its .lock file; the janitor only removes directories it can
+# lock exclusively, so it never pulls files out from under a running stage.
+
+JANITOR_INTERVAL = float(os.getenv("JANITOR_INTERVAL", "600"))
+# Jobs still uploading, downloading, queued or waiting with nothing holding their
+# workspace are abandoned after this long
+STALE_JOB_TTL = float(os.getenv("STALE_JOB_TTL_HOURS", "24")) * 3600
+# Loose files in the upload folder (written before per-job workspaces existed)
+LOOSE_FILE_TTL = float(os.getenv("LOOSE_FILE_TTL_HOURS", "24")) * 3600
+UPLOAD_QUOTA_BYTES = int(os.getenv("UPLOAD_QUOTA_MB", "20480")) * 1024 * 1024
+# Off in instances that shouldn't sweep (gunicorn.conf.py clears it for evented workers)
+BACKGROUND_THREADS = os.getenv("BACKGROUND_THREADS", "1") == "1"
+
+ACTIVE_STATUSES = ("uploading", "downloading", "queued", "waiting", "processing", "finalizing")
+LOCK_NAME = ".lock"
+
+_janitor = None
+_janitor_lock = threading.Lock()
+
+
+def jobs_root(upload_folder):
+    return os.path.join(upload_folder, "jobs")
+
+
+def _open_locked(path, operation):
+    # Returns a descriptor holding the lock, or None if it is held elsewhere.
+    # The janitor may delete the directory between open() and flock(), so the
+    # lock only counts if the file is still the one on disk.
+    while True:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, operation)
+        except BlockingIOError:
+            os.close(fd)
+            return None
+        try:
+            if os.fstat(fd).st_ino == os.stat(path).st_ino:
+                return fd
+        except FileNotFoundError:
+            pass
+        os.close(fd)
+
+
+@contextmanager
+def hold(upload_folder, filename):
+    fd = _open_locked(os.path.join(uploads.job_dir(upload_folder, filename), LOCK_NAME), fcntl.LOCK_SH)
+    try:
+        yield
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def scratch(upload_folder, filename, name):
+    # A private directory inside the job's workspace, removed on exit whether
+    # the work succeeded or not
+    with hold(upload_folder, filename):
+        path = os.path.join(uploads.job_dir(upload_folder, filename), f"{name}-{uuid.uuid4().hex[:8]}")
+        os.makedirs(path)
+        try:
+            yield path
+        finally:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def discard_source(audio_path):
+    try:
+        if audio_path:
+            os.remove(audio_path)
+    except FileNotFoundError:
+        pass
+
+
+def tree_stats(path):
+    # (total bytes, newest file mtime) for a file or directory tree. Lock files
+    # and directory mtimes are left out: the janitor's own locking touches them.
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return 0, 0
+    if not os.path.isdir(path):
+        return stat.st_size, stat.st_mtime
+    total, newest = 0, 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            if name == LOCK_NAME:
+                continue
+            try:
+                entry = os.stat(os.path.join(root, name))
+            except FileNotFoundError:
+                continue
+            newest = max(newest, entry.st_mtime)
+            total += entry.st_size
+    return total, newest
+
+
+def remove_tree(path, reason):
+    size, _ = tree_stats(path)
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return
+    JANITOR_REMOVED_BYTES.labels(reason=reason).inc(size)
+    print(f"Janitor removed {path} ({size} bytes, {reason})")
+
+
+def sweep_jobs(upload_folder, now):
+    root = jobs_root(upload_folder)
+    if not os.path.isdir(root):
+        return
+    names = os.listdir(root)
+    jobs = {}
+    if names:
+        rows = db.session.query(Job.filename, Job.status, Job.created_at).filter(Job.filename.in_(names)).all()
+        jobs = {filename: (status, created_at) for filename, status, created_at in rows}
+    cutoff = datetime.utcnow() - timedelta(seconds=STALE_JOB_TTL)
+
+    for name in names:
+        path = os.path.join(root, name)
+        fd = _open_locked(os.path.join(path, LOCK_NAME), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        if fd is None:
+            continue  # a stage is working in it
+        try:
+            status, created_at = jobs.get(name, (None, None))
+            _, newest = tree_stats(path)
+            if status is None:
+                # The route that made the directory may not have committed its row yet
+                stale = now - max(newest, os.path.getmtime(path)) > STALE_JOB_TTL
+            elif status in ACTIVE_STATUSES:
+                stale = created_at < cutoff and now - newest > STALE_JOB_TTL
+            else:
+                remove_tree(path, "finished")
+                continue
+            if stale:
+                remove_tree(path, "stale")
+                Job.query.filter_by(filename=name, status=status).update({"status": "failed"})
+                db.session.commit()
+        finally:
+            os.close(fd)
+
+
+def sweep_loose_files(upload_folder, now):
+    for name in os.listdir(upload_folder):
+        path = os.path.join(upload_folder, name)
+        if name.startswith(".") or not os.path.isfile(path):
+            continue
+        try:
+            if now - os.path.getmtime(path) > LOOSE_FILE_TTL:
+                remove_tree(path, "loose")
+        except FileNotFoundError:
+            pass
+
+
+def measure(app):
+    upload_folder = app.config['UPLOAD_FOLDER']
+    cache_dir = app.config['YOUTUBE_CACHE_DIR']
+    jobs, _ = tree_stats(jobs_root(upload_folder))
+    cache, _ = tree_stats(cache_dir)
+    total, _ = tree_stats(upload_folder)
+    if os.path.abspath(cache_dir).startswith(os.path.abspath(upload_folder) + os.sep):
+        other = total - jobs - cache
+    else:
+        other, total = total - jobs, total + cache
+    DISK_BYTES.labels(area="jobs").set(jobs)
+    DISK_BYTES.labels(area="youtube_cache").set(cache)
+    DISK_BYTES.labels(area="other").set(max(other, 0))
+    DISK_FREE_BYTES.set(shutil.disk_usage(upload_folder).free)
+    return total, cache
+
+
+def enforce_quota(app):
+    total, cache = measure(app)
+    if total <= UPLOAD_QUOTA_BYTES:
+        return
+    # Job workspaces are removed as soon as jobs no longer need them, so the
+    # YouTube cache is the only thing left to shrink
+    over = total - UPLOAD_QUOTA_BYTES
+    youtube_cache.evict(app.config['YOUTUBE_CACHE_DIR'], max(cache - over, 0))
+    total, _ = measure(app)
+    if total > UPLOAD_QUOTA_BYTES:
+        print(f"Upload folder is {total} bytes, over its {UPLOAD_QUOTA_BYTES} byte quota")
+
+
+def sweep(app):
+    # One sweep at a time across every worker process
+    upload_folder = app.config['UPLOAD_FOLDER']
+    fd = _open_locked(os.path.join(upload_folder, ".janitor.lock"), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    if fd is None:
+        return
+    try:
+        now = time.time()
+        with app.app_context():
+            sweep_jobs(upload_folder, now)
+        sweep_loose_files(upload_folder, now)
+        enforce_quota(app)
+    finally:
+        os.close(fd)
+
+
+def _run(app):
+    while True:
+        try:
+            sweep(app)
+        except Exception as e:
+            print(f"Janitor sweep failed: {e}")
+        time.sleep(JANITOR_INTERVAL)
+
+
+def start_janitor(app):
+    global _janitor
+    if _janitor is not None and _janitor.is_alive():
+        return
+    with _janitor_lock:
+        if _janitor is None or not _janitor.is_alive():
+            _janitor = threading.Thread(target=_run, args=(app,), name="workspace-janitor", daemon=True)
+            _janitor.start()
+
+
+def init_app(app):
+    if JANITOR_INTERVAL <= 0 or not BACKGROUND_THREADS:
+        return
+    # Started by the first request a process serves, never at import: with
+    # preload_app the gunicorn master imports the app but must not sweep.
+    # Each worker starts its own; the .janitor.lock flock keeps their sweeps
+    # from overlapping
+    app.before_request(lambda: start_janitor(app))
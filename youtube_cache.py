@@ -0,0 +1,64 @@
+import os
+import shutil
+import threading
+
+# Downloaded YouTube audio is kept in a shared directory keyed by video ID, so
+# the same link submitted twice only hits YouTube once. Least recently used
+# files are evicted when the directory grows past its byte budget.
+
+_lock = threading.Lock()
+
+
+def lookup(cache_dir, video_id):
+    if not os.path.isdir(cache_dir):
+        return None
+
+    with _lock:
+        for name in os.listdir(cache_dir):
+            stem, ext = os.path.splitext(name)
+            if stem != video_id or ext in (".part", ".ytdl"):
+                continue
+            path = os.path.join(cache_dir, name)
+            try:
+                os.utime(path)  # mtime doubles as the LRU timestamp
+            except FileNotFoundError:
+                return None
+            return path
+    return None
+
+
+def evict(cache_dir, max_bytes, keep=None):
+    with _lock:
+        entries = []
+        total = 0
+        for name in os.listdir(cache_dir):
+            path = os.path.join(cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= max_bytes:
+                break
+            if keep and os.path.abspath(path) == os.path.abspath(keep):
+                continue
+            try:
+                os.remove(path)
+                total -= size
+                print(f"Evicted cached YouTube audio {path}")
+            except FileNotFoundError:
+                pass
+
+
+def link_into(cached_path, dest_path):
+    # A hard link keeps the job's copy alive even if the cache entry is evicted
+    # mid-job, without duplicating the bytes on disk.
+    try:
+        os.link(cached_path, dest_path)
+    except OSError:
+        shutil.copyfile(cached_path, dest_path)
+    return dest_path